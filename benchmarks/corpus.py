@@ -0,0 +1,209 @@
+"""
+Benchmark corpus: recorded screens plus the targets expected on them.
+
+一个语料目录包含若干截图和 manifest.json：
+{
+  "screens": [
+    {"frame": "chat_list_1080p_zh.png", "scene": "chat_list", "resolution": "1080p", "lang": "zh",
+     "targets": [{"text": "文件传输助手", "box": [l, t, w, h]}, ...],
+     "templates": [{"name": "avatar", "file": "templates/....png", "box": [l, t, w, h]}, ...]}
+  ]
+}
+真实录制的截图 (RecordingSource 保存的 .png/.rgb) 只要手工写好 manifest 也可以直接使用。
+没有录制数据时，generate_corpus 用 PIL 合成可复现的聊天列表、对话框画面
+(1080p/1440p/4K，中文/英文)，目标位置由绘制时的坐标得出。
+"""
+import json
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+MANIFEST = "manifest.json"
+RESOLUTIONS = {"1080p": (1920, 1080), "1440p": (2560, 1440), "4k": (3840, 2160)}
+LANGS = ("zh", "en")
+SCENES = ("chat_list", "dialog")
+
+# Fonts tried in order; the first that exists is used (override with font=...)
+FONT_CANDIDATES = {
+    "zh": [
+        "C:/Windows/Fonts/msyh.ttc",
+        "C:/Windows/Fonts/simhei.ttf",
+        "/System/Library/Fonts/PingFang.ttc",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    ],
+    "en": [
+        "C:/Windows/Fonts/segoeui.ttf",
+        "C:/Windows/Fonts/arial.ttf",
+        "/System/Library/Fonts/Helvetica.ttc",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    ],
+}
+
+TEXT = {
+    "zh": {
+        "search": "搜索",
+        "contacts": ["文件传输助手", "张三", "李四", "项目讨论组", "王小明", "订阅号消息"],
+        "messages": ["明天上午十点开会", "收到，谢谢", "文件已经发给你了"],
+        "send": "发送",
+        "dialog_title": "是否保存更改？",
+        "dialog_body": "如果不保存，你的更改将会丢失。",
+        "buttons": ["保存", "不保存", "取消"],
+    },
+    "en": {
+        "search": "Search",
+        "contacts": ["File Transfer", "Alice Chen", "Bob Smith", "Project Team", "Carol White", "Subscriptions"],
+        "messages": ["Meeting at ten tomorrow", "Got it, thanks", "I sent you the file"],
+        "send": "Send",
+        "dialog_title": "Save changes?",
+        "dialog_body": "Your changes will be lost if you don't save them.",
+        "buttons": ["Save", "Don't Save", "Cancel"],
+    },
+}
+
+
+def find_font(lang):
+    """Returns the path of the first installed font for lang, or None."""
+    for path in FONT_CANDIDATES.get(lang, []):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _load_font(path, size):
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no scalable default font
+        return ImageFont.load_default()
+
+
+class _Canvas:
+    """Draws text and shapes at 1080p layout coordinates scaled to the target size."""
+
+    def __init__(self, size, font_path):
+        self.image = Image.new("RGB", size, (245, 245, 245))
+        self.draw = ImageDraw.Draw(self.image)
+        self.scale = size[0] / 1920
+        self.font_path = font_path
+        self._fonts = {}
+
+    def s(self, value):
+        return int(round(value * self.scale))
+
+    def font(self, size):
+        size = self.s(size)
+        if size not in self._fonts:
+            self._fonts[size] = _load_font(self.font_path, size)
+        return self._fonts[size]
+
+    def rect(self, box, fill, outline=None):
+        l, t, w, h = (self.s(v) for v in box)
+        self.draw.rectangle([l, t, l + w - 1, t + h - 1], fill=fill, outline=outline)
+        return [l, t, w, h]
+
+    def text(self, xy, text, size, fill=(20, 20, 20)):
+        """Draws text and returns its bounding box [l, t, w, h] in pixels."""
+        x, y = self.s(xy[0]), self.s(xy[1])
+        font = self.font(size)
+        self.draw.text((x, y), text, font=font, fill=fill)
+        l, t, r, b = self.draw.textbbox((x, y), text, font=font)
+        return [l, t, r - l, b - t]
+
+
+def _avatar(canvas, box, rng):
+    """A distinctive blocky avatar (good template material)."""
+    l, t, w, h = canvas.rect(box, fill=tuple(rng.randrange(40, 220) for _ in range(3)))
+    cell = max(1, w // 4)
+    for gx in range(4):
+        for gy in range(4):
+            if rng.random() < 0.5:
+                canvas.draw.rectangle([l + gx * cell, t + gy * cell, l + (gx + 1) * cell - 1, t + (gy + 1) * cell - 1],
+                                      fill=tuple(rng.randrange(0, 255) for _ in range(3)))
+    return [l, t, w, h]
+
+
+def _chat_list(canvas, text, rng):
+    targets, templates = [], []
+    canvas.rect((0, 0, 70, 1080), fill=(46, 46, 46))
+    canvas.rect((70, 0, 330, 1080), fill=(230, 230, 230))
+    canvas.rect((85, 20, 300, 36), fill=(255, 255, 255))
+    targets.append({"text": text["search"], "box": canvas.text((100, 26), text["search"], 18, (150, 150, 150))})
+    for i, name in enumerate(text["contacts"]):
+        top = 80 + i * 84
+        avatar = _avatar(canvas, (85, top + 12, 56, 56), rng)
+        if i == 0:
+            templates.append({"name": "avatar", "box": avatar})
+        targets.append({"text": name, "box": canvas.text((155, top + 14), name, 20)})
+        canvas.text((155, top + 46), text["messages"][i % len(text["messages"])], 15, (140, 140, 140))
+    canvas.rect((400, 0, 1520, 60), fill=(245, 245, 245))
+    targets.append({"text": text["contacts"][3], "box": canvas.text((430, 16), text["contacts"][3], 22)})
+    for i, message in enumerate(text["messages"]):
+        top = 120 + i * 90
+        left = 1300 if i % 2 else 480
+        canvas.rect((left - 16, top - 10, 420, 50), fill=(149, 236, 105) if i % 2 else (255, 255, 255))
+        targets.append({"text": message, "box": canvas.text((left, top), message, 18)})
+    send = canvas.rect((1760, 1020, 120, 40), fill=(7, 193, 96))
+    templates.append({"name": "send_button", "box": send})
+    targets.append({"text": text["send"], "box": canvas.text((1792, 1028), text["send"], 18, (255, 255, 255))})
+    return targets, templates
+
+
+def _dialog(canvas, text, rng):
+    targets, templates = [], []
+    canvas.rect((0, 0, 1920, 1080), fill=(200, 205, 210))
+    canvas.rect((660, 340, 600, 300), fill=(255, 255, 255), outline=(120, 120, 120))
+    l, t, w, h = (canvas.s(v) for v in (690, 380, 48, 48))
+    canvas.draw.polygon([(l + w // 2, t), (l + w - 1, t + h - 1), (l, t + h - 1)], fill=(240, 180, 0))
+    canvas.draw.rectangle([l + w // 2 - max(1, w // 16), t + h // 3, l + w // 2 + max(1, w // 16), t + h * 3 // 4],
+                          fill=(40, 40, 40))
+    templates.append({"name": "warning_icon", "box": [l, t, w, h]})
+    targets.append({"text": text["dialog_title"], "box": canvas.text((760, 384), text["dialog_title"], 26)})
+    targets.append({"text": text["dialog_body"], "box": canvas.text((760, 440), text["dialog_body"], 17, (90, 90, 90))})
+    for i, label in enumerate(text["buttons"]):
+        left = 760 + i * 160
+        canvas.rect((left, 560, 140, 48), fill=(7, 193, 96) if i == 0 else (235, 235, 235))
+        color = (255, 255, 255) if i == 0 else (20, 20, 20)
+        targets.append({"text": label, "box": canvas.text((left + 24, 570), label, 19, color)})
+    return targets, templates
+
+
+SCENE_BUILDERS = {"chat_list": _chat_list, "dialog": _dialog}
+
+
+def generate_corpus(directory, resolutions=tuple(RESOLUTIONS), langs=LANGS, scenes=SCENES, font=None, seed=7):
+    """
+    Renders a synthetic corpus into directory (frames, template crops and
+    manifest.json) and returns the manifest. Same arguments, same pixels.
+    """
+    os.makedirs(os.path.join(directory, "templates"), exist_ok=True)
+    screens = []
+    for scene in scenes:
+        for resolution in resolutions:
+            for lang in langs:
+                rng = random.Random(f"{seed}:{scene}:{lang}")
+                font_path = font or find_font(lang)
+                canvas = _Canvas(RESOLUTIONS[resolution], font_path)
+                targets, templates = SCENE_BUILDERS[scene](canvas, TEXT[lang], rng)
+                name = f"{scene}_{resolution}_{lang}"
+                canvas.image.save(os.path.join(directory, f"{name}.png"))
+                for template in templates:
+                    l, t, w, h = template["box"]
+                    template["file"] = f"templates/{name}_{template['name']}.png"
+                    canvas.image.crop((l, t, l + w, t + h)).save(os.path.join(directory, template["file"]))
+                screens.append({"frame": f"{name}.png", "scene": scene, "resolution": resolution, "lang": lang,
+                                "font": os.path.basename(font_path) if font_path else "default",
+                                "targets": targets, "templates": templates})
+    manifest = {"generator": "synthetic", "seed": seed, "screens": screens}
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+        return json.load(f)
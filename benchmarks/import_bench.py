@@ -0,0 +1,140 @@
+"""
+Cold start benchmark for the desktop_automation package and CLI.
+
+每个场景都在新的解释器进程中运行多次，记录墙钟时间的中位数/最小值 (减去空解释器的启动时间)，
+并用 -X importtime 检查哪些重量级依赖 (pyautogui、PIL、numpy、pytesseract ...) 被加载了。
+非视觉命令 (wait、start_task_log、end_task_with_verdict) 不应加载它们。
+
+用法:
+    python benchmarks/import_bench.py --output import_bench.json
+    python benchmarks/import_bench.py --baseline import_bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'src'))
+
+HEAVY_MODULES = ("pyautogui", "PIL.Image", "numpy", "cv2", "pytesseract", "tesserocr", "mss")
+
+# name -> python arguments (run with src/ on PYTHONPATH)
+SCENARIOS = {
+    "import_package": ["-c", "import desktop_automation"],
+    "import_core": ["-c", "import desktop_automation.core"],
+    "cli_help": ["-m", "desktop_automation.cli", "--help"],
+    "cli_wait": ["-m", "desktop_automation.cli", "--no_daemon", "wait", "--seconds", "0"],
+    "cli_start_task_log": ["-m", "desktop_automation.cli", "--no_daemon", "start_task_log"],
+}
+
+
+def _environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR + os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else SRC_DIR
+    env["DESKTOP_AUTOMATION_NO_DAEMON"] = "1"
+    return env
+
+
+def _time_run(args, env, cwd):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable] + args, env=env, cwd=cwd,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed: {completed.stderr.decode(errors='replace')[-500:]}")
+    return elapsed
+
+
+def _imported_modules(args, env, cwd):
+    """Returns ({module: cumulative_us}) from one run under -X importtime."""
+    completed = subprocess.run([sys.executable, "-X", "importtime"] + args, env=env, cwd=cwd,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    modules = {}
+    for line in completed.stderr.decode(errors='replace').splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) == 3 and parts[1].isdigit():
+            modules[parts[2]] = int(parts[1])
+    return modules
+
+
+def run_benchmark(runs=7, scenarios=None):
+    """Times every scenario in fresh interpreters and returns the result dictionary."""
+    scenarios = scenarios or list(SCENARIOS)
+    with tempfile.TemporaryDirectory() as workdir:     # start_task_log writes logs/ here
+        env = _environment()
+        _time_run(["-c", "pass"], env, workdir)         # warm the OS file cache
+        interpreter = statistics.median(_time_run(["-c", "pass"], env, workdir) for _ in range(runs))
+        results = {}
+        for name in scenarios:
+            args = SCENARIOS[name]
+            _time_run(args, env, workdir)               # first run compiles bytecode
+            samples = [_time_run(args, env, workdir) for _ in range(runs)]
+            modules = _imported_modules(args, env, workdir)
+            median = statistics.median(samples)
+            results[name] = {
+                "median_ms": round(median, 2),
+                "min_ms": round(min(samples), 2),
+                "max_ms": round(max(samples), 2),
+                "over_interpreter_ms": round(median - interpreter, 2),
+                "package_import_ms": round(modules.get("desktop_automation", 0) / 1000, 2),
+                "heavy_modules": [m for m in HEAVY_MODULES if m in modules],
+            }
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "runs": runs,
+        "interpreter_ms": round(interpreter, 2),
+        "scenarios": results,
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+    }
+
+
+def compare_results(current, baseline, tolerance=0.25):
+    """Returns regressions: scenarios whose time over the interpreter grew beyond tolerance, or new heavy imports."""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if now["over_interpreter_ms"] > max(before["over_interpreter_ms"], 1.0) * (1 + tolerance):
+            regressions.append(f"{name}: {before['over_interpreter_ms']} ms -> {now['over_interpreter_ms']} ms")
+        added = sorted(set(now["heavy_modules"]) - set(before["heavy_modules"]))
+        if added:
+            regressions.append(f"{name}: now imports {', '.join(added)}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start time of desktop_automation commands.")
+    parser.add_argument('--runs', type=int, default=7, help='Timed runs per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated scenarios to run')
+    parser.add_argument('--output', default=None, help='Write the JSON result to this file')
+    parser.add_argument('--baseline', default=None, help='Earlier result to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown versus the baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.runs, args.scenarios.split(','))
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+
+    output_json = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output_json)
+    print(output_json)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
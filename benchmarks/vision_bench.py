@@ -0,0 +1,253 @@
+"""
+Vision pipeline benchmark over a corpus of recorded screens.
+
+不依赖真实屏幕：截图来源切换为 ReplaySource，按顺序把语料中的每一帧交给视觉函数，
+测量三个阶段并输出机器可读的 JSON：
+- ocr       整帧OCR (每次清空缓存，测冷启动)
+- lookup    find_text_on_screen (OCR结果已缓存时的查找开销) 及命中率
+- template  find_image_on_screen 模板匹配延迟及命中率
+每个阶段报告次数、吞吐量 (次/秒)、p50/p95/max 延迟、命中率，并按分辨率细分。
+--baseline 与之前的结果比较，p95 变慢超过容差或命中率下降时以退出码 1 结束。
+--preprocess 选择OCR前的预处理预设，结果中附带各预处理阶段的耗时。
+
+用法:
+    python benchmarks/vision_bench.py --generate            # 合成语料并运行
+    python benchmarks/vision_bench.py --corpus my_screens --output bench.json
+    python benchmarks/vision_bench.py --baseline bench.json --tolerance 0.2
+    python benchmarks/vision_bench.py --preprocess off --output off.json      # 与默认预处理对比
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+from desktop_automation import core
+from desktop_automation.screen_source import ReplaySource, load_frame
+from desktop_automation.ocr_engine import tesseract_version
+from desktop_automation import template_match
+from desktop_automation.preprocess import get_preprocess_stats, reset_preprocess_stats
+
+from corpus import generate_corpus, load_manifest
+
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "corpus")
+STAGES = ("ocr", "lookup", "template")
+HIT_MARGIN = 4      # pixels (at 1080p) a hit may fall outside the expected box
+
+
+def _percentile(values, fraction):
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(samples, hits=None):
+    """samples: [(milliseconds, resolution)]. hits: [bool] for accuracy."""
+    if not samples:
+        return {"count": 0}
+    values = sorted(ms for ms, _ in samples)
+    total = sum(values)
+    result = {
+        "count": len(values),
+        "throughput_per_s": round(len(values) / (total / 1000), 2) if total else None,
+        "mean_ms": round(total / len(values), 3),
+        "p50_ms": round(_percentile(values, 0.50), 3),
+        "p95_ms": round(_percentile(values, 0.95), 3),
+        "max_ms": round(values[-1], 3),
+    }
+    if hits is not None:
+        result["hits"] = sum(hits)
+        result["accuracy"] = round(sum(hits) / len(hits), 4) if hits else None
+    by_resolution = {}
+    for ms, resolution in samples:
+        by_resolution.setdefault(resolution, []).append(ms)
+    result["by_resolution"] = {
+        res: {"count": len(v), "p50_ms": round(_percentile(sorted(v), 0.50), 3),
+              "p95_ms": round(_percentile(sorted(v), 0.95), 3)}
+        for res, v in sorted(by_resolution.items())
+    }
+    return result
+
+
+def _inside(point, box, margin):
+    x, y = point
+    l, t, w, h = box
+    return l - margin <= x <= l + w + margin and t - margin <= y <= t + h + margin
+
+
+def _margin(frame):
+    return HIT_MARGIN * frame.size[0] / 1920
+
+
+def bench_ocr(screens, frames, repeat):
+    samples = []
+    for screen, frame in zip(screens, frames):
+        for _ in range(repeat):
+            core.clear_frame_cache()
+            start = time.perf_counter()
+            core._run_ocr(frame, "data")
+            samples.append(((time.perf_counter() - start) * 1000, screen["resolution"]))
+    return summarize(samples)
+
+
+def bench_lookup(screens, frames, source, repeat):
+    samples, hits, misses = [], [], []
+    for index, (screen, frame) in enumerate(zip(screens, frames)):
+        source.seek(index)
+        core.clear_frame_cache()
+        core._text_index(frame)      # prime: lookups below measure index + search, not OCR
+        for target in screen.get("targets", []):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                found = core.find_text_on_screen(target["text"])
+                samples.append(((time.perf_counter() - start) * 1000, screen["resolution"]))
+                hit = bool(found) and _inside((found["x"], found["y"]), target["box"], _margin(frame))
+                hits.append(hit)
+            if not hit:
+                misses.append({"frame": screen["frame"], "text": target["text"]})
+    result = summarize(samples, hits)
+    result["misses"] = misses
+    return result
+
+
+def bench_template(screens, frames, source, corpus_dir, repeat):
+    samples, hits, misses = [], [], []
+    for index, (screen, frame) in enumerate(zip(screens, frames)):
+        source.seek(index)
+        for template in screen.get("templates", []):
+            with open(os.path.join(corpus_dir, template["file"]), 'rb') as f:
+                encoded = base64.b64encode(f.read()).decode('ascii')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                found = core.find_image_on_screen(template["name"], encoded)
+                samples.append(((time.perf_counter() - start) * 1000, screen["resolution"]))
+                hit = bool(found) and _inside((found["x"], found["y"]), template["box"], _margin(frame))
+                hits.append(hit)
+            if not hit:
+                misses.append({"frame": screen["frame"], "template": template["name"]})
+    result = summarize(samples, hits)
+    result["misses"] = misses
+    return result
+
+
+def _environment():
+    try:
+        tesseract = tesseract_version()
+    except Exception:
+        tesseract = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": template_match.np is not None,
+        "opencv": template_match.cv2 is not None,
+        "tesseract": tesseract,
+    }
+
+
+def run_benchmark(corpus_dir, stages=STAGES, repeat=3, preprocess=None):
+    """
+    Runs the selected stages over a corpus and returns the result dictionary.
+    The corpus replay source stays the active screen source afterwards.
+    preprocess selects the OCR preprocessing preset (off/fast/accurate).
+    """
+    manifest = load_manifest(corpus_dir)
+    screens = manifest["screens"]
+    paths = [os.path.join(corpus_dir, s["frame"]) for s in screens]
+    frames = [load_frame(p) for p in paths]
+    source = ReplaySource(paths, advance="manual")
+    core.set_screen_source(source)
+    preprocessing = core.configure_ocr_preprocessing(preprocess)
+    reset_preprocess_stats()
+
+    results = {"stages": {}}
+    ocr_error = None
+    if "ocr" in stages or "lookup" in stages:
+        try:
+            core._run_ocr(frames[0], "data")
+        except Exception as e:
+            ocr_error = f"OCR unavailable: {e}"
+    for stage in stages:
+        if stage in ("ocr", "lookup") and ocr_error:
+            results["stages"][stage] = {"skipped": ocr_error}
+        elif stage == "ocr":
+            results["stages"][stage] = bench_ocr(screens, frames, repeat)
+        elif stage == "lookup":
+            results["stages"][stage] = bench_lookup(screens, frames, source, repeat)
+        elif stage == "template":
+            results["stages"][stage] = bench_template(screens, frames, source, corpus_dir, repeat)
+        else:
+            raise ValueError(f"Unknown stage '{stage}'. Available: {', '.join(STAGES)}")
+
+    results.update({
+        "timestamp": datetime.now().isoformat(),
+        "corpus": {"path": corpus_dir, "screens": len(screens),
+                   "targets": sum(len(s.get("targets", [])) for s in screens),
+                   "templates": sum(len(s.get("templates", [])) for s in screens),
+                   "generator": manifest.get("generator", "recorded")},
+        "repeat": repeat,
+        "preprocess": preprocessing["config"]["name"],
+        "preprocess_stages": get_preprocess_stats(),
+        "environment": _environment(),
+    })
+    return results
+
+
+def compare_results(current, baseline, tolerance=0.2):
+    """Returns a list of regressions (p95 slower than tolerance allows, or lower accuracy)."""
+    regressions = []
+    for stage, now in current.get("stages", {}).items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before or "p95_ms" not in now or "p95_ms" not in before:
+            continue
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{stage}: p95 {before['p95_ms']} ms -> {now['p95_ms']} ms")
+        if now.get("accuracy") is not None and before.get("accuracy") is not None \
+                and now["accuracy"] < before["accuracy"]:
+            regressions.append(f"{stage}: accuracy {before['accuracy']} -> {now['accuracy']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark OCR, text lookup and template matching on recorded screens.")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='Corpus directory with manifest.json')
+    parser.add_argument('--generate', action='store_true', help='(Re)generate the synthetic corpus first')
+    parser.add_argument('--resolutions', default='1080p,1440p,4k', help='Resolutions for --generate')
+    parser.add_argument('--langs', default='zh,en', help='Languages for --generate')
+    parser.add_argument('--font', default=None, help='Font file for --generate (default: first installed candidate)')
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma separated stages to run')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per item')
+    parser.add_argument('--output', default=None, help='Write the JSON result to this file')
+    parser.add_argument('--baseline', default=None, help='Earlier result to compare against')
+    parser.add_argument('--preprocess', default=None, choices=['off', 'fast', 'accurate'], help='OCR preprocessing preset (compare runs with --baseline)')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown versus the baseline')
+    args = parser.parse_args(argv)
+
+    if args.generate or not os.path.exists(os.path.join(args.corpus, "manifest.json")):
+        generate_corpus(args.corpus, resolutions=args.resolutions.split(','), langs=args.langs.split(','),
+                        font=args.font)
+
+    results = run_benchmark(args.corpus, args.stages.split(','), args.repeat, args.preprocess)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+
+    output_json = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output_json)
+    sys.stdout.buffer.write(output_json.encode('utf-8'))
+    sys.stdout.buffer.write(b'\n')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
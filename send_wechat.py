@@ -3,20 +3,24 @@
 """
 简单的微信消息发送工具
 用法: python send_wechat.py "联系人名字" "消息内容"
+批量: python send_wechat.py --batch contacts.csv [--rate_limit 20]
+      (CSV 表头为 contact_name,message_content；中断后重新运行会从检查点继续)
 """
 import sys
 import os
 import json
+import argparse
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from desktop_automation.cli import _execute_actions
+from desktop_automation.workflow_compiler import load_workflow
+
+WORKFLOW_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "src", "desktop_automation", "successful_workflows", "send_wechat_parameterized.json")
 
 def send_wechat_message(contact_name, message_content):
     """发送微信消息"""
-    workflow_file = "src/desktop_automation/successful_workflows/send_wechat_parameterized.json"
-    
-    with open(workflow_file, 'r', encoding='utf-8') as f:
-        action_sequence = json.load(f)
+    # 编译好的执行计划按文件修改时间缓存，重复发送时不再解析和校验工作流
+    workflow = load_workflow(WORKFLOW_FILE)
     
     workflow_params = {
         "contact_name": contact_name,
@@ -24,13 +28,42 @@ def send_wechat_message(contact_name, message_content):
     }
     
     print(f"正在给 {contact_name} 发送消息...")
-    _execute_actions(action_sequence, None, workflow_params)
+    workflow.run(None, workflow_params)
     print("消息发送完成!")
 
+def send_wechat_batch(batch_file, rate_limit=None, retries=0, backoff=5.0, checkpoint_file=None, report_file=None,
+                      fresh=False):
+    """按 CSV/JSONL 中的每一行依次发送，返回每条消息的结果报告 (fresh: 忽略检查点，全部重新发送)"""
+    from desktop_automation.batch_runner import run_workflow_batch
+    workflow = load_workflow(WORKFLOW_FILE)
+    return run_workflow_batch(workflow, batch_file, checkpoint_file=checkpoint_file, report_file=report_file,
+                              rate_limit=rate_limit, retries=retries, backoff=backoff, fresh=fresh)
+
+def _main_batch(argv):
+    parser = argparse.ArgumentParser(description="批量发送微信消息")
+    parser.add_argument('--batch', required=True, help='CSV/JSONL 文件，每行包含 contact_name 和 message_content')
+    parser.add_argument('--rate_limit', type=float, default=None, help='每分钟最多发送的消息数')
+    parser.add_argument('--retries', type=int, default=0, help='失败后的重试次数 (默认不重试：重试会从第一步重新执行，可能重复发送)')
+    parser.add_argument('--backoff', type=float, default=5.0, help='第一次重试前等待的秒数 (之后每次翻倍)')
+    parser.add_argument('--checkpoint', default=None, help='检查点文件 (默认: <batch>.checkpoint.jsonl)')
+    parser.add_argument('--fresh', action='store_true', help='忽略检查点，把每一行都重新发送一遍')
+    parser.add_argument('--report', default=None, help='把每条消息的结果写入这个JSON文件')
+    args = parser.parse_args(argv)
+
+    report = send_wechat_batch(args.batch, args.rate_limit, args.retries, args.backoff, args.checkpoint, args.report,
+                               args.fresh)
+    summary = {k: report[k] for k in ("total", "skipped", "succeeded", "failed", "invalid", "elapsed_s")}
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0 if not report["failed"] and not report["invalid"] else 1
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].startswith('--'):
+        sys.exit(_main_batch(sys.argv[1:]))
+
     if len(sys.argv) != 3:
         print("用法: python send_wechat.py \"联系人名字\" \"消息内容\"")
         print("示例: python send_wechat.py \"张三\" \"你好，这是自动发送的消息\"")
+        print("批量: python send_wechat.py --batch contacts.csv")
         sys.exit(1)
     
     contact_name = sys.argv[1]
@@ -31,6 +31,7 @@ setup(
         "pyautogui>=0.9.54",
         "pytesseract>=0.3.10",
         "Pillow>=8.0.0",
+        "numpy>=1.20",
     ],
     extras_require={
         "dev": [
@@ -39,6 +40,15 @@ setup(
             "black",
             "flake8",
         ],
+        "capture": [
+            "mss>=9.0",
+        ],
+        "ocr": [
+            "tesserocr>=2.6",
+        ],
+        "sessions": [
+            "python-xlib>=0.33; sys_platform == 'linux'",
+        ],
         "gui": [
             "tkinter; sys_platform != 'darwin'",
         ],
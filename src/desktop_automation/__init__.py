@@ -12,25 +12,24 @@ Desktop Automation Framework
 __version__ = "1.0.0"
 __author__ = "Desktop Automation Team"
 
-from .core import (
-    # 基础功能
-    take_screenshot,
-    move_and_click,
-    type_text,
-    press_hotkey,
-    wait,
-    
-    # 智能视觉功能
-    analyze_screen_state,
-    find_text_on_screen,
-    smart_click_text,
-    wait_for_text_appear,
-    verify_operation_result,
-    
-    # 日志功能
-    start_task_log,
-    end_task_with_verdict,
-)
+# 公开函数在第一次访问时才导入对应模块 (PEP 562)，
+# 因此 `import desktop_automation` 和 cli 的轻量命令不会加载 core 及其依赖
+_PROFILING_EXPORTS = ('profile_task_log', 'export_trace')
+
+
+def __getattr__(name):
+    if name in __all__:
+        import importlib
+        module = importlib.import_module('.profiling' if name in _PROFILING_EXPORTS else '.core', __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
     # 基础功能
@@ -43,11 +42,43 @@ __all__ = [
     # 智能功能
     'analyze_screen_state',
     'find_text_on_screen',
+    'find_all_text_on_screen',
     'smart_click_text', 
     'wait_for_text_appear',
     'verify_operation_result',
+    'register_regions',
+    'regions_scope',
+    'find_image_on_screen',
+    'find_and_click_image',
+    
+    # 输入引擎
+    'send_input_batch',
+    'set_motion_profile',
+    'set_input_backend',
     
     # 日志功能
     'start_task_log',
     'end_task_with_verdict',
+    'flush_task_log',
+    
+    # 缓存
+    'configure_frame_cache',
+    'clear_frame_cache',
+    'configure_location_cache',
+    'configure_frame_buffers',
+    
+    # 截图来源
+    'set_screen_source',
+    'get_screen_source',
+    'benchmark_screen_capture',
+    
+    # OCR引擎
+    'configure_ocr_engine',
+    'check_ocr_engine',
+    'probe_ocr_configuration',
+    'configure_ocr_preprocessing',
+    
+    # 性能分析
+    'profile_task_log',
+    'export_trace',
 ]
\ No newline at end of file
@@ -0,0 +1,393 @@
+"""
+Asyncio API for the automation core.
+
+core.py 的函数都是阻塞的：wait、wait_for_text_appear、smart_click_text 的重试都会占住调用线程，
+编排多个目标的代理无法一边等待一边截图识别下一个目标，也无法同时等待几种可能的结果或取消卡住的等待。
+这里提供对应的协程：
+- 截图、OCR、模板匹配在 vision 线程池中执行，鼠标键盘输入在单线程的 input 执行器中按提交顺序执行
+- 等待在事件循环里完成 (asyncio.sleep)，随时可以取消；timeout 到期返回 None/False，与 core 一致
+- wait_any / wait_all 同时等待多个文字或图像条件 (text_appears、text_disappears、image_appears)：
+  同一区域的条件共用一次截图和一次OCR，画面签名没有变化时不重复识别
+当前会话 (sessions.py) 随调用进入执行器线程。取消只停止等待本身，已经提交到执行器的一次截图/OCR会做完。
+
+    async def send():
+        await aio.smart_click_text("发送")
+        index, hit = await aio.wait_any(aio.text_appears("已发送"), aio.text_appears("发送失败"), timeout=10)
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import core
+    from .regions import resolve_region
+    from .change_detect import (frame_signature, array_signature, signature_distance, CHANGE_THRESHOLD,
+                                MIN_INTERVAL, MAX_INTERVAL, BACKOFF)
+except ImportError:
+    import core
+    from regions import resolve_region
+    from change_detect import (frame_signature, array_signature, signature_distance, CHANGE_THRESHOLD,
+                               MIN_INTERVAL, MAX_INTERVAL, BACKOFF)
+
+# --- Configuration ---
+VISION_WORKERS = 4          # concurrent capture/OCR/template jobs
+RECHECK_INTERVAL = 2.0      # re-run the checks this often even if the signature looks unchanged
+RETRY_WAIT = 1.0            # smart_click_text waits up to this long for the text between attempts
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(kind):
+    with _executors_lock:
+        executor = _executors.get(kind)
+        if executor is None:
+            workers = VISION_WORKERS if kind == "vision" else 1
+            executor = _executors[kind] = ThreadPoolExecutor(max_workers=workers,
+                                                             thread_name_prefix=f"aio-{kind}")
+        return executor
+
+
+def configure_executors(vision_workers=None):
+    """Resizes the vision pool (running jobs finish on the old one)."""
+    global VISION_WORKERS
+    if vision_workers is not None:
+        VISION_WORKERS = vision_workers
+        with _executors_lock:
+            old = _executors.pop("vision", None)
+        if old is not None:
+            old.shutdown(wait=False)
+    return {"vision_workers": VISION_WORKERS, "input_workers": 1}
+
+
+def shutdown_executors(wait=True):
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+def _submit(kind, func, *args, **kwargs):
+    # copy the context so the session and profiling spans follow the call into the thread
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return asyncio.get_running_loop().run_in_executor(_executor(kind), call)
+
+
+async def run_vision(func, *args, **kwargs):
+    """Runs a blocking capture/OCR/matching call in the vision pool."""
+    return await _submit("vision", func, *args, **kwargs)
+
+
+async def run_input(func, *args, **kwargs):
+    """Runs a blocking input call on the input thread (inputs keep their order)."""
+    return await _submit("input", func, *args, **kwargs)
+
+
+# --- Conditions ---
+
+class Condition:
+    """
+    Something to wait for in (a region of) the screen. check(frame, box)
+    runs in the vision pool on a frame captured from box and returns a
+    truthy result once the condition holds.
+    """
+
+    def __init__(self, region=None):
+        self.region = region
+
+    def check(self, frame, box):
+        raise NotImplementedError
+
+    async def until(self, timeout=None):
+        """The check's result as soon as it holds, or None after timeout seconds."""
+        found = await wait_any(self, timeout=timeout)
+        return found[1] if found else None
+
+
+class TextCondition(Condition):
+    """target_text is on screen (present=True) or gone (present=False)."""
+
+    def __init__(self, target_text, region=None, match="casefold", present=True):
+        super().__init__(region)
+        self.target_text = target_text
+        self.match = match
+        self.present = present
+
+    def check(self, frame, box):
+        hits = core._search_frame(frame, box, self.target_text, self.match, limit=1)
+        if self.present:
+            return hits[0] if hits else None
+        return not hits
+
+    def __repr__(self):
+        return f"{'text_appears' if self.present else 'text_disappears'}({self.target_text!r})"
+
+
+class ImageCondition(Condition):
+    """A base64 PNG template is on screen; the result is the match dictionary."""
+
+    def __init__(self, model_analysis_base64, region=None, confidence=0.9, multi_scale=False, dpi_scale=1.0,
+                 description="image"):
+        super().__init__(region)
+        self.model_analysis_base64 = model_analysis_base64
+        self.confidence = confidence
+        self.multi_scale = multi_scale
+        self.dpi_scale = dpi_scale
+        self.description = description
+
+    def check(self, frame, box):
+        return core._match_image(frame, box, self.model_analysis_base64, self.confidence,
+                                 self.multi_scale, self.dpi_scale)
+
+    def __repr__(self):
+        return f"image_appears({self.description!r})"
+
+
+def text_appears(target_text, region=None, match="casefold"):
+    return TextCondition(target_text, region, match)
+
+
+def text_disappears(target_text, region=None, match="casefold"):
+    return TextCondition(target_text, region, match, present=False)
+
+
+def image_appears(model_analysis_base64, region=None, confidence=0.9, multi_scale=False, dpi_scale=1.0,
+                  description="image"):
+    return ImageCondition(model_analysis_base64, region, confidence, multi_scale, dpi_scale, description)
+
+
+def _capture_if_changed(box, reference):
+    """(frame or None when it still matches reference, signature); runs in the vision pool."""
+    if core._frame_buffers_enabled():
+        with core._capture_array(box) as buffer:
+            signature = array_signature(buffer.array)
+            changed = signature_distance(signature, reference) > CHANGE_THRESHOLD
+            return (buffer.image() if changed else None), signature
+    frame = core._capture_screen(box)
+    signature = frame_signature(frame)
+    return (frame if signature_distance(signature, reference) > CHANGE_THRESHOLD else None), signature
+
+
+def _probe(region, conditions, reference):
+    """One capture of region checked against every condition; results are None when the frame was unchanged."""
+    box = resolve_region(region)
+    frame, signature = _capture_if_changed(box, reference)
+    if frame is None:
+        return signature, None
+    return signature, [condition.check(frame, box) for condition in conditions]
+
+
+async def _watch(conditions, indices, satisfied, want_all):
+    """
+    Polls conditions[indices] (all on one region) with adaptive backoff until
+    one of them (or, with want_all, each of them) has held; results go to satisfied.
+    """
+    loop = asyncio.get_running_loop()
+    region = conditions[indices[0]].region
+    reference = None
+    checked_at = loop.time()
+    interval = MIN_INTERVAL
+    while True:
+        pending = [i for i in indices if i not in satisfied]
+        if loop.time() - checked_at > RECHECK_INTERVAL:
+            reference = None    # small changes can stay under the signature threshold
+        reference, results = await run_vision(_probe, region, [conditions[i] for i in pending], reference)
+        if results is None:
+            interval = min(MAX_INTERVAL, interval * BACKOFF)
+        else:
+            checked_at = loop.time()
+            interval = MIN_INTERVAL
+            for index, result in zip(pending, results):
+                if result:
+                    satisfied[index] = result
+            if all(i in satisfied for i in indices) if want_all else any(i in satisfied for i in indices):
+                return
+        await asyncio.sleep(interval)
+
+
+def _start(items, satisfied, want_all):
+    """Tasks for the items: one watcher per region for Conditions, the awaitables as they are."""
+    groups = {}
+    tasks = {}
+    for index, item in enumerate(items):
+        if isinstance(item, Condition):
+            key = json.dumps(item.region, sort_keys=True, default=str)
+            groups.setdefault(key, []).append(index)
+        else:
+            tasks[asyncio.ensure_future(item)] = [index]
+    for indices in groups.values():
+        tasks[asyncio.ensure_future(_watch(items, indices, satisfied, want_all))] = indices
+    return tasks
+
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _log_wait(log_file_path, action, items, timeout, found):
+    params = {"conditions": [repr(item) for item in items], "timeout": timeout}
+    status = "success" if found is not None else "timeout"
+    core._log_action(log_file_path, action, params, status, "Conditions met" if found is not None
+                     else f"Conditions not met within {timeout} seconds")
+
+
+async def wait_any(*items, timeout=None, log_file_path=None):
+    """
+    Waits for the first of several Conditions (or other awaitables, e.g.
+    asyncio.sleep(...) or another action) to complete. Returns
+    (index, result) of the first one, or None after timeout seconds. The
+    others are cancelled.
+    """
+    satisfied = {}
+    tasks = _start(items, satisfied, want_all=False)
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finished = {}
+        for task in done:
+            value = task.result()   # re-raises a failed check
+            for index in tasks[task]:
+                if not isinstance(items[index], Condition):
+                    finished[index] = value
+                elif index in satisfied:
+                    finished[index] = satisfied[index]
+        found = min(finished.items()) if finished else None
+    finally:
+        await _cancel(tasks)
+    _log_wait(log_file_path, "wait_any", items, timeout, found)
+    return found
+
+
+async def wait_all(*items, timeout=None, log_file_path=None):
+    """
+    Waits until every Condition has held (not necessarily at the same moment)
+    and every awaitable has finished. Returns their results in order, or
+    None after timeout seconds.
+    """
+    satisfied = {}
+    tasks = _start(items, satisfied, want_all=True)
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            value = task.result()
+            for index in tasks[task]:
+                if not isinstance(items[index], Condition):
+                    satisfied[index] = value
+        results = None if pending else [satisfied[index] for index in range(len(items))]
+    finally:
+        await _cancel(tasks)
+    _log_wait(log_file_path, "wait_all", items, timeout, results)
+    return results
+
+
+# --- Actions ---
+
+def _offload(name, kind):
+    func = getattr(core, name)
+
+    @functools.wraps(func)
+    async def action(*args, **kwargs):
+        return await _submit(kind, func, *args, **kwargs)
+    action.__doc__ = f"Async core.{name}, run in the {kind} executor.\n\n{func.__doc__ or ''}"
+    return action
+
+
+analyze_screen_state = _offload("analyze_screen_state", "vision")
+find_text_on_screen = _offload("find_text_on_screen", "vision")
+find_all_text_on_screen = _offload("find_all_text_on_screen", "vision")
+find_image_on_screen = _offload("find_image_on_screen", "vision")
+ocr_from_screen_area = _offload("ocr_from_screen_area", "vision")
+take_screenshot = _offload("take_screenshot", "vision")
+move_and_click = _offload("move_and_click", "input")
+find_and_click_image = _offload("find_and_click_image", "input")
+type_text = _offload("type_text", "input")
+paste_text = _offload("paste_text", "input")
+press_hotkey = _offload("press_hotkey", "input")
+send_input_batch = _offload("send_input_batch", "input")
+
+
+async def wait(seconds, log_file_path=None):
+    """Pauses this coroutine (not the thread) for seconds; cancellable."""
+    params = {"seconds": seconds}
+    await asyncio.sleep(seconds)
+    result = f"Waited for {seconds} seconds."
+    core._log_action(log_file_path, "wait", params, "success", result)
+    return result
+
+
+async def wait_for_text_appear(target_text, timeout=10, region=None, match="casefold", log_file_path=None):
+    """Returns True as soon as target_text is on screen, False after timeout seconds."""
+    params = {"target_text": target_text, "timeout": timeout, "region": region, "match": match}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        found = await text_appears(target_text, region, match).until(timeout)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        core._log_action(log_file_path, "wait_for_text_appear", params, "error", f"Error waiting for text: {e}")
+        return False
+    if found:
+        result = f"Text '{target_text}' appeared after {loop.time() - start:.1f} seconds"
+        core._log_action(log_file_path, "wait_for_text_appear", params, "success", result)
+        return True
+    result = f"Text '{target_text}' did not appear within {timeout} seconds"
+    core._log_action(log_file_path, "wait_for_text_appear", params, "timeout", result)
+    return False
+
+
+async def verify_operation_result(expected_text, timeout=5, region=None, log_file_path=None):
+    """True once expected_text shows up within timeout seconds."""
+    params = {"expected_text": expected_text, "timeout": timeout, "region": region}
+    if await wait_for_text_appear(expected_text, timeout, region, log_file_path=log_file_path):
+        result = f"Operation verified: '{expected_text}' found on screen"
+        core._log_action(log_file_path, "verify_operation_result", params, "success", result)
+        return True
+    result = f"Operation verification failed: '{expected_text}' not found within {timeout} seconds"
+    core._log_action(log_file_path, "verify_operation_result", params, "failed", result)
+    return False
+
+
+def _click(x, y, button):
+    core.get_input_engine().click(x, y, button)
+
+
+async def smart_click_text(target_text, button='left', max_retries=3, region=None, match="casefold", use_cache=True,
+                           log_file_path=None):
+    """
+    core.smart_click_text without blocking: the search runs in the vision
+    pool, the click on the input thread, and between attempts the coroutine
+    waits (up to RETRY_WAIT seconds) for the text to show up.
+    """
+    params = {"target_text": target_text, "button": button, "max_retries": max_retries, "region": region,
+              "match": match}
+    use_cache = use_cache and core._location_cache.enabled
+    for attempt in range(max_retries):
+        last = attempt == max_retries - 1
+        try:
+            location = await run_vision(core._find_click_target, target_text, region, match,
+                                        use_cache and attempt == 0, use_cache, log_file_path)
+            if location:
+                await run_input(_click, location['x'], location['y'], button)
+                result = core._clicked_message(target_text, location, attempt)
+                core._log_action(log_file_path, "smart_click_text", params, "success", result)
+                return result
+            if last:
+                result = f"Failed to find text '{target_text}' after {max_retries} attempts"
+                core._log_action(log_file_path, "smart_click_text", params, "not_found", result)
+                return result
+            await text_appears(target_text, region, match).until(RETRY_WAIT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if last:
+                result = f"Error clicking text '{target_text}': {e}"
+                core._log_action(log_file_path, "smart_click_text", params, "error", result)
+                return result
+            await asyncio.sleep(RETRY_WAIT)
@@ -0,0 +1,287 @@
+"""
+Batch fan-out: run one compiled workflow for many parameter sets.
+
+send_wechat.py 每个进程只给一个联系人发一条消息，群发给 N 个联系人就要冷启动 N 次。
+BatchRunner 把 CSV/JSONL 文件中的每一行参数当作一个任务：
+- 工作流只编译一次，任务依次占用桌面 (鼠标、键盘、屏幕同一时间只能给一个任务用)
+- 非UI工作和UI流水线并行：后台线程提前校验后面几个任务的参数、解码模板图片，
+  任务日志本来就由后台线程写入 (见 task_logger.py)
+- 限速 (每分钟最多 N 个任务)、失败重试 (默认关闭，指数退避；配合 StepMemo 从失败的步骤继续)
+- 每个任务结束后追加到检查点文件，中断后重新运行会跳过已成功的任务
+- 返回每个任务的结果报告 (状态、尝试次数、耗时、错误)
+- 传入多个会话 (sessions.py，每个会话一个显示器) 时，任务分散到各个会话上同时执行
+"""
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from . import core as da
+    from .workflow_compiler import _step_arguments
+    from .sessions import SessionPool
+except ImportError:
+    import core as da
+    from workflow_compiler import _step_arguments
+    from sessions import SessionPool
+
+# --- Configuration ---
+LOOKAHEAD = 2               # jobs prepared ahead of the one driving the desktop
+TEMPLATE_ACTIONS = ('find_image_on_screen', 'find_and_click_image')
+
+BatchJob = namedtuple('BatchJob', 'index job_id params')
+
+
+def load_param_sets(path):
+    """
+    Reads parameter sets from a .csv (header row = parameter names), .jsonl
+    (one object per line) or .json (list of objects) file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            return [dict(row) for row in csv.DictReader(f)]
+    if extension == '.jsonl':
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError(f"{path}:{number}: expected a JSON object")
+                    rows.append(row)
+        return rows
+    if extension == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError(f"{path}: expected a list of JSON objects")
+        return rows
+    raise ValueError(f"Unsupported batch file '{path}': use .csv, .jsonl or .json")
+
+
+def make_jobs(param_sets):
+    """
+    Numbers the parameter sets. job_id identifies a row by its content (plus
+    which occurrence of that content it is), so inserting or deleting rows
+    does not change the ids the checkpoint has for the others.
+    """
+    jobs = []
+    seen = {}
+    for index, params in enumerate(param_sets, 1):
+        digest = hashlib.blake2b(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8'),
+                                 digest_size=8).hexdigest()
+        seen[digest] = seen.get(digest, 0) + 1
+        jobs.append(BatchJob(index, f"{digest}#{seen[digest]}", params))
+    return jobs
+
+
+def read_checkpoint(path):
+    """Returns the job ids recorded as succeeded in a checkpoint file."""
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue        # a line cut short by a crash
+            if record.get("status") == "success":
+                done.add(record.get("job_id"))
+    return done
+
+
+class BatchRunner:
+    """
+    Runs a CompiledWorkflow once per parameter set.
+    rate_limit is the maximum number of job attempts per minute, retries the
+    number of extra attempts after a failure (default none), waiting
+    backoff * 2**n seconds (at most max_backoff) before attempt n + 1.
+    memo (a StepMemo) lets a retry resume at the step that failed; without
+    it a retry runs the whole workflow again, repeating steps such as a send
+    that already succeeded. fresh runs every job even when the checkpoint
+    records it as succeeded (results are still appended to it).
+    """
+
+    def __init__(self, workflow, log_file_path=None, rate_limit=None, retries=0, backoff=5.0,
+                 max_backoff=120.0, checkpoint_file=None, memo=None, fresh=False):
+        self.workflow = workflow
+        self.log_file_path = log_file_path
+        self.min_interval = 60.0 / rate_limit if rate_limit else 0.0
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.checkpoint_file = checkpoint_file
+        self.memo = memo
+        self.fresh = fresh
+        if self.retries and memo is None:
+            print(f"Warning: retries without a step memo re-run workflow '{workflow.name}' from the first step",
+                  file=sys.stderr)
+        self._last_start = None
+        self._throttle_lock = threading.Lock()
+        self._record_lock = threading.Lock()
+
+    def _prepare(self, job):
+        """Non-UI work for a job. Returns an error message when the job can't run at all."""
+        missing = self.workflow.parameters - set(job.params)
+        if missing:
+            return f"missing parameters: {', '.join(sorted(missing))}"
+        for step in self.workflow.steps:
+            if step.action in TEMPLATE_ACTIONS:
+                _, kwargs = _step_arguments(step, job.params)
+                try:
+                    da._template_match().get_template(kwargs['model_analysis_base64'])
+                except Exception:
+                    pass        # the step itself reports a bad template
+        return None
+
+    def _throttle(self):
+        # One rate limit for all sessions: each attempt reserves the next free slot
+        with self._throttle_lock:
+            now = time.monotonic()
+            start_at = now
+            if self._last_start is not None and self.min_interval:
+                start_at = max(now, self._last_start + self.min_interval)
+            self._last_start = start_at
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def _run_job(self, job, log_file_path):
+        attempts, error = 0, None
+        run_id = uuid.uuid4().hex       # attempts of this job share it; other jobs never skip its sends
+        start = time.perf_counter()
+        while attempts <= self.retries:
+            if attempts:
+                time.sleep(min(self.backoff * 2 ** (attempts - 1), self.max_backoff))
+            attempts += 1
+            self._throttle()
+            try:
+                self.workflow.run(log_file_path, job.params, self.memo, run_id)
+                error = None
+                break
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"Job {job.index} attempt {attempts} failed: {error}", file=sys.stderr)
+        return {"index": job.index, "job_id": job.job_id, "params": job.params,
+                "status": "failed" if error else "success", "attempts": attempts,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3), "error": error}
+
+    def _invalid(self, job, problem):
+        return {"index": job.index, "job_id": job.job_id, "params": job.params,
+                "status": "invalid", "attempts": 0, "elapsed_ms": 0.0, "error": problem}
+
+    def _record(self, result, log_file_path, position, count):
+        entry = dict(result, finished_at=datetime.now().isoformat())
+        with self._record_lock:
+            if self.checkpoint_file:
+                # Written before the next job starts so a crash never repeats a finished send
+                with open(self.checkpoint_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            print(f"[{position}/{count}] job {result['index']}: {result['status']}"
+                  f" ({result['attempts']} attempt(s), {result['elapsed_ms'] / 1000:.1f} s)")
+        da._log_action(log_file_path, "workflow_batch_job",
+                       {"workflow": self.workflow.name, "index": result["index"]}, result["status"], result)
+
+    def _run_serial(self, pending):
+        """One desktop: the next jobs are prepared in the background while this one runs."""
+        results = []
+        interrupted = False
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-prepare") as prepare_pool:
+            prepared = [prepare_pool.submit(self._prepare, job) for job in pending[:LOOKAHEAD]]
+            try:
+                for position, job in enumerate(pending):
+                    if position + LOOKAHEAD < len(pending):
+                        prepared.append(prepare_pool.submit(self._prepare, pending[position + LOOKAHEAD]))
+                    problem = prepared[position].result()
+                    result = self._invalid(job, problem) if problem else self._run_job(job, self.log_file_path)
+                    self._record(result, self.log_file_path, position + 1, len(pending))
+                    results.append(result)
+            except KeyboardInterrupt:
+                interrupted = True
+                for future in prepared:
+                    future.cancel()
+        return results, interrupted
+
+    def _run_on_sessions(self, pending, sessions):
+        """Several displays: every session pulls the next job as soon as it is free."""
+        finished = []
+
+        def run_one(session, job):
+            problem = self._prepare(job)
+            log_file_path = session.log_file_path or self.log_file_path
+            result = self._invalid(job, problem) if problem else self._run_job(job, log_file_path)
+            result["session"] = session.name
+            with self._record_lock:
+                finished.append(result)
+                position = len(finished)
+            self._record(result, log_file_path, position, len(pending))
+            return result
+
+        try:
+            return SessionPool(sessions).map(run_one, pending), False
+        except KeyboardInterrupt:
+            return list(finished), True
+
+    def run(self, param_sets, sessions=None):
+        """
+        Runs every job not yet recorded as succeeded in the checkpoint and
+        returns the report. sessions (AutomationSession list) spreads the jobs
+        over several displays.
+        """
+        jobs = make_jobs(param_sets)
+        done = set() if self.fresh else read_checkpoint(self.checkpoint_file)
+        pending = [job for job in jobs if job.job_id not in done]
+        if len(pending) < len(jobs):
+            print(f"Skipping {len(jobs) - len(pending)} of {len(jobs)} job(s) already recorded as succeeded in "
+                  f"'{self.checkpoint_file}' (run with --fresh to repeat them)")
+        start = time.perf_counter()
+        if sessions:
+            results, interrupted = self._run_on_sessions(pending, sessions)
+        else:
+            results, interrupted = self._run_serial(pending)
+
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        return {
+            "workflow": self.workflow.name,
+            "total": len(jobs),
+            "skipped": len(jobs) - len(pending),
+            "succeeded": counts.get("success", 0),
+            "failed": counts.get("failed", 0),
+            "invalid": counts.get("invalid", 0),
+            "interrupted": interrupted,
+            "elapsed_s": round(time.perf_counter() - start, 3),
+            "checkpoint": self.checkpoint_file,
+            "sessions": [session.stats() for session in sessions or ()],
+            "jobs": results,
+        }
+
+
+def default_checkpoint(batch_file):
+    return batch_file + ".checkpoint.jsonl"
+
+
+def run_workflow_batch(workflow, batch_file, log_file_path=None, checkpoint_file=None, report_file=None,
+                       sessions=None, **options):
+    """
+    Runs workflow (a CompiledWorkflow) for every row of batch_file. The checkpoint
+    defaults to <batch_file>.checkpoint.jsonl, so running the same command
+    again resumes after the last finished job (fresh=True starts over).
+    options go to BatchRunner.
+    """
+    runner = BatchRunner(workflow, log_file_path=log_file_path,
+                         checkpoint_file=checkpoint_file or default_checkpoint(batch_file), **options)
+    report = runner.run(load_param_sets(batch_file), sessions)
+    if report_file:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
@@ -0,0 +1,186 @@
+"""
+Screen change detection for event-driven waiting.
+
+等待类操作以前固定 sleep 后再做一次完整的截图+OCR。这里改为高频采样低分辨率的
+灰度缩略图签名，只有画面 (或被监视的区域) 真正变化并稳定下来后才触发昂贵的OCR：
+- 采样间隔自适应：画面静止时逐渐放慢 (backoff)，检测到变化后恢复高频
+- 防抖：变化后等待 settle 秒内不再变化才认为画面稳定 (动画、渐显结束)
+- 传入 capture_array 时采样写进复用的帧缓冲区 (frame_buffers.py)，签名直接在 NumPy 视图上计算，
+  只有稳定后返回给调用方的那一帧才转换成 PIL 图像
+"""
+import time
+
+try:
+    from .lazy_import import lazy_module
+    from .profiling import span
+except ImportError:
+    from lazy_import import lazy_module
+    from profiling import span
+
+Image = lazy_module("PIL.Image")
+np = lazy_module("numpy")
+
+# --- Configuration ---
+SIGNATURE_SIZE = (64, 36)   # thumbnail cells; each covers ~30x30 px at 1080p
+CHANGE_THRESHOLD = 16       # max per-cell grey level difference that counts as a change
+MIN_INTERVAL = 0.03         # seconds between samples right after a change
+MAX_INTERVAL = 0.5          # sampling interval cap while the screen is static
+BACKOFF = 1.5               # interval growth factor per unchanged sample
+SETTLE_TIME = 0.15          # screen must be stable this long after a change
+CELL_SAMPLES = 8            # pixels sampled per cell side by array_signature
+
+
+def frame_signature(image, size=SIGNATURE_SIZE):
+    """Returns a small grayscale thumbnail (bytes) that summarises a frame."""
+    return image.convert("L").resize(size, Image.BOX).tobytes()
+
+
+def array_signature(array, size=SIGNATURE_SIZE, samples=CELL_SAMPLES):
+    """
+    frame_signature for a (height, width, 3) RGB array, computed from an evenly
+    spaced grid of samples x samples pixels per cell, so it never copies the
+    frame. Values are close to, but not identical with, frame_signature's:
+    only compare signatures made by the same function.
+    """
+    height, width = array.shape[:2]
+    columns, rows = size
+    ys = np.arange(rows * samples) * height // (rows * samples)
+    xs = np.arange(columns * samples) * width // (columns * samples)
+    picked = array[ys[:, None], xs[None, :]].astype(np.uint32)
+    gray = (picked[..., 0] * 299 + picked[..., 1] * 587 + picked[..., 2] * 114) // 1000
+    cells = gray.reshape(rows, samples, columns, samples).mean(axis=(1, 3))
+    return cells.astype(np.uint8).tobytes()
+
+
+def signature_distance(a, b):
+    """Largest per-cell difference between two signatures (0-255)."""
+    if a is None or b is None or len(a) != len(b):
+        return 255
+    return max((abs(x - y) for x, y in zip(a, b)), default=0)
+
+
+class ChangeWaiter:
+    """
+    Watches the screen (or a region) through capture(region) and blocks
+    until it changes. capture is normally core._capture_screen. With
+    capture_array(region) (returning a pooled FrameBuffer) samples are taken
+    into reused buffers and only returned frames become PIL images.
+    """
+
+    def __init__(self, capture, region=None, threshold=CHANGE_THRESHOLD,
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 backoff=BACKOFF, settle=SETTLE_TIME, capture_array=None):
+        self.capture = capture
+        self.capture_array = capture_array
+        self._buffer = None
+        self.region = region
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.settle = settle
+        self.reference = None
+        self.samples = 0
+        self.changes = 0
+        self.rechecks = 0
+
+    def _sample(self):
+        self.samples += 1
+        if self.capture_array is None:
+            frame = self.capture(self.region)
+            return frame, frame_signature(frame)
+        # Release first so the pool hands the same buffer back
+        self._release()
+        self._buffer = self.capture_array(self.region)
+        return self._buffer, array_signature(self._buffer.array)
+
+    def _release(self):
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+
+    def _finish(self, frame):
+        """The frame to hand to the caller: buffered samples are copied out of the pool."""
+        return frame if self.capture_array is None else frame.image()
+
+    def mark(self, frame=None):
+        """Sets the reference the next change is measured against (captures if frame is None)."""
+        if frame is None:
+            try:
+                frame, signature = self._sample()
+                frame = self._finish(frame)
+            finally:
+                self._release()
+        elif self.capture_array is None:
+            signature = frame_signature(frame)
+        else:
+            signature = array_signature(np.asarray(frame.convert("RGB")))
+        self.reference = signature
+        return frame
+
+    def wait_for_change(self, timeout):
+        """
+        Blocks until the screen differs from the reference and has settled,
+        or until timeout seconds pass. Returns the settled frame, or None on
+        timeout. The settled frame becomes the new reference.
+        """
+        try:
+            return self._wait_for_change(timeout)
+        finally:
+            self._release()
+
+    def _wait_for_change(self, timeout):
+        deadline = time.monotonic() + timeout
+        if self.reference is None:
+            self.reference = self._sample()[1]
+        interval = self.min_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with span("sleep"):
+                time.sleep(min(interval, remaining))
+            frame, signature = self._sample()
+            if signature_distance(signature, self.reference) <= self.threshold:
+                interval = min(self.max_interval, interval * self.backoff)
+                continue
+            self.changes += 1
+            return self._finish(self._settle(frame, signature, deadline))
+
+    def _settle(self, frame, signature, deadline):
+        """Waits until consecutive samples stop changing for `settle` seconds."""
+        stable_since = time.monotonic()
+        while time.monotonic() - stable_since < self.settle and time.monotonic() < deadline:
+            with span("sleep"):
+                time.sleep(self.min_interval)
+            next_frame, next_signature = self._sample()
+            if signature_distance(next_signature, signature) > self.threshold:
+                stable_since = time.monotonic()
+            frame, signature = next_frame, next_signature
+        self.reference = signature
+        return frame
+
+    def poll(self, check, timeout, recheck_interval=None):
+        """
+        Evaluates check(frame) on the current screen and again after every
+        settled change until it returns a truthy value or timeout expires.
+        Changes below the threshold (a short word in a large region) never
+        wake the waiter, so with recheck_interval the check also runs on a
+        fresh frame whenever that many seconds pass without a change.
+        Returns (result, elapsed_seconds); result is None on timeout.
+        """
+        start = time.monotonic()
+        frame = self.mark()
+        while True:
+            result = check(frame)
+            if result:
+                return result, time.monotonic() - start
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                return None, time.monotonic() - start
+            frame = self.wait_for_change(remaining if recheck_interval is None else min(remaining, recheck_interval))
+            if frame is None:
+                if time.monotonic() - start >= timeout:
+                    return None, time.monotonic() - start
+                self.rechecks += 1
+                frame = self.mark()
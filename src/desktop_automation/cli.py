@@ -6,11 +6,25 @@ import os
 
 # 处理相对导入问题
 try:
-    from . import core as da
+    from . import daemon
 except ImportError:
     # 如果相对导入失败，使用绝对导入
     sys.path.insert(0, os.path.dirname(__file__))
-    import core as da
+    import daemon
+
+# core (pyautogui, OCR ...) is only imported when an action runs in this process;
+# forwarding to a running daemon never needs it
+da = None
+
+def _core():
+    global da
+    if da is None:
+        try:
+            from . import core
+        except ImportError:
+            import core
+        da = core
+    return da
 
 # --- Constants ---
 # 使用相对于当前模块的路径
@@ -19,45 +33,174 @@ MODULE_DIR = os.path.dirname(__file__)
 WORKFLOWS_DIR = os.path.join(MODULE_DIR, "successful_workflows")
 MANIFEST_FILE = os.path.join(MODULE_DIR, "workflows_manifest.json")
 
+def _parse_region(value):
+    """
+    Parses a --region argument: JSON ('[0, 0, 400, 900]' or '{"window": "微信", ...}'),
+    a comma separated box ("0,0,400,900") or a named region ("chat_list").
+    """
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    parts = value.split(',')
+    if len(parts) == 4:
+        try:
+            return [int(p) for p in parts]
+        except ValueError:
+            pass
+    return value
+
+def _parse_events(value):
+    """Parses --events: a JSON list of input events, or @path to a JSON file holding one."""
+    if value.startswith('@'):
+        with open(value[1:], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(value)
+
 def _execute_actions(actions, log_file_path, workflow_params=None):
-    """Helper function to execute a list of action dictionaries."""
-    if workflow_params is None:
-        workflow_params = {}
-
-    for action_item in actions:
-        action_name = action_item.get("action")
-        params = action_item.get("params", {})
-
-        # Parameter substitution (e.g., replace "{{contact_name}}" with actual value)
-        for key, value in params.items():
-            if isinstance(value, str) and value.startswith("{{") and value.endswith("}}"):
-                param_name = value[2:-2]
-                if param_name in workflow_params:
-                    param_value = workflow_params[param_name]
-                    params[key] = param_value
-
-        func_to_call = getattr(da, action_name, None)
-        
-        if func_to_call:
-            # Pass the log_file_path to every action that accepts it
-            if 'log_file_path' in func_to_call.__code__.co_varnames:
-                params['log_file_path'] = log_file_path
-            
-            if action_name == 'press_hotkey':
-                result = func_to_call(*params.pop('keys'), **params)
-            else:
-                result = func_to_call(**params)
-            
-            # Check for smart_click_text failures in workflows
-            if action_name == 'smart_click_text' and result:
-                print(f"Workflow step [{action_name}]: {result}")
-                if "not found" in result.lower() or "failed" in result.lower() or "error" in result.lower():
-                    print(f"Workflow failed at step: {action_name}", file=sys.stderr)
-                    raise ValueError(f"Smart click action failed: {result}")
-            elif result:
-                print(f"Workflow step [{action_name}]: {result}")
+    """
+    Helper function to execute a list of action dictionaries.
+    actions may also be a workflow object {"regions": {...}, "actions": [...]}
+    whose named regions can then be used as the "region" param of text searches.
+    The steps are compiled and validated first (see workflow_compiler.py);
+    to run the same workflow repeatedly, compile it once and call run().
+    """
+    try:
+        from .workflow_compiler import compile_workflow
+    except ImportError:
+        from workflow_compiler import compile_workflow
+    compile_workflow(actions).run(log_file_path, workflow_params)
+
+def _step_memo(enabled):
+    """The shared step memo for --memo (see step_memo.py), or None."""
+    if not enabled:
+        return None
+    try:
+        from .step_memo import get_step_memo
+    except ImportError:
+        from step_memo import get_step_memo
+    return get_step_memo()
+
+def _run_named_workflow(name, log_file_path, workflow_params, memo=False):
+    """Runs a workflow from the manifest (here or inside the daemon)."""
+    try:
+        from .workflow_compiler import load_named_workflow
+    except ImportError:
+        from workflow_compiler import load_named_workflow
+    # Compiled plans are cached by manifest/workflow mtime, so repeat runs skip parsing
+    workflow = load_named_workflow(name, MANIFEST_FILE, WORKFLOWS_DIR)
+    print(f"Executing workflow '{name}'...")
+    workflow.run(log_file_path, workflow_params, _step_memo(memo))
+    print(f"Workflow '{name}' finished.")
+
+def _run_workflow_batch(name, batch_file, log_file_path, options):
+    """Runs a manifest workflow once per row of batch_file and returns the report."""
+    try:
+        from .workflow_compiler import load_named_workflow
+        from .batch_runner import run_workflow_batch
+    except ImportError:
+        from workflow_compiler import load_named_workflow
+        from batch_runner import run_workflow_batch
+    workflow = load_named_workflow(name, MANIFEST_FILE, WORKFLOWS_DIR)
+    options = dict(options)
+    displays = options.pop("displays", None)
+    options["memo"] = _step_memo(options.pop("memo", False))
+    print(f"Executing workflow '{name}' for each row of '{batch_file}'...")
+    if not displays:
+        return run_workflow_batch(workflow, batch_file, log_file_path, **options)
+
+    # One isolated session (screen, input, caches, task log) per X display
+    try:
+        from .sessions import AutomationSession
+    except ImportError:
+        from sessions import AutomationSession
+    sessions = []
+    try:
+        for display in displays:
+            session = AutomationSession(f"display{display.replace(':', '_')}", display=display)
+            sessions.append(session)
+            session.start_log()
+        return run_workflow_batch(workflow, batch_file, log_file_path, sessions=sessions, **options)
+    finally:
+        for session in sessions:
+            session.close()
+
+def _batch_options(args):
+    return {"rate_limit": args.rate_limit, "retries": args.retries, "backoff": args.backoff, "memo": args.memo,
+            "fresh": args.fresh,
+            "checkpoint_file": os.path.abspath(args.checkpoint) if args.checkpoint else None,
+            "report_file": os.path.abspath(args.report) if args.report else None,
+            "displays": [d.strip() for d in args.displays.split(',') if d.strip()] if args.displays else None}
+
+JSON_RESULT_ACTIONS = ('analyze_screen_state', 'find_all_text_on_screen', 'benchmark_screen_capture',
+                       'check_ocr_engine', 'probe_ocr_configuration', 'send_input_batch')
+
+def _print_result(action, result):
+    """Prints a single action's result the same way whether it ran here or in the daemon."""
+    if action == 'start_task_log':
+        print(result)
+    elif action in JSON_RESULT_ACTIONS:
+        # Encode to UTF-8 and write bytes to stdout buffer to avoid console encoding issues
+        output_json = json.dumps(result, indent=2, ensure_ascii=False)
+        sys.stdout.buffer.write(output_json.encode('utf-8'))
+    elif action == 'find_text_on_screen':
+        if result:
+            print(f"Found text at coordinates: {result}")
         else:
-            raise ValueError(f"Action '{action_name}' not found in desktop_automation module.")
+            print("Text not found")
+    elif action == 'wait_for_text_appear':
+        print(f"Wait result: {result}")
+    elif action == 'verify_operation_result':
+        print(f"Verification result: {result}")
+
+def _print_workflow_batch(report):
+    output_json = json.dumps(report, indent=2, ensure_ascii=False)
+    sys.stdout.buffer.write(output_json.encode('utf-8'))
+
+# CLI options holding file system paths; resolved against the client's directory before forwarding.
+# Workflow --params are forwarded unchanged: their names are the workflow's own, not the CLI's.
+PATH_PARAMS = ('file_path', 'log_file_path', 'batch', 'replay_dir', 'checkpoint', 'report', 'db', 'logs_dir')
+PATH_SUFFIXES = ('_path', '_file', '_dir')
+
+def _absolute_paths(params):
+    """Makes the CLI's path options absolute: the daemon runs in another working directory."""
+    return {key: os.path.abspath(value)
+            if isinstance(value, str) and value and (key in PATH_PARAMS or key.endswith(PATH_SUFFIXES)) else value
+            for key, value in params.items()}
+
+def _forward_to_daemon(client, args, params):
+    """Runs the requested action or workflow in the daemon. Returns the process exit code."""
+    # Screen source, motion profile and preprocessing apply to this request only (see daemon.OVERRIDES)
+    overrides = {key: params.pop(key, None) for key in daemon.OVERRIDES}
+    if overrides["screen_source"] == 'replay':
+        overrides["replay_dir"] = overrides["replay_dir"] or os.environ.get('DESKTOP_AUTOMATION_REPLAY_DIR', '')
+    overrides = _absolute_paths({key: value for key, value in overrides.items() if value})
+    params = _absolute_paths(params)
+    try:
+        if args.action == 'execute_workflow' and args.batch:
+            result, output = client.call('execute_workflow_batch', {
+                "name": args.name, "batch_file": params['batch'],
+                "log_file_path": params.get('log_file_path'), "options": _batch_options(args)}, overrides)
+            sys.stdout.write(output)
+            _print_workflow_batch(result)
+            return 0 if not result["failed"] and not result["invalid"] else 1
+        if args.action == 'execute_workflow':
+            result, output = client.call('execute_workflow', {"name": args.name,
+                                                              "params": json.loads(args.params),
+                                                              "log_file_path": params.get('log_file_path'),
+                                                              "memo": args.memo}, overrides)
+            sys.stdout.write(output)
+            return 0
+        result, output = client.call(args.action, params, overrides)
+        sys.stdout.write(output)
+        _print_result(args.action, result)
+        return 0
+    except daemon.DaemonError as e:
+        sys.stdout.write(e.output)
+        print(f"Daemon error for '{args.action}': {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
 
 def main():
     """
@@ -68,6 +211,11 @@ def main():
         description="A command-line runner for desktop_automation functions."
     )
     parser.add_argument('--log_file_path', default=None, help='Path to the log file for the action(s).')
+    parser.add_argument('--screen_source', default=None, choices=['pyautogui', 'mss', 'replay'], help='Where vision functions capture frames from.')
+    parser.add_argument('--replay_dir', default=None, help='Directory of recorded frames for --screen_source replay.')
+    parser.add_argument('--motion_profile', default=None, choices=['instant', 'fast', 'humanlike'], help='Mouse travel and typing rhythm for input actions.')
+    parser.add_argument('--preprocess', default=None, choices=['off', 'fast', 'accurate'], help='Frame preprocessing applied before OCR.')
+    parser.add_argument('--no_daemon', action='store_true', help='Run in this process even if an automation daemon is running.')
 
     subparsers = parser.add_subparsers(dest='action', required=True, help='The action or mode to perform')
 
@@ -82,61 +230,205 @@ def main():
     parser_end.add_argument('user_feedback', nargs='*', default="")
     parser_screenshot = subparsers.add_parser('take_screenshot')
     parser_screenshot.add_argument('--file_path', default='screenshot.png')
+    parser_screenshot.add_argument('--encoding', default='png', choices=['png', 'raw', 'async'], help='png: encode now; raw: unencoded .rgb frame; async: encode on a background thread')
     parser_type = subparsers.add_parser('type_text')
     parser_type.add_argument('--text', required=True)
+    parser_type.add_argument('--interval', type=float, default=None, help='Seconds per typed character (default: motion profile)')
+    parser_type.add_argument('--method', default='auto', choices=['auto', 'type', 'paste'], help='Type keys, paste via clipboard, or pick automatically')
     parser_paste = subparsers.add_parser('paste_text')
     parser_paste.add_argument('--text', required=True)
     parser_hotkey = subparsers.add_parser('press_hotkey')
     parser_hotkey.add_argument('keys', nargs='+')
+    parser_batch = subparsers.add_parser('send_input_batch', help='Run a batch of mouse/keyboard events and report dispatch latency')
+    parser_batch.add_argument('--events', type=_parse_events, required=True, help='JSON list of events, or @file.json')
+    parser_batch.add_argument('--profile', default=None, choices=['instant', 'fast', 'humanlike'], help='Motion profile for this batch')
     
     # --- New Smart Action Parsers ---
     parser_analyze = subparsers.add_parser('analyze_screen_state', help='Analyze current screen content using OCR')
+    parser_analyze.add_argument('--parallel', action='store_true', help='OCR screen bands in parallel across CPU cores')
+    parser_analyze.add_argument('--workers', type=int, default=None, help='Number of OCR processes for --parallel')
     
     parser_find_text = subparsers.add_parser('find_text_on_screen', help='Find text on screen and return its location')
     parser_find_text.add_argument('--target_text', required=True, help='Text to search for')
+    parser_find_text.add_argument('--region', type=_parse_region, default=None, help='Search region: "x,y,w,h", JSON spec or region name')
+    parser_find_text.add_argument('--match', default='casefold', choices=['exact', 'casefold', 'fuzzy'], help='Text matching mode')
+    
+    parser_find_all = subparsers.add_parser('find_all_text_on_screen', help='List every match of a text on screen, best first')
+    parser_find_all.add_argument('--target_text', required=True, help='Text to search for')
+    parser_find_all.add_argument('--region', type=_parse_region, default=None, help='Search region: "x,y,w,h", JSON spec or region name')
+    parser_find_all.add_argument('--match', default='casefold', choices=['exact', 'casefold', 'fuzzy'], help='Text matching mode')
+    parser_find_all.add_argument('--near', type=lambda v: [int(p) for p in v.split(',')], default=None, help='Order matches by distance to "x,y"')
     
     parser_smart_click = subparsers.add_parser('smart_click_text', help='Intelligently find and click on text')
     parser_smart_click.add_argument('--target_text', required=True, help='Text to click on')
     parser_smart_click.add_argument('--button', default='left', choices=['left', 'right', 'middle'], help='Mouse button to click')
     parser_smart_click.add_argument('--max_retries', type=int, default=3, help='Maximum retry attempts')
+    parser_smart_click.add_argument('--region', type=_parse_region, default=None, help='Search region: "x,y,w,h", JSON spec or region name')
+    parser_smart_click.add_argument('--match', default='casefold', choices=['exact', 'casefold', 'fuzzy'], help='Text matching mode')
+    parser_smart_click.add_argument('--no_cache', dest='use_cache', action='store_false', help='Always OCR the screen instead of trying the learned location first')
     
     parser_wait_text = subparsers.add_parser('wait_for_text_appear', help='Wait for specific text to appear on screen')
     parser_wait_text.add_argument('--target_text', required=True, help='Text to wait for')
     parser_wait_text.add_argument('--timeout', type=int, default=10, help='Timeout in seconds')
     parser_wait_text.add_argument('--check_interval', type=float, default=1, help='Check interval in seconds')
+    parser_wait_text.add_argument('--incremental', action='store_true', help='Re-OCR only screen tiles that changed between polls')
+    parser_wait_text.add_argument('--region', type=_parse_region, default=None, help='Search region: "x,y,w,h", JSON spec or region name')
+    parser_wait_text.add_argument('--match', default='casefold', choices=['exact', 'casefold', 'fuzzy'], help='Text matching mode')
+    parser_wait_text.add_argument('--fixed_interval', dest='event_driven', action='store_false', help='Poll every check_interval instead of waiting for screen changes')
     
     parser_verify = subparsers.add_parser('verify_operation_result', help='Verify operation success by checking for expected text')
     parser_verify.add_argument('--expected_text', required=True, help='Text that should appear if operation was successful')
     parser_verify.add_argument('--timeout', type=int, default=5, help='Timeout in seconds')
+    parser_verify.add_argument('--region', type=_parse_region, default=None, help='Search region: "x,y,w,h", JSON spec or region name')
+    
+    parser_capture_bench = subparsers.add_parser('benchmark_screen_capture', help='Measure capture latency of the screen source')
+    parser_capture_bench.add_argument('--samples', type=int, default=20, help='Number of frames to capture')
+    
+    parser_ocr_check = subparsers.add_parser('check_ocr_engine', help='Health-check the OCR worker pool')
+    parser_ocr_probe = subparsers.add_parser('probe_ocr_configuration', help='Detect installed OCR languages and pin the working configuration')
+    parser_ocr_probe.add_argument('--force', action='store_true', help='Ignore the saved host profile and probe again')
+
+    parser_profile = subparsers.add_parser('profile', help='Summarise action and phase latencies of a task log')
+    parser_profile.add_argument('log_file', help='Task log (.jsonl) to profile')
+    parser_profile.add_argument('--trace', default=None, help='Also write a flame graph trace to this file')
+    parser_profile.add_argument('--format', default='collapsed', choices=['collapsed', 'chrome'], help='Trace format: folded stacks or Chrome trace JSON')
+
+    parser_compact = subparsers.add_parser('compact_logs', help='Import task_*.jsonl logs into the indexed SQLite log store')
+    parser_compact.add_argument('--logs_dir', default='logs', help='Directory holding the task logs')
+    parser_compact.add_argument('--db', default=None, help='Log store file (default: <logs_dir>/task_logs.sqlite3)')
+    parser_compact.add_argument('--remove', action='store_true', help='Delete logs that are fully imported and have a verdict')
+
+    parser_query = subparsers.add_parser('query_logs', help='Aggregate questions over the log store (see compact_logs)')
+    parser_query.add_argument('report', nargs='?', default='summary', choices=['summary', 'actions', 'phases', 'failures', 'tasks', 'daily', 'sql'], help='Report to produce')
+    parser_query.add_argument('--db', default=os.path.join('logs', 'task_logs.sqlite3'), help='Log store file')
+    parser_query.add_argument('--since', default=None, help='Only entries at or after this ISO date/time')
+    parser_query.add_argument('--until', default=None, help='Only entries up to this ISO date (inclusive) or before this time')
+    parser_query.add_argument('--filter_action', default=None, help='Only this action')
+    parser_query.add_argument('--status', default=None, help='Only this status ("failure": anything but success)')
+    parser_query.add_argument('--verdict', default=None, help='Only tasks with this verdict')
+    parser_query.add_argument('--limit', type=int, default=20, help='Maximum rows')
+    parser_query.add_argument('--sql', default=None, help='Read-only SQL for the "sql" report')
+
+    # --- Daemon ---
+    parser_serve = subparsers.add_parser('serve', help='Run the resident automation daemon (localhost JSON-RPC)')
+    parser_serve.add_argument('--port', type=int, default=0, help='TCP port on 127.0.0.1 (default: any free port)')
+    subparsers.add_parser('daemon_status', help='Show whether an automation daemon is running')
+    subparsers.add_parser('daemon_stop', help='Stop the running automation daemon')
 
     # --- Mode 2: Workflow Executor ---
     parser_workflow = subparsers.add_parser('execute_workflow', help='Executes a named workflow from the library.')
     parser_workflow.add_argument('--name', required=True, help='The name of the workflow to execute.')
     # Change how params are handled to be more robust
     parser_workflow.add_argument('--params', type=str, default='{}', help='JSON string of parameters for the workflow.')
+    parser_workflow.add_argument('--memo', action='store_true', help='Skip steps whose result is already on screen and resume after failures (screen fingerprints of earlier successful runs)')
+    parser_workflow.add_argument('--batch', default=None, help='CSV/JSONL/JSON file with one parameter set per row; runs the workflow for each.')
+    parser_workflow.add_argument('--rate_limit', type=float, default=None, help='Batch: maximum jobs per minute')
+    parser_workflow.add_argument('--retries', type=int, default=0, help='Batch: extra attempts for a failed job (use with --memo so a retry resumes at the failed step instead of repeating earlier ones)')
+    parser_workflow.add_argument('--backoff', type=float, default=5.0, help='Batch: seconds before the first retry, doubled on each further retry')
+    parser_workflow.add_argument('--checkpoint', default=None, help='Batch: progress file for resuming (default: <batch>.checkpoint.jsonl)')
+    parser_workflow.add_argument('--fresh', action='store_true', help='Batch: run every row again, ignoring jobs the checkpoint records as succeeded')
+    parser_workflow.add_argument('--report', default=None, help='Batch: also write the per-job report to this file')
+    parser_workflow.add_argument('--displays', default=None, help='Batch: comma separated X displays (e.g. ":99,:100") to run jobs on concurrently, one session each')
 
     args, unknown = parser.parse_known_args()
+    no_daemon = vars(args).pop('no_daemon')
+
+    # --- Local-only Commands ---
+
+    if args.action == 'profile':
+        try:
+            from .profiling import profile_task_log, export_trace
+        except ImportError:
+            from profiling import profile_task_log, export_trace
+        try:
+            report = profile_task_log(args.log_file)
+            if args.trace:
+                report["trace"] = {"path": args.trace, "format": args.format,
+                                   "records": export_trace(args.log_file, args.trace, args.format)}
+        except Exception as e:
+            print(f"Error profiling '{args.log_file}': {e}", file=sys.stderr)
+            sys.exit(1)
+        output_json = json.dumps(report, indent=2, ensure_ascii=False)
+        sys.stdout.buffer.write(output_json.encode('utf-8'))
+        return
+
+    if args.action in ('compact_logs', 'query_logs'):
+        try:
+            from . import log_store
+        except ImportError:
+            import log_store
+        try:
+            if args.action == 'compact_logs':
+                report = log_store.compact_logs(args.logs_dir, args.db, args.remove)
+            else:
+                report = log_store.query_logs(args.report, args.db, args.since, args.until, args.filter_action,
+                                              args.status, args.verdict, args.limit, args.sql)
+        except Exception as e:
+            print(f"Error in {args.action}: {e}", file=sys.stderr)
+            sys.exit(1)
+        output_json = json.dumps(report, indent=2, ensure_ascii=False)
+        sys.stdout.buffer.write(output_json.encode('utf-8'))
+        return
+
+    if args.action == 'serve':
+        daemon.serve(port=args.port)
+        return
+
+    if args.action in ('daemon_status', 'daemon_stop'):
+        client = daemon.connect_daemon()
+        if client is None:
+            print("No automation daemon is running.")
+            sys.exit(0 if args.action == 'daemon_stop' else 1)
+        try:
+            result, _ = client.call('stats' if args.action == 'daemon_status' else 'shutdown')
+        finally:
+            client.close()
+        print(json.dumps(result, indent=2, ensure_ascii=False) if isinstance(result, dict) else result)
+        return
+
+    # --- Thin Client: forward to a running daemon ---
+    params = vars(args).copy()
+    del params['action']
+    if args.action == 'end_task_with_verdict' and isinstance(params.get('user_feedback'), list):
+        params['user_feedback'] = ' '.join(params['user_feedback'])
+
+    client = None if no_daemon else daemon.connect_daemon()
+    if client is not None:
+        sys.exit(_forward_to_daemon(client, args, params))
+
+    da = _core()
+
+    # --- Screen Source Selection ---
+    screen_source = params.pop('screen_source')
+    replay_dir = params.pop('replay_dir')
+    if screen_source == 'replay':
+        da.set_screen_source('replay', frames=replay_dir or os.environ.get('DESKTOP_AUTOMATION_REPLAY_DIR', ''))
+    elif screen_source:
+        da.set_screen_source(screen_source)
+    motion_profile = params.pop('motion_profile')
+    if motion_profile:
+        da.set_motion_profile(motion_profile)
+    preprocess = params.pop('preprocess')
+    if preprocess:
+        da.configure_ocr_preprocessing(preprocess)
 
     # --- Main Logic ---
 
-    if args.action == 'execute_workflow':
+    if args.action == 'execute_workflow' and args.batch:
         try:
-            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
-                manifest = json.load(f)
-            workflow_meta = next((w for w in manifest['workflows'] if w['name'] == args.name), None)
-            if not workflow_meta:
-                raise FileNotFoundError(f"Workflow '{args.name}' not found in manifest.")
-            
-            workflow_file_path = os.path.join(WORKFLOWS_DIR, workflow_meta['file'])
-            with open(workflow_file_path, 'r', encoding='utf-8') as f:
-                action_sequence = json.load(f)
+            report = _run_workflow_batch(args.name, args.batch, args.log_file_path, _batch_options(args))
+        except Exception as e:
+            print(f"Error executing workflow '{args.name}' in batch: {e}", file=sys.stderr)
+            sys.exit(1)
+        _print_workflow_batch(report)
+        if report["failed"] or report["invalid"]:
+            sys.exit(1)
 
+    elif args.action == 'execute_workflow':
+        try:
             # Manually parse the params JSON string
             workflow_params = json.loads(args.params)
-
-            print(f"Executing workflow '{args.name}'...")
-            _execute_actions(action_sequence, args.log_file_path, workflow_params)
-            print(f"Workflow '{args.name}' finished.")
+            _run_named_workflow(args.name, args.log_file_path, workflow_params, args.memo)
 
         except Exception as e:
             print(f"Error executing workflow '{args.name}': {e}", file=sys.stderr)
@@ -145,40 +437,9 @@ def main():
     else: # Handle single actions
         func_to_call = getattr(da, args.action, None)
         if func_to_call:
-            params = vars(args).copy()
-            del params['action']
-            
-            if args.action == 'end_task_with_verdict' and isinstance(params.get('user_feedback'), list):
-                params['user_feedback'] = ' '.join(params['user_feedback'])
-
-            if args.action == 'press_hotkey':
-                func_to_call(*params.pop('keys'), **params)
-            elif args.action == 'start_task_log':
-                print(func_to_call())
-            elif args.action == 'analyze_screen_state':
-                result = func_to_call(**params)
-                # Encode to UTF-8 and write bytes to stdout buffer to avoid console encoding issues
-                output_json = json.dumps(result, indent=2, ensure_ascii=False)
-                sys.stdout.buffer.write(output_json.encode('utf-8'))
-            elif args.action == 'find_text_on_screen':
-                result = func_to_call(**params)
-                if result:
-                    print(f"Found text at coordinates: {result}")
-                else:
-                    print("Text not found")
-            elif args.action == 'wait_for_text_appear':
-                result = func_to_call(**params)
-                print(f"Wait result: {result}")
-            elif args.action == 'verify_operation_result':
-                result = func_to_call(**params)
-                print(f"Verification result: {result}")
-            else:
-                # Ensure log_file_path is passed correctly for single actions too
-                if 'log_file_path' in func_to_call.__code__.co_varnames:
-                    func_to_call(**params)
-                else:
-                    params.pop('log_file_path', None) # Remove if not a valid arg
-                    func_to_call(**params)
+            # log_file_path is dropped for actions without it; press_hotkey's keys go positionally
+            result = daemon.call_action(func_to_call, params)
+            _print_result(args.action, result)
         else:
             print(f"Single action '{args.action}' not implemented or invalid.", file=sys.stderr)
             sys.exit(1)
@@ -1,19 +1,67 @@
 
-import pyautogui
-import pytesseract
-from PIL import Image
 import time
-import json
 import os
+import threading
 from datetime import datetime
-import io
-import base64
+
+# 处理相对导入问题 (cli.py 在相对导入失败时会把本目录加入 sys.path)
+try:
+    from .frame_cache import FrameCache, frame_digest
+    from .tiling import IncrementalOCR, group_lines
+    from .screen_source import get_screen_source, set_screen_source, measure_capture_latency
+    from .regions import resolve_region, to_screen, register_regions, regions_scope
+    from .text_index import TextIndex
+    from .change_detect import ChangeWaiter
+    from .task_logger import get_task_logger, flush_task_log, close_task_log
+    from .profiling import span, traced_action, current_timing
+    from .ocr_engine import get_ocr_engine, configure_ocr_engine, probe_ocr_capabilities, parallel_ocr_data
+    from .input_engine import get_input_engine, set_input_backend, set_motion_profile
+    from .sessions import current_session
+    from .preprocess import ocr_frame, get_preprocess_config, set_preprocess_config, get_preprocess_stats
+    from .location_cache import LocationCache
+    from .frame_buffers import (FrameMemoryError, get_frame_pool, get_screenshot_writer, peak_rss_mb,
+                                HAVE_NUMPY)
+except ImportError:
+    from frame_cache import FrameCache, frame_digest
+    from tiling import IncrementalOCR, group_lines
+    from screen_source import get_screen_source, set_screen_source, measure_capture_latency
+    from regions import resolve_region, to_screen, register_regions, regions_scope
+    from text_index import TextIndex
+    from change_detect import ChangeWaiter
+    from task_logger import get_task_logger, flush_task_log, close_task_log
+    from profiling import span, traced_action, current_timing
+    from ocr_engine import get_ocr_engine, configure_ocr_engine, probe_ocr_capabilities, parallel_ocr_data
+    from input_engine import get_input_engine, set_input_backend, set_motion_profile
+    from sessions import current_session
+    from preprocess import ocr_frame, get_preprocess_config, set_preprocess_config, get_preprocess_stats
+    from location_cache import LocationCache
+    from frame_buffers import (FrameMemoryError, get_frame_pool, get_screenshot_writer, peak_rss_mb,
+                               HAVE_NUMPY)
 
 # --- Configuration ---
 LOGS_DIR = "logs"
 SUCCESSFUL_WORKFLOWS_DIR = "successful_workflows"
-TEMP_DIR = os.path.join(LOGS_DIR, "temp") # For temporary files like templates
-os.makedirs(TEMP_DIR, exist_ok=True)
+
+# OCR candidates in order of preference: (lang, config)
+# 首先尝试中英文混合识别，没有中文包时退回英文，最后使用默认配置
+# 每个进程只探测一次，结果按主机和 Tesseract 安装 (路径、修改时间) 保存在 OCR_PROFILE_FILE 中，命中时不启动 tesseract
+OCR_CONFIGS = (
+    ('chi_sim+eng', '--psm 6'),
+    (None, '--psm 6'),
+    (None, ''),
+)
+OCR_PROFILE_FILE = os.path.join(LOGS_DIR, "ocr_profile.json")
+# smart_click_text remembers where labels were found (see location_cache.py)
+LOCATION_CACHE_FILE = os.path.join(LOGS_DIR, "location_cache.json")
+_location_cache = LocationCache(LOCATION_CACHE_FILE)
+
+# Shared frame/OCR cache: one OCR pass per unique frame serves many lookups
+_frame_cache = FrameCache()
+
+def _current_frame_cache():
+    """The current session's frame cache (see sessions.py), otherwise the shared one."""
+    session = current_session()
+    return session.frame_cache if session is not None else _frame_cache
 
 # --- Core Logging Functions ---
 
@@ -26,16 +74,21 @@ def _log_action(log_file_path, action_name, params, status, result):
         "status": status,
         "result": result
     }
+    timing = current_timing(action_name)
+    if timing:
+        log_entry["timing"] = timing
     try:
-        with open(log_file_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+        # Buffered: a background thread batches the writes (see task_logger.py)
+        get_task_logger(log_file_path).write(log_entry)
     except Exception as e:
         print(f"Error writing to log file {log_file_path}: {e}")
 
 def start_task_log():
     os.makedirs(LOGS_DIR, exist_ok=True)
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"task_{timestamp}.jsonl"
+    session = current_session()
+    # Sessions start their logs at the same moment: keep the files apart
+    filename = f"task_{timestamp}_{session.name}.jsonl" if session is not None else f"task_{timestamp}.jsonl"
     log_file_path = os.path.join(LOGS_DIR, filename)
     with open(log_file_path, 'w') as f: pass
     print(f"Task started. Logging to: {log_file_path}")
@@ -44,38 +97,213 @@ def start_task_log():
 def end_task_with_verdict(log_file_path, status, user_feedback=""):
     params = {"status": status, "user_feedback": user_feedback}
     _log_action(log_file_path, "task_verdict", params, status, f"Task ended with status: {status}")
+    if log_file_path:
+        close_task_log(log_file_path)  # make sure every buffered line is on disk
     print(f"Task ended. Verdict '{status}' recorded in {log_file_path}")
 
 
 # --- Helper Functions ---
-def _get_image_from_base64(base64_string):
-    """Decodes a base64 string into a PIL Image."""
-    image_data = base64.b64decode(base64_string)
-    return Image.open(io.BytesIO(image_data))
+def _capture_screen(region=None):
+    """
+    Captures the screen (or a (left, top, width, height) region) as a PIL
+    Image from the active screen source (see screen_source.py).
+    """
+    with span("capture"):
+        return get_screen_source().capture(region)
+
+def _frame_buffers_enabled():
+    return HAVE_NUMPY and get_frame_pool().enabled
+
+def _capture_array(region=None):
+    """
+    Captures into a pooled frame buffer (see frame_buffers.py); the caller
+    must release it. When the memory cap is reached, queued screenshots are
+    written out (freeing their buffers) and the capture is retried once.
+    """
+    with span("capture"):
+        try:
+            return get_screen_source().capture_array(get_frame_pool(), region)
+        except FrameMemoryError:
+            get_screenshot_writer().flush()
+            return get_screen_source().capture_array(get_frame_pool(), region)
+
+def _change_waiter(region=None, **options):
+    """ChangeWaiter that samples into pooled buffers when they are available."""
+    capture_array = _capture_array if _frame_buffers_enabled() else None
+    return ChangeWaiter(_capture_screen, region, capture_array=capture_array, **options)
+
+_ocr_settings = None
+_ocr_settings_logged = set()
+_ocr_settings_lock = threading.Lock()
+
+def _get_ocr_settings(log_file_path=None):
+    """
+    Returns the pinned OCR configuration {"lang", "config", ...}, probing
+    the host once per process (see ocr_engine.probe_ocr_capabilities).
+    The decision is recorded once in every task log that uses it.
+    """
+    global _ocr_settings
+    with _ocr_settings_lock:
+        if _ocr_settings is None:
+            _ocr_settings = probe_ocr_capabilities(OCR_CONFIGS, get_ocr_engine(), OCR_PROFILE_FILE)
+        settings = _ocr_settings
+        first_use = log_file_path and log_file_path not in _ocr_settings_logged
+        if first_use:
+            _ocr_settings_logged.add(log_file_path)
+    if first_use:
+        params = {"candidates": [list(c) for c in OCR_CONFIGS]}
+        result = (f"OCR pinned to lang={settings['lang'] or 'default'} config='{settings['config']}' "
+                  f"({settings['source']})")
+        _log_action(log_file_path, "ocr_capability_probe", params, "success", result)
+    return settings
+
+@traced_action
+def probe_ocr_configuration(force=False, log_file_path=None):
+    """
+    Detects the installed OCR languages and the working configuration and
+    pins it for this process. force=True ignores the saved host profile.
+    Returns the decision dictionary.
+    """
+    global _ocr_settings
+    params = {"force": force}
+    try:
+        settings = probe_ocr_capabilities(OCR_CONFIGS, get_ocr_engine(), OCR_PROFILE_FILE, force=force)
+        with _ocr_settings_lock:
+            _ocr_settings = settings
+            _ocr_settings_logged.clear()
+        result = (f"OCR pinned to lang={settings['lang'] or 'default'} config='{settings['config']}' "
+                  f"({settings['source']})")
+        _log_action(log_file_path, "probe_ocr_configuration", params, "success", result)
+        return settings
+    except Exception as e:
+        result = f"Error probing OCR configuration: {e}"
+        _log_action(log_file_path, "probe_ocr_configuration", params, "error", result)
+        return {"error": str(e)}
+
+def _preprocessed_ocr(image, output, lang, config, preprocess=None):
+    """OCRs the text regions of a preprocessed frame (preprocess.py) on the warm worker pool."""
+    engine = get_ocr_engine()
+    return ocr_frame(image, lambda region: engine.run(region, output, lang, config), output,
+                     preprocess, workers=engine.size)
+
+def _run_ocr(image, output="string", log_file_path=None, cache=True):
+    """
+    Runs OCR on an image with the pinned OCR configuration.
+    output is "string" (plain text) or "data" (word boxes dict).
+    Results are cached per frame content, so repeated lookups on an
+    unchanged screen skip Tesseract entirely. cache=False bypasses the
+    shared cache for callers that keep their own results (IncrementalOCR's
+    tiles would otherwise evict the full-frame entries).
+    """
+    settings = _get_ocr_settings(log_file_path)
+    lang, config = settings["lang"], settings["config"]
+    preprocess = get_preprocess_config()
+    if not cache:
+        return _preprocessed_ocr(image, output, lang, config, preprocess)
+    key = (frame_digest(image), output, lang, config, preprocess)
+    return _current_frame_cache().get_or_compute(
+        key, lambda: _preprocessed_ocr(image, output, lang, config, preprocess))
+
+def _run_parallel_ocr(image, workers=None, log_file_path=None):
+    """
+    OCRs a full frame as overlapping bands in a process pool (one core per
+    band) and returns the merged word boxes dict. Cached like _run_ocr.
+    """
+    settings = _get_ocr_settings(log_file_path)
+    lang, config = settings["lang"], settings["config"]
+    key = (frame_digest(image), "data", lang, config, "parallel")
+    def compute():
+        with span("ocr"):
+            return parallel_ocr_data(image, lang, config, workers=workers)
+    return _current_frame_cache().get_or_compute(key, compute)
+
+def _text_index(image, log_file_path=None):
+    """Returns the spatial word index for a frame, built once per frame content."""
+    settings = _get_ocr_settings(log_file_path)
+    key = (frame_digest(image), "index", settings["lang"], settings["config"], get_preprocess_config())
+    def compute():
+        ocr_data = _run_ocr(image, "data", log_file_path)
+        with span("index"):
+            return TextIndex(ocr_data)
+    return _current_frame_cache().get_or_compute(key, compute)
+
+def _search_ocr_data(ocr_data, target_text, match="casefold"):
+    """Returns the best match of target_text in an OCR data dict as {"x", "y", "confidence", ...}, or None."""
+    hits = TextIndex(ocr_data).search(target_text, mode=match, limit=1)
+    return hits[0] if hits else None
+
+def configure_frame_cache(ttl=None, max_entries=None, enabled=None):
+    """Adjusts the frame/OCR cache (of the current session, if any). Returns the current cache stats."""
+    cache = _current_frame_cache()
+    if ttl is not None:
+        cache.ttl = ttl
+    if max_entries is not None:
+        cache.max_entries = max_entries
+    if enabled is not None:
+        cache.enabled = enabled
+        if not enabled:
+            cache.clear()
+    return cache.stats()
+
+def clear_frame_cache():
+    """Drops all cached OCR results."""
+    _current_frame_cache().clear()
+
+def configure_frame_buffers(max_mb=None, enabled=None, clear=False, reset_peak=False):
+    """
+    Adjusts the pooled frame buffers (see frame_buffers.py): max_mb is the
+    hard cap on frame memory, enabled=False goes back to a fresh PIL image
+    per capture, clear drops idle buffers. Returns pool, screenshot writer
+    and peak memory stats.
+    """
+    pool = get_frame_pool()
+    if max_mb is not None:
+        pool.max_bytes = int(max_mb * 2 ** 20)
+    if enabled is not None:
+        pool.enabled = enabled
+    if clear or enabled is False:
+        pool.clear()
+    if reset_peak:
+        pool.reset_peak()
+    stats = pool.stats()
+    stats["available"] = HAVE_NUMPY
+    stats["screenshots"] = get_screenshot_writer().stats()
+    stats["peak_rss_mb"] = peak_rss_mb()
+    return stats
+
+def configure_ocr_preprocessing(preset=None, **options):
+    """
+    Selects the frame preprocessing applied before OCR: a preset ("off",
+    "fast", "accurate") and/or PreprocessConfig field overrides such as
+    scale=2.0 or threshold="adaptive". Returns the active configuration
+    and the per-stage timings.
+    """
+    config = set_preprocess_config(preset, **options)
+    return {"config": config._asdict(), "stages": get_preprocess_stats()}
 
 # --- Enhanced Vision Functions ---
-def analyze_screen_state(log_file_path=None):
+@traced_action
+def analyze_screen_state(parallel=False, workers=None, log_file_path=None):
     """
     Captures screenshot and performs OCR to understand current screen content.
     Returns a dictionary with screen analysis results.
+
+    parallel=True splits the screen into overlapping bands and OCRs them in
+    a process pool (workers processes, default: all cores); words that
+    straddle band seams are de-duplicated before lines are rebuilt.
     """
-    params = {}
+    params = {"parallel": parallel, "workers": workers}
     try:
         # Take screenshot
-        screenshot = pyautogui.screenshot()
+        screenshot = _capture_screen()
         
-        # Perform OCR on entire screen with better config
-        # 尝试多种语言和配置
-        try:
-            # 首先尝试中英文混合识别
-            screen_text = pytesseract.image_to_string(screenshot, lang='chi_sim+eng', config='--psm 6')
-        except:
-            try:
-                # 如果没有中文包，尝试英文
-                screen_text = pytesseract.image_to_string(screenshot, config='--psm 6')
-            except:
-                # 最后使用默认配置
-                screen_text = pytesseract.image_to_string(screenshot)
+        # Perform OCR on entire screen (cached per frame content)
+        if parallel:
+            ocr_data = _run_parallel_ocr(screenshot, workers, log_file_path)
+            screen_text = '\n'.join(
+                ' '.join(str(ocr_data['text'][i]) for i in line) for line in group_lines(ocr_data))
+        else:
+            screen_text = _run_ocr(screenshot, "string", log_file_path)
         
         # Get screen dimensions
         screen_width, screen_height = screenshot.size
@@ -97,63 +325,137 @@ def analyze_screen_state(log_file_path=None):
         _log_action(log_file_path, "analyze_screen_state", params, "error", result)
         return {"error": str(e)}
 
-def find_text_on_screen(target_text, log_file_path=None):
+def find_text_on_screen(target_text, region=None, match="casefold", log_file_path=None):
     """
     Searches for specific text on screen and returns its approximate location.
     Returns coordinates if found, None if not found.
+
+    region limits capture and OCR to part of the screen (absolute box,
+    window-relative dict or named region, see regions.py); the returned
+    coordinates are always in screen space. match is "exact", "casefold"
+    or "fuzzy"; phrases split into several OCR words are matched as a whole.
     """
-    params = {"target_text": target_text}
+    return _locate_text(target_text, region, match, log_file_path)[0]
+
+@traced_action(name="find_text_on_screen")
+def _locate_text(target_text, region=None, match="casefold", log_file_path=None):
+    """
+    find_text_on_screen, also returning the searched frame and the box it was
+    captured from: (location or None, frame or None, box). Traced and logged
+    as find_text_on_screen.
+    """
+    params = {"target_text": target_text, "region": region, "match": match}
+    screenshot = box = None
     try:
-        # Take screenshot
-        screenshot = pyautogui.screenshot()
-        
-        # Get OCR data with bounding boxes using better config
-        try:
-            # 首先尝试中英文混合识别
-            ocr_data = pytesseract.image_to_data(screenshot, lang='chi_sim+eng', config='--psm 6', output_type=pytesseract.Output.DICT)
-        except:
-            try:
-                # 如果没有中文包，尝试英文
-                ocr_data = pytesseract.image_to_data(screenshot, config='--psm 6', output_type=pytesseract.Output.DICT)
-            except:
-                # 最后使用默认配置
-                ocr_data = pytesseract.image_to_data(screenshot, output_type=pytesseract.Output.DICT)
-        
-        # Search for target text
-        for i, text in enumerate(ocr_data['text']):
-            if target_text.lower() in text.lower() and int(ocr_data['conf'][i]) > 30:  # confidence threshold
-                x = ocr_data['left'][i] + ocr_data['width'][i] // 2
-                y = ocr_data['top'][i] + ocr_data['height'][i] // 2
-                
-                result = f"Found '{target_text}' at ({x}, {y})"
-                _log_action(log_file_path, "find_text_on_screen", params, "success", result)
-                return {"x": x, "y": y, "confidence": ocr_data['conf'][i]}
+        box = resolve_region(region)
+        screenshot = _capture_screen(box)
+        hits = _search_frame(screenshot, box, target_text, match, limit=1, log_file_path=log_file_path)
+        if hits:
+            location = hits[0]
+            result = f"Found '{target_text}' at ({location['x']}, {location['y']})"
+            _log_action(log_file_path, "find_text_on_screen", params, "success", result)
+            return location, screenshot, box
         
         result = f"Text '{target_text}' not found on screen"
         _log_action(log_file_path, "find_text_on_screen", params, "not_found", result)
-        return None
+        return None, screenshot, box
         
     except Exception as e:
         result = f"Error searching for text: {e}"
         _log_action(log_file_path, "find_text_on_screen", params, "error", result)
-        return None
+        return None, screenshot, box
+
+def _find_text_hits(target_text, region=None, match="casefold", near=None, limit=None, log_file_path=None):
+    """Captures (the region of) the screen and returns ranked text hits in screen coordinates."""
+    # Take screenshot (only the region of interest if given)
+    box = resolve_region(region)
+    screenshot = _capture_screen(box)
+    return _search_frame(screenshot, box, target_text, match, near, limit, log_file_path)
 
-def wait_for_text_appear(target_text, timeout=10, check_interval=1, log_file_path=None):
+def _search_frame(screenshot, box, target_text, match="casefold", near=None, limit=None, log_file_path=None):
+    """Ranked text hits in a frame captured from box (None: the whole screen), in screen coordinates."""
+    # OCR once per frame content; the index answers any number of queries
+    index = _text_index(screenshot, log_file_path)
+    if near and box:
+        near = (near[0] - box[0], near[1] - box[1])
+    with span("search"):
+        hits = index.search(target_text, mode=match, near=near, limit=limit)
+    for hit in hits:
+        to_screen(hit, box)
+        if box:
+            hit["box"] = [hit["box"][0] + box[0], hit["box"][1] + box[1], hit["box"][2], hit["box"][3]]
+    return hits
+
+@traced_action
+def find_all_text_on_screen(target_text, region=None, match="casefold", near=None, log_file_path=None):
+    """
+    Returns every on-screen match of target_text, best first (or nearest to
+    near=(x, y) first). Each hit has "x", "y", "confidence", "text", "box",
+    "distance" and "score".
+    """
+    params = {"target_text": target_text, "region": region, "match": match, "near": near}
+    try:
+        hits = _find_text_hits(target_text, region, match, near, log_file_path=log_file_path)
+        status = "success" if hits else "not_found"
+        result = f"Found {len(hits)} matches for '{target_text}'"
+        _log_action(log_file_path, "find_all_text_on_screen", params, status, result)
+        return hits
+    except Exception as e:
+        result = f"Error searching for text: {e}"
+        _log_action(log_file_path, "find_all_text_on_screen", params, "error", result)
+        return []
+
+@traced_action
+def wait_for_text_appear(target_text, timeout=10, check_interval=1, incremental=False, region=None,
+                         match="casefold", event_driven=True, log_file_path=None):
     """
     Waits for specific text to appear on screen within timeout period.
     Returns True if text appears, False if timeout.
+
+    By default the wait is event driven: cheap low-resolution frame
+    signatures are sampled with adaptive backoff (capped at check_interval)
+    and OCR runs again once the screen (or region) has changed and settled,
+    or after check_interval seconds without a change the signature can see
+    (an unchanged frame is answered from the frame cache).
+    event_driven=False restores fixed check_interval polling.
+    With incremental=True each OCR pass re-reads only the screen tiles that
+    changed since the previous one. region limits the search to part of
+    the screen.
     """
-    params = {"target_text": target_text, "timeout": timeout, "check_interval": check_interval}
+    params = {"target_text": target_text, "timeout": timeout, "check_interval": check_interval,
+              "incremental": incremental, "region": region, "match": match, "event_driven": event_driven}
     try:
         start_time = time.time()
+        box = resolve_region(region)
+        # the tracker keeps its own per-tile results, so tiles stay out of the shared frame cache
+        tracker = IncrementalOCR(lambda tile: _run_ocr(tile, "data", log_file_path, cache=False)) \
+            if incremental else None
         
-        while time.time() - start_time < timeout:
-            if find_text_on_screen(target_text, log_file_path):
-                result = f"Text '{target_text}' appeared after {time.time() - start_time:.1f} seconds"
-                _log_action(log_file_path, "wait_for_text_appear", params, "success", result)
-                return True
-            
-            time.sleep(check_interval)
+        def check(frame):
+            if tracker:
+                ocr_data = tracker.update(frame)
+                with span("search"):
+                    return _search_ocr_data(ocr_data, target_text, match)
+            index = _text_index(frame, log_file_path)
+            with span("search"):
+                return index.search(target_text, mode=match, limit=1)
+        
+        found = None
+        if event_driven:
+            waiter = _change_waiter(box, max_interval=check_interval)
+            found, _ = waiter.poll(check, timeout, recheck_interval=check_interval)
+        else:
+            while time.time() - start_time < timeout:
+                found = check(_capture_screen(box))
+                if found:
+                    break
+                with span("sleep"):
+                    time.sleep(check_interval)
+        
+        if found:
+            result = f"Text '{target_text}' appeared after {time.time() - start_time:.1f} seconds"
+            _log_action(log_file_path, "wait_for_text_appear", params, "success", result)
+            return True
         
         result = f"Text '{target_text}' did not appear within {timeout} seconds"
         _log_action(log_file_path, "wait_for_text_appear", params, "timeout", result)
@@ -164,16 +466,69 @@ def wait_for_text_appear(target_text, timeout=10, check_interval=1, log_file_pat
         _log_action(log_file_path, "wait_for_text_appear", params, "error", result)
         return False
 
+@traced_action
+def benchmark_screen_capture(samples=20, log_file_path=None):
+    """
+    Measures capture latency of the active screen source.
+    Returns a dictionary with min/p50/p95/max milliseconds.
+    """
+    params = {"samples": samples}
+    try:
+        stats = measure_capture_latency(get_screen_source(), samples)
+        result = f"{stats['source']} capture p50 {stats['p50_ms']} ms over {samples} samples"
+        _log_action(log_file_path, "benchmark_screen_capture", params, "success", result)
+        return stats
+    except Exception as e:
+        result = f"Error benchmarking screen capture: {e}"
+        _log_action(log_file_path, "benchmark_screen_capture", params, "error", result)
+        return {"error": str(e)}
+
+@traced_action
+def check_ocr_engine(log_file_path=None):
+    """
+    Health-checks the OCR worker pool, restarting crashed workers.
+    Returns a dictionary with the pool status.
+    """
+    params = {}
+    try:
+        status = get_ocr_engine().health_check()
+        result = f"OCR engine ({status['backend']}): {status['checked']} workers checked, {status['restarted']} restarted"
+        _log_action(log_file_path, "check_ocr_engine", params, "success", result)
+        return status
+    except Exception as e:
+        result = f"Error checking OCR engine: {e}"
+        _log_action(log_file_path, "check_ocr_engine", params, "error", result)
+        return {"error": str(e)}
+
 # --- Automation Functions (Eyes & Hands) ---
 
-def take_screenshot(file_path="screenshot.png", log_file_path=None):
-    params = {"file_path": file_path}
+@traced_action
+def take_screenshot(file_path="screenshot.png", encoding="png", log_file_path=None):
+    """
+    Saves the screen to file_path. encoding "png" encodes synchronously
+    (format from the extension), "raw" writes unencoded RGB bytes as a
+    replayable "<name>_<W>x<H>.rgb" frame, and "async" queues the PNG
+    encoding on a background thread (see frame_buffers.py) and returns at once.
+    """
+    params = {"file_path": file_path, "encoding": encoding}
     try:
+        if encoding not in ("png", "raw", "async"):
+            raise ValueError(f"Unknown encoding '{encoding}' (use png, raw or async)")
         screenshot_dir = os.path.dirname(file_path)
         if screenshot_dir: os.makedirs(screenshot_dir, exist_ok=True)
-        screenshot = pyautogui.screenshot()
-        screenshot.save(file_path)
-        result = f"Screenshot saved to {file_path}"
+        if encoding == "png" or not _frame_buffers_enabled():
+            screenshot = _capture_screen()
+            with span("save"):
+                screenshot.save(file_path)
+            result = f"Screenshot saved to {file_path}"
+        elif encoding == "raw":
+            with _capture_array() as frame, span("save"):
+                file_path = frame.save_raw(file_path)
+            result = f"Screenshot saved to {file_path}"
+        else:
+            # the writer releases the buffer once the PNG is written
+            get_screenshot_writer().submit(_capture_array(), file_path)
+            result = f"Screenshot queued for {file_path}"
         _log_action(log_file_path, "take_screenshot", params, "success", result)
         return result
     except Exception as e:
@@ -181,11 +536,12 @@ def take_screenshot(file_path="screenshot.png", log_file_path=None):
         _log_action(log_file_path, "take_screenshot", params, "error", result)
         return result
 
+@traced_action
 def move_and_click(x, y, button='left', log_file_path=None):
     params = {"x": x, "y": y, "button": button}
     try:
-        pyautogui.moveTo(x, y, duration=0.5)
-        pyautogui.click(button=button)
+        # Mouse travel time follows the motion profile (see input_engine.py)
+        get_input_engine().click(x, y, button)
         result = f"Clicked {button} button at ({x}, {y})"
         _log_action(log_file_path, "move_and_click", params, "success", result)
         return result
@@ -194,27 +550,103 @@ def move_and_click(x, y, button='left', log_file_path=None):
         _log_action(log_file_path, "move_and_click", params, "error", result)
         return result
 
-def smart_click_text(target_text, button='left', max_retries=3, log_file_path=None):
+def _cached_click_location(target_text, region, match):
+    """
+    Returns the remembered location of target_text when a crop of its last
+    known box still matches the recorded signature, else None (and forgets it).
+    """
+    with span("location_cache"):
+        key = LocationCache.key(target_text, match, region, get_screen_source().size())
+        entry = _location_cache.lookup(key)
+        if entry is None:
+            return None
+        box = resolve_region(region)
+        origin = (box[0], box[1]) if box else (0, 0)
+        left, top, width, height = entry["crop"]
+        crop = _capture_screen((origin[0] + left, origin[1] + top, width, height))
+        if not _location_cache.verify(entry, crop):
+            _location_cache.forget(key)
+            return None
+        return {"x": origin[0] + entry["point"][0], "y": origin[1] + entry["point"][1], "cached": True}
+
+def _remember_click_location(target_text, region, match, location, frame, box):
+    """
+    Records where OCR found target_text. The signature comes from frame, the
+    capture of box (None: the whole screen) that was just OCR'd.
+    """
+    if not _location_cache.enabled or not location.get("box"):
+        return
+    with span("location_cache"):
+        screen_size = get_screen_source().size()
+        origin = (box[0], box[1]) if box else (0, 0)
+        crop_box = _location_cache.crop_box(location["box"], (origin[0], origin[1], frame.size[0], frame.size[1]))
+        left, top = crop_box[0] - origin[0], crop_box[1] - origin[1]
+        crop = frame.crop((left, top, left + crop_box[2], top + crop_box[3]))
+        _location_cache.store(LocationCache.key(target_text, match, region, screen_size), crop_box,
+                              (location["x"], location["y"]), origin, crop)
+
+def configure_location_cache(enabled=None, threshold=None, clear=False):
+    """
+    Adjusts the smart_click_text location cache: enabled turns it on/off,
+    threshold is the largest signature difference still accepted, clear
+    forgets every learned location. Returns the cache stats.
+    """
+    if enabled is not None:
+        _location_cache.enabled = enabled
+    if threshold is not None:
+        _location_cache.threshold = threshold
+    if clear:
+        _location_cache.forget()
+    return _location_cache.stats()
+
+def _find_click_target(target_text, region, match, try_cache, remember, log_file_path=None):
+    """
+    Where smart_click_text should click: a cached location that still checks
+    out, else the OCR hit (remembered before the click changes the screen).
+    """
+    if try_cache:
+        location = _cached_click_location(target_text, region, match)
+        if location:
+            return location
+    location, frame, box = _locate_text(target_text, region, match, log_file_path)
+    if location and remember:
+        _remember_click_location(target_text, region, match, location, frame, box)
+    return location
+
+def _clicked_message(target_text, location, attempt):
+    where = "from the location cache" if location.get("cached") else f"on attempt {attempt + 1}"
+    return f"Successfully clicked '{target_text}' at ({location['x']}, {location['y']}) {where}"
+
+@traced_action
+def smart_click_text(target_text, button='left', max_retries=3, region=None, match="casefold", use_cache=True,
+                     log_file_path=None):
     """
     Intelligently finds and clicks on text. More reliable than hardcoded coordinates.
+    region limits the search to part of the screen, match selects exact,
+    casefold or fuzzy matching. With use_cache a location learned on an
+    earlier call is clicked right away if a cheap crop check confirms the
+    label is still there; otherwise the screen is OCR'd as usual.
     """
-    params = {"target_text": target_text, "button": button, "max_retries": max_retries}
+    params = {"target_text": target_text, "button": button, "max_retries": max_retries, "region": region, "match": match}
+    # Between retries wait for the screen to change (up to 1 s) instead of sleeping blindly
+    waiter = None
+    use_cache = use_cache and _location_cache.enabled
     
     for attempt in range(max_retries):
         try:
-            # Find text location
-            location = find_text_on_screen(target_text, log_file_path)
+            location = _find_click_target(target_text, region, match, use_cache and attempt == 0, use_cache,
+                                          log_file_path)
             if location:
                 # Click on the text
-                pyautogui.moveTo(location['x'], location['y'], duration=0.5)
-                pyautogui.click(button=button)
-                
-                result = f"Successfully clicked '{target_text}' at ({location['x']}, {location['y']}) on attempt {attempt + 1}"
+                get_input_engine().click(location['x'], location['y'], button)
+                result = _clicked_message(target_text, location, attempt)
                 _log_action(log_file_path, "smart_click_text", params, "success", result)
                 return result
             else:
                 if attempt < max_retries - 1:
-                    time.sleep(1)  # Wait before retry
+                    waiter = waiter or _change_waiter(resolve_region(region))
+                    with span("wait_change"):
+                        waiter.wait_for_change(1)  # Wait before retry
                     continue
                 else:
                     result = f"Failed to find text '{target_text}' after {max_retries} attempts"
@@ -223,7 +655,8 @@ def smart_click_text(target_text, button='left', max_retries=3, log_file_path=No
                     
         except Exception as e:
             if attempt < max_retries - 1:
-                time.sleep(1)  # Wait before retry
+                with span("sleep"):
+                    time.sleep(1)  # Wait before retry
                 continue
             else:
                 result = f"Error clicking text '{target_text}': {e}"
@@ -234,13 +667,14 @@ def smart_click_text(target_text, button='left', max_retries=3, log_file_path=No
     _log_action(log_file_path, "smart_click_text", params, "failed", result)
     return result
 
-def verify_operation_result(expected_text, timeout=5, log_file_path=None):
+@traced_action
+def verify_operation_result(expected_text, timeout=5, region=None, log_file_path=None):
     """
     Verifies that an operation was successful by checking if expected text appears.
     """
-    params = {"expected_text": expected_text, "timeout": timeout}
+    params = {"expected_text": expected_text, "timeout": timeout, "region": region}
     try:
-        success = wait_for_text_appear(expected_text, timeout, 0.5, log_file_path)
+        success = wait_for_text_appear(expected_text, timeout, 0.5, region=region, log_file_path=log_file_path)
         if success:
             result = f"Operation verified: '{expected_text}' found on screen"
             _log_action(log_file_path, "verify_operation_result", params, "success", result)
@@ -255,36 +689,90 @@ def verify_operation_result(expected_text, timeout=5, log_file_path=None):
         _log_action(log_file_path, "verify_operation_result", params, "error", result)
         return False
 
-def find_and_click_image(image_description, model_analysis_base64, log_file_path=None):
-    params = {"image_description": image_description}
-    template_image = None
-    temp_template_path = None
+def _template_match():
+    """The template matcher (NumPy/OpenCV) is imported by the first image search."""
+    try:
+        from . import template_match
+    except ImportError:
+        import template_match
+    return template_match
+
+def _locate_image(model_analysis_base64, region=None, confidence=0.9, multi_scale=False, dpi_scale=1.0):
+    """
+    Finds a base64 PNG template on screen with the in-process matcher.
+    Decoded templates and their pyramids are cached by content hash.
+    Returns {"x", "y", "left", "top", "width", "height", "score", "scale"} or None.
+    """
+    box = resolve_region(region)
+    if _frame_buffers_enabled():
+        with _capture_array(box) as frame:
+            return _match_image(frame.array, box, model_analysis_base64, confidence, multi_scale, dpi_scale)
+    return _match_image(_capture_screen(box), box, model_analysis_base64, confidence, multi_scale, dpi_scale)
+
+def _match_image(screen, box, model_analysis_base64, confidence=0.9, multi_scale=False, dpi_scale=1.0):
+    """Template search in a frame (PIL image or RGB array) captured from box, in screen coordinates."""
+    matcher = _template_match()
+    template = matcher.get_template(model_analysis_base64)
+    scales = tuple(s * dpi_scale for s in matcher.MULTI_SCALES) if multi_scale else (dpi_scale,)
+    with span("template_match"):
+        found = matcher.locate_template(screen, template, confidence, scales)
+    if found and box:
+        for key in ("x", "left"):
+            found[key] += box[0]
+        for key in ("y", "top"):
+            found[key] += box[1]
+    return found
+
+@traced_action
+def find_image_on_screen(image_description, model_analysis_base64, region=None, confidence=0.9,
+                         multi_scale=False, dpi_scale=1.0, log_file_path=None):
+    """
+    Locates a template image (base64 PNG) on screen without clicking it.
+    multi_scale also tries 0.75x-2x sizes, dpi_scale scales the template for
+    displays whose scaling differs from where it was captured.
+    Returns the match dictionary or None.
+    """
+    params = {"image_description": image_description, "region": region, "confidence": confidence,
+              "multi_scale": multi_scale, "dpi_scale": dpi_scale}
+    try:
+        found = _locate_image(model_analysis_base64, region, confidence, multi_scale, dpi_scale)
+        if found:
+            result = f"Found '{image_description}' at ({found['x']}, {found['y']}) score {found['score']}"
+            _log_action(log_file_path, "find_image_on_screen", params, "success", result)
+        else:
+            result = f"Image '{image_description}' not found on screen"
+            _log_action(log_file_path, "find_image_on_screen", params, "not_found", result)
+        return found
+    except Exception as e:
+        result = f"Error searching for image: {e}"
+        _log_action(log_file_path, "find_image_on_screen", params, "error", result)
+        return None
+
+@traced_action
+def find_and_click_image(image_description, model_analysis_base64, region=None, confidence=0.9,
+                         multi_scale=False, dpi_scale=1.0, log_file_path=None):
+    params = {"image_description": image_description, "region": region, "confidence": confidence,
+              "multi_scale": multi_scale, "dpi_scale": dpi_scale}
     try:
-        template_image = _get_image_from_base64(model_analysis_base64)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        temp_template_path = os.path.join(TEMP_DIR, f"template_{timestamp}.png")
-        template_image.save(temp_template_path)
-        location = pyautogui.locateCenterOnScreen(temp_template_path, confidence=0.9)
+        location = _locate_image(model_analysis_base64, region, confidence, multi_scale, dpi_scale)
         if location is None:
             raise FileNotFoundError(f"Could not find the image for '{image_description}' on the screen.")
-        move_and_click(location.x, location.y, log_file_path=log_file_path)
-        result = f"Successfully found and clicked '{image_description}' at {location}."
+        move_and_click(location['x'], location['y'], log_file_path=log_file_path)
+        result = f"Successfully found and clicked '{image_description}' at ({location['x']}, {location['y']})."
         _log_action(log_file_path, "find_and_click_image", params, "success", result)
         return result
     except Exception as e:
         result = f"Error in find_and_click_image: {e}"
         _log_action(log_file_path, "find_and_click_image", params, "error", result)
         return result
-    finally:
-        if temp_template_path and os.path.exists(temp_template_path):
-            os.remove(temp_template_path)
 
+@traced_action
 def ocr_from_screen_area(x1, y1, x2, y2, log_file_path=None):
     params = {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
     try:
         region = (x1, y1, x2 - x1, y2 - y1)
-        screenshot = pyautogui.screenshot(region=region)
-        text = pytesseract.image_to_string(screenshot)
+        screenshot = _capture_screen(region)
+        text = _preprocessed_ocr(screenshot, "string", None, '')
         result = text.strip()
         _log_action(log_file_path, "ocr_from_screen_area", params, "success", result)
         return result
@@ -293,11 +781,18 @@ def ocr_from_screen_area(x1, y1, x2, y2, log_file_path=None):
         _log_action(log_file_path, "ocr_from_screen_area", params, "error", result)
         return result
 
-def type_text(text, interval=0.1, log_file_path=None):
-    params = {"text": text, "interval": interval}
+@traced_action
+def type_text(text, interval=None, method="auto", log_file_path=None):
+    """
+    Enters text. method "auto" pastes long text and text the keyboard can't
+    type (Chinese, newlines) and types the rest; "type" and "paste" force one.
+    interval defaults to the motion profile's per-character delay.
+    """
+    params = {"text": text, "interval": interval, "method": method}
     try:
-        pyautogui.typewrite(text, interval=interval)
-        result = f"Typed text: {text}"
+        report = get_input_engine().type_text(text, interval=interval, method=method)
+        used = report["records"][0]["method"]
+        result = f"Typed text: {text}" if used == "type" else f"Pasted text: {text}"
         _log_action(log_file_path, "type_text", params, "success", result)
         return result
     except Exception as e:
@@ -305,35 +800,14 @@ def type_text(text, interval=0.1, log_file_path=None):
         _log_action(log_file_path, "type_text", params, "error", result)
         return result
 
+@traced_action
 def paste_text(text, log_file_path=None):
     """
-    通过剪贴板直接粘贴文字，避免输入法问题
+    通过剪贴板直接粘贴文字，避免输入法问题 (粘贴后恢复原剪贴板内容)
     """
     params = {"text": text}
     try:
-        # 导入剪贴板模块
-        import pyperclip
-        
-        # 保存当前剪贴板内容
-        original_clipboard = ""
-        try:
-            original_clipboard = pyperclip.paste()
-        except:
-            pass
-        
-        # 将文字放入剪贴板
-        pyperclip.copy(text)
-        
-        # 执行粘贴操作 (Ctrl+V)
-        pyautogui.hotkey('ctrl', 'v')
-        
-        # 恢复原剪贴板内容
-        try:
-            if original_clipboard:
-                pyperclip.copy(original_clipboard)
-        except:
-            pass
-        
+        get_input_engine().type_text(text, method="paste")
         result = f"Pasted text: {text}"
         _log_action(log_file_path, "paste_text", params, "success", result)
         return result
@@ -342,11 +816,12 @@ def paste_text(text, log_file_path=None):
         _log_action(log_file_path, "paste_text", params, "error", result)
         return result
 
+@traced_action
 def press_hotkey(*keys, log_file_path=None):
     actual_keys = keys
     params = {"keys": actual_keys}
     try:
-        pyautogui.hotkey(*actual_keys)
+        get_input_engine().hotkey(actual_keys)
         result = f"Pressed hotkey: {'+'.join(actual_keys)}"
         _log_action(log_file_path, "press_hotkey", params, "success", result)
         return result
@@ -355,12 +830,35 @@ def press_hotkey(*keys, log_file_path=None):
         _log_action(log_file_path, "press_hotkey", params, "error", result)
         return result
 
+@traced_action
+def send_input_batch(events, profile=None, log_file_path=None):
+    """
+    Runs a batch of input events in one go, e.g.
+    [{"type": "click", "x": 100, "y": 200}, {"type": "text", "text": "你好"},
+     {"type": "hotkey", "keys": ["ctrl", "enter"]}]
+    Event types: move, click, hotkey, press, text (method auto/type/paste), pause.
+    profile overrides the motion profile for this batch. Returns the dispatch
+    latency report, or an error string.
+    """
+    params = {"events": events, "profile": profile}
+    try:
+        report = get_input_engine().run(events, profile=profile)
+        summary = {k: v for k, v in report.items() if k != "records"}
+        _log_action(log_file_path, "send_input_batch", params, "success", summary)
+        return report
+    except Exception as e:
+        result = f"Error sending input batch: {e}"
+        _log_action(log_file_path, "send_input_batch", params, "error", result)
+        return result
+
 # --- NEW wait FUNCTION ---
+@traced_action
 def wait(seconds, log_file_path=None):
     """Pauses execution for a specified number of seconds."""
     params = {"seconds": seconds}
     try:
-        time.sleep(seconds)
+        with span("sleep"):
+            time.sleep(seconds)
         result = f"Waited for {seconds} seconds."
         _log_action(log_file_path, "wait", params, "success", result)
         return result
@@ -0,0 +1,340 @@
+"""
+Resident automation daemon with a localhost JSON-RPC API.
+
+每次运行 cli.py 都要付出 Python 启动、导入 pyautogui/pytesseract/PIL、OCR 冷启动的代价，
+逐步驱动工具的代理每一步都在重复这些开销。常驻进程 (cli.py serve) 保持模块、OCR 工作进程
+和各级缓存常热，通过 127.0.0.1 上的 JSON-RPC 2.0 (每行一个 JSON 请求) 提供 core.py 的动作和
+execute_workflow；cli.py 检测到守护进程在运行时只做一个轻量客户端，把请求转发过去。
+
+- 只监听本机回环地址；端口和随机令牌写入状态文件 (默认 ~/.desktop_automation/daemon.json)，
+  每个请求必须带上 "token"
+- 动作串行执行 (鼠标/键盘是全局资源)，ping/stats 不排队
+- 动作打印的内容被捕获后随结果返回，由客户端输出
+- 客户端的 --screen_source/--motion_profile/--preprocess 作为请求的 "overrides" 发送，
+  只在这一次请求内生效，结束后恢复守护进程自己的设置
+本模块在导入时不加载 core，客户端路径保持轻量。
+"""
+import contextlib
+import inspect
+import io
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+# --- Configuration ---
+STATE_FILE_ENV = "DESKTOP_AUTOMATION_DAEMON_FILE"
+DISABLE_ENV = "DESKTOP_AUTOMATION_NO_DAEMON"
+DEFAULT_STATE_FILE = os.path.join(os.path.expanduser("~"), ".desktop_automation", "daemon.json")
+HOST = "127.0.0.1"
+CONNECT_TIMEOUT = 0.25      # seconds; a stale state file must not slow down the local fallback
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+ACTION_ERROR = -32000
+UNAUTHORIZED = -32001
+
+# Per-request settings a client may send in "overrides"
+OVERRIDES = ("screen_source", "replay_dir", "motion_profile", "preprocess")
+
+
+class DaemonError(Exception):
+    """An error response from the daemon."""
+
+    def __init__(self, message, code=ACTION_ERROR, output=""):
+        super().__init__(message)
+        self.code = code
+        self.output = output
+
+
+def state_file_path():
+    return os.environ.get(STATE_FILE_ENV) or DEFAULT_STATE_FILE
+
+
+def call_action(func, params):
+    """
+    Calls an action with a params dict the way the CLI and workflows do:
+    log_file_path is dropped when func does not accept it and a *args
+    parameter (press_hotkey's keys) is passed positionally.
+    """
+    params = dict(params)
+    signature = inspect.signature(func)
+    if 'log_file_path' not in signature.parameters:
+        params.pop('log_file_path', None)
+    args = ()
+    for p in signature.parameters.values():
+        if p.kind is inspect.Parameter.VAR_POSITIONAL and p.name in params:
+            value = params.pop(p.name)
+            args = tuple(value) if isinstance(value, (list, tuple)) else (value,)
+    return func(*args, **params)
+
+
+# --- Server ---
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            automation = self.server.automation
+            response = automation.handle_line(line)
+            self.wfile.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if automation.stop_requested:
+                # Stop only after the "shutdown" reply has been delivered
+                threading.Thread(target=automation.shutdown, daemon=True).start()
+                return
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class AutomationDaemon:
+    """Serves core.py actions over localhost JSON-RPC until shutdown() or the "shutdown" method."""
+
+    def __init__(self, port=0, state_file=None, warm_up=True):
+        self.state_file = state_file or state_file_path()
+        self.token = secrets.token_hex(16)
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.stop_requested = False
+        self._action_lock = threading.Lock()
+        self._server = _Server((HOST, port), _Handler)
+        self._server.automation = self
+        self.port = self._server.server_address[1]
+
+        # Import everything once; later requests only pay for the action itself
+        try:
+            from . import core
+            from . import cli
+            from .screen_source import screen_source_override
+            from .input_engine import motion_profile_override
+            from .preprocess import preprocess_override
+        except ImportError:
+            import core
+            import cli
+            from screen_source import screen_source_override
+            from input_engine import motion_profile_override
+            from preprocess import preprocess_override
+        self._core = core
+        self._cli = cli
+        self._screen_source_override = screen_source_override
+        self._motion_profile_override = motion_profile_override
+        self._preprocess_override = preprocess_override
+        if warm_up:
+            self._warm_up()
+
+    def _warm_up(self):
+        try:
+            self._core.get_ocr_engine()
+            self._core._get_ocr_settings()
+        except Exception as e:
+            print(f"OCR warm-up skipped: {e}", file=sys.stderr)
+
+    def _methods(self):
+        return {"ping": self._ping, "stats": self._stats, "shutdown": self._shutdown,
+                "execute_workflow": self._execute_workflow,
+                "execute_workflow_batch": self._execute_workflow_batch}
+
+    def _ping(self):
+        return {"pid": os.getpid(), "uptime_s": round(time.time() - self.started_at, 3)}
+
+    def _stats(self):
+        return {"pid": os.getpid(), "uptime_s": round(time.time() - self.started_at, 3),
+                "requests": self.requests, "errors": self.errors,
+                "frame_cache": self._core._frame_cache.stats()}
+
+    def _shutdown(self):
+        self.stop_requested = True
+        return "shutting down"
+
+    def _execute_workflow(self, name, params=None, log_file_path=None, memo=False):
+        self._cli._run_named_workflow(name, log_file_path, params or {}, memo)
+        return True
+
+    def _execute_workflow_batch(self, name, batch_file, options=None, log_file_path=None):
+        return self._cli._run_workflow_batch(name, batch_file, log_file_path, options or {})
+
+    def _apply_overrides(self, stack, overrides):
+        """Enters the request's overrides on stack; leaving it restores the daemon's own settings."""
+        source = overrides.get("screen_source")
+        if source == "replay":
+            stack.enter_context(self._screen_source_override(source, frames=overrides.get("replay_dir") or ""))
+        elif source:
+            stack.enter_context(self._screen_source_override(source))
+        if overrides.get("motion_profile"):
+            stack.enter_context(self._motion_profile_override(overrides["motion_profile"]))
+        if overrides.get("preprocess"):
+            stack.enter_context(self._preprocess_override(overrides["preprocess"]))
+
+    def _resolve(self, method):
+        builtin = self._methods().get(method)
+        if builtin is not None:
+            return builtin, False
+        func = getattr(self._core, method, None)
+        if method.startswith('_') or not inspect.isfunction(func):
+            return None, False
+        return func, True
+
+    def handle_line(self, line):
+        """Handles one JSON-RPC request line and returns the response dict."""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, f"Parse error: {e}")
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _error(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get("id")
+        if not secrets.compare_digest(str(request.get("token", "")), self.token):
+            return _error(request_id, UNAUTHORIZED, "Invalid or missing token")
+
+        method = request["method"]
+        params = request.get("params") or {}
+        func, is_action = self._resolve(method)
+        if func is None:
+            return _error(request_id, METHOD_NOT_FOUND, f"Method '{method}' not found")
+        if not isinstance(params, dict):
+            return _error(request_id, INVALID_PARAMS, "params must be an object")
+        overrides = request.get("overrides") or {}
+        if not isinstance(overrides, dict) or set(overrides) - set(OVERRIDES):
+            return _error(request_id, INVALID_PARAMS, f"overrides must be an object with keys from {OVERRIDES}")
+
+        self.requests += 1
+        start = time.perf_counter()
+        output = io.StringIO()
+        try:
+            if is_action or method in ("execute_workflow", "execute_workflow_batch"):
+                # Mouse, keyboard and screen are shared: one action at a time
+                with self._action_lock, contextlib.redirect_stdout(output), contextlib.ExitStack() as stack:
+                    self._apply_overrides(stack, overrides)
+                    result = call_action(func, params)
+            elif overrides:
+                return _error(request_id, INVALID_PARAMS, f"'{method}' does not take overrides")
+            else:
+                result = func(**params)
+        except TypeError as e:
+            self.errors += 1
+            return _error(request_id, INVALID_PARAMS, str(e), output.getvalue())
+        except Exception as e:
+            self.errors += 1
+            return _error(request_id, ACTION_ERROR, f"{type(e).__name__}: {e}", output.getvalue())
+        if method == "start_task_log" and isinstance(result, str):
+            result = os.path.abspath(result)    # clients may run in another directory
+        return {"jsonrpc": "2.0", "id": request_id, "result": result, "output": output.getvalue(),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def _write_state(self):
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        state = {"host": HOST, "port": self.port, "pid": os.getpid(), "token": self.token,
+                 "started_at": self.started_at}
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        try:
+            os.chmod(self.state_file, 0o600)
+        except OSError:
+            pass
+
+    def _remove_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                if json.load(f).get("pid") != os.getpid():
+                    return      # another daemon took over the state file
+            os.remove(self.state_file)
+        except (OSError, ValueError):
+            pass
+
+    def serve_forever(self):
+        self._write_state()
+        print(f"Automation daemon listening on {HOST}:{self.port} (pid {os.getpid()})", flush=True)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self._remove_state()
+
+    def shutdown(self):
+        self._server.shutdown()
+
+
+def _error(request_id, code, message, output=""):
+    response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+    if output:
+        response["output"] = output
+    return response
+
+
+def serve(port=0, state_file=None):
+    """Runs the daemon in the foreground until it is stopped."""
+    AutomationDaemon(port=port, state_file=state_file).serve_forever()
+
+
+# --- Client ---
+
+class DaemonClient:
+    """Keeps one connection to a running daemon and sends JSON-RPC requests over it."""
+
+    def __init__(self, host, port, token, timeout=None):
+        self.token = token
+        self._sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+        self._sock.settimeout(timeout)
+        self._file = self._sock.makefile('rb')
+        self._next_id = 0
+
+    def call(self, method, params=None, overrides=None):
+        """
+        Returns (result, captured output). Raises DaemonError on an error
+        response. overrides (see OVERRIDES) apply to this request only.
+        """
+        self._next_id += 1
+        request = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params or {},
+                   "token": self.token}
+        if overrides:
+            request["overrides"] = overrides
+        self._sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            error = response["error"]
+            raise DaemonError(error.get("message", "daemon error"), error.get("code", ACTION_ERROR),
+                              response.get("output", ""))
+        return response.get("result"), response.get("output", "")
+
+    def close(self):
+        try:
+            self._file.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+def read_state(state_file=None):
+    try:
+        with open(state_file or state_file_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def connect_daemon(state_file=None):
+    """Returns a DaemonClient for the running daemon, or None (fast) when none is reachable."""
+    if os.environ.get(DISABLE_ENV):
+        return None
+    state = read_state(state_file)
+    if not state:
+        return None
+    try:
+        return DaemonClient(state.get("host", HOST), state["port"], state["token"])
+    except (OSError, KeyError):
+        return None
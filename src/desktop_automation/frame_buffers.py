@@ -0,0 +1,285 @@
+"""
+Pooled frame buffers with a hard memory cap.
+
+每次视觉调用都会新建一张全分辨率的 PIL 图像，4K 多显示器上长时间轮询时每分钟要分配、释放几百MB。
+FramePool 按形状复用预先分配的 NumPy 缓冲区 (高 x 宽 x 3, uint8)：
+- acquire(shape) 优先取回同形状的空闲缓冲区，没有时才新分配
+- 缓冲区总占用 (使用中 + 空闲) 有硬上限：超出时先丢弃空闲缓冲区，仍然超出则抛出 FrameMemoryError
+- stats() 报告分配/复用次数、当前占用和峰值占用
+ScreenSource.capture_array() 把截图直接写进池中的缓冲区 (mss 从 BGRA 帧缓冲逐通道拷贝，不经过 PIL)，
+等待画面变化的签名和模板匹配都在缓冲区的 NumPy 视图上计算，不再复制整帧；只有真正要OCR时才转换成 PIL 图像。
+ScreenshotWriter 在后台线程编码 take_screenshot 的 PNG，排队中的帧仍然占着池里的缓冲区，因此同样受上限约束。
+上限可以用环境变量 DESKTOP_AUTOMATION_FRAME_MEMORY_MB 设置。
+"""
+import atexit
+import importlib.util
+import os
+import queue
+import sys
+import threading
+from collections import OrderedDict
+
+try:
+    from .lazy_import import lazy_module
+    from .screen_source import RAW_FRAME_PATTERN
+except ImportError:
+    from lazy_import import lazy_module
+    from screen_source import RAW_FRAME_PATTERN
+
+Image = lazy_module("PIL.Image")
+np = lazy_module("numpy")
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+# --- Configuration ---
+MEMORY_ENV = "DESKTOP_AUTOMATION_FRAME_MEMORY_MB"
+DEFAULT_MAX_MB = 512        # ~20 full 4K frames
+MAX_IDLE_PER_SHAPE = 2      # idle buffers kept for reuse per frame shape
+MAX_PENDING_SAVES = 8       # screenshots waiting to be encoded
+
+
+class FrameMemoryError(MemoryError):
+    """Raised when a frame buffer would push the pool over its memory cap."""
+
+
+class FrameBuffer:
+    """
+    A pooled (height, width, 3) RGB array. Release it (or use it as a context
+    manager) as soon as the pixels are no longer needed; views taken from
+    .array become invalid once the buffer is reused.
+    """
+    __slots__ = ('pool', 'array', '_released')
+
+    def __init__(self, pool, array):
+        self.pool = pool
+        self.array = array
+        self._released = False
+
+    @property
+    def size(self):
+        """(width, height), like PIL's Image.size."""
+        return (self.array.shape[1], self.array.shape[0])
+
+    def view(self, box=None):
+        """Zero-copy view of (left, top, width, height), or of the whole frame."""
+        if not box:
+            return self.array
+        left, top, width, height = box
+        return self.array[top:top + height, left:left + width]
+
+    def image(self, box=None):
+        """Copies the frame (or a box of it) into a PIL image, e.g. for OCR."""
+        return Image.fromarray(self.view(box))
+
+    def save_raw(self, path):
+        """
+        Writes the pixels unencoded, as a replayable "<name>_<W>x<H>.rgb" frame
+        (see screen_source.load_frame). Returns the path written.
+        """
+        width, height = self.size
+        if not RAW_FRAME_PATTERN.search(path):
+            path = f"{os.path.splitext(path)[0]}_{width}x{height}.rgb"
+        with open(path, 'wb') as f:
+            f.write(self.array.data)
+        return path
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pool.release(self.array)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FramePool:
+    """Thread-safe pool of frame arrays keyed by shape, capped at max_bytes in total."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 2 ** 20, max_idle=MAX_IDLE_PER_SHAPE):
+        self.max_bytes = max_bytes
+        self.max_idle = max_idle
+        self.enabled = True
+        self._idle = OrderedDict()  # id(array) -> array, oldest first
+        self._lock = threading.Lock()
+        self.in_use_bytes = 0
+        self.idle_bytes = 0
+        self.peak_bytes = 0
+        self.allocations = 0
+        self.reuses = 0
+        self.rejections = 0
+
+    def _take_idle(self, shape):
+        for key, array in self._idle.items():
+            if array.shape == shape:
+                del self._idle[key]
+                self.idle_bytes -= array.nbytes
+                return array
+        return None
+
+    def _evict_oldest(self):
+        _, array = self._idle.popitem(last=False)
+        self.idle_bytes -= array.nbytes
+
+    def acquire(self, shape):
+        """Returns a FrameBuffer of the given (height, width, 3) shape; its contents are undefined."""
+        shape = tuple(int(n) for n in shape)
+        nbytes = int(np.prod(shape))
+        with self._lock:
+            array = self._take_idle(shape)
+            if array is not None:
+                self.reuses += 1
+            else:
+                while self._idle and self.in_use_bytes + self.idle_bytes + nbytes > self.max_bytes:
+                    self._evict_oldest()
+                if self.in_use_bytes + nbytes > self.max_bytes:
+                    self.rejections += 1
+                    raise FrameMemoryError(
+                        f"Frame of {nbytes / 2 ** 20:.1f} MB would exceed the {self.max_bytes / 2 ** 20:.0f} MB "
+                        f"frame memory cap ({self.in_use_bytes / 2 ** 20:.1f} MB in use)")
+                self.allocations += 1
+            self.in_use_bytes += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.in_use_bytes + self.idle_bytes)
+        if array is None:
+            array = np.empty(shape, dtype=np.uint8)
+        return FrameBuffer(self, array)
+
+    def release(self, array):
+        with self._lock:
+            self.in_use_bytes -= array.nbytes
+            same_shape = sum(1 for idle in self._idle.values() if idle.shape == array.shape)
+            if self.enabled and same_shape < self.max_idle and \
+                    self.in_use_bytes + self.idle_bytes + array.nbytes <= self.max_bytes:
+                self._idle[id(array)] = array
+                self.idle_bytes += array.nbytes
+
+    def clear(self):
+        """Drops every idle buffer."""
+        with self._lock:
+            while self._idle:
+                self._evict_oldest()
+
+    def reset_peak(self):
+        with self._lock:
+            self.peak_bytes = self.in_use_bytes + self.idle_bytes
+
+    def stats(self):
+        mb = 2 ** 20
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_mb": round(self.max_bytes / mb, 1),
+                "in_use_mb": round(self.in_use_bytes / mb, 1),
+                "idle_mb": round(self.idle_bytes / mb, 1),
+                "peak_mb": round(self.peak_bytes / mb, 1),
+                "allocations": self.allocations,
+                "reuses": self.reuses,
+                "rejections": self.rejections,
+            }
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ScreenshotWriter:
+    """Encodes queued (FrameBuffer, path) screenshots on a background thread and releases the buffers."""
+
+    def __init__(self, max_pending=MAX_PENDING_SAVES):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.failed = 0
+        self.last_error = None
+
+    def submit(self, buffer, path):
+        """Queues a screenshot; blocks while max_pending screenshots are already waiting."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((buffer, path))
+
+    def flush(self, timeout=30):
+        """Blocks until every screenshot queued so far is written."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        request = _FlushRequest()
+        self._queue.put(request)
+        request.done.wait(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+                continue
+            buffer, path = item
+            try:
+                buffer.image().save(path)
+                self.saved += 1
+            except Exception as e:
+                self.failed += 1
+                self.last_error = f"{path}: {e}"
+                print(f"Error saving screenshot {path}: {e}", file=sys.stderr)
+            finally:
+                buffer.release()
+
+    def stats(self):
+        return {"pending": self._queue.qsize(), "saved": self.saved, "failed": self.failed,
+                "last_error": self.last_error}
+
+
+def _default_max_bytes():
+    try:
+        return int(float(os.environ.get(MEMORY_ENV, DEFAULT_MAX_MB)) * 2 ** 20)
+    except ValueError:
+        print(f"Ignoring invalid {MEMORY_ENV}; using {DEFAULT_MAX_MB} MB", file=sys.stderr)
+        return DEFAULT_MAX_MB * 2 ** 20
+
+
+_pool = None
+_writer = None
+_globals_lock = threading.Lock()
+
+
+def get_frame_pool():
+    """The process-wide frame pool (shared by every session, so the cap is per process)."""
+    global _pool
+    if _pool is None:
+        with _globals_lock:
+            if _pool is None:
+                _pool = FramePool(_default_max_bytes())
+    return _pool
+
+
+def get_screenshot_writer():
+    global _writer
+    if _writer is None:
+        with _globals_lock:
+            if _writer is None:
+                _writer = ScreenshotWriter()
+    return _writer
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, where the platform reports it."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def _flush_on_exit():
+    if _writer is not None:
+        _writer.flush()
+
+
+atexit.register(_flush_on_exit)
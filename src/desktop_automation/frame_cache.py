@@ -0,0 +1,91 @@
+"""
+Frame / OCR result cache.
+
+同一个工作流步骤里经常对同一画面做多次查询 (find_text_on_screen →
+wait_for_text_appear → verify_operation_result)。这里按照"画面内容哈希 +
+OCR配置"缓存识别结果，画面未变化时直接复用，跳过Tesseract。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+DEFAULT_TTL = 5.0           # seconds an entry stays valid
+DEFAULT_MAX_ENTRIES = 32    # LRU capacity
+
+
+def frame_digest(image):
+    """Returns a short content hash for a PIL image (mode, size and pixels)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode('ascii'))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class FrameCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL.
+    Keys are arbitrary hashables, usually (frame_digest, kind, ocr_config).
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the cached value or None if missing/expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
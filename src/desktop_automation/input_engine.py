@@ -0,0 +1,530 @@
+"""
+Input engine: batched mouse/keyboard events with configurable motion profiles.
+
+以前每次点击都要 moveTo(duration=0.5)，type_text 默认每个字符停 0.1 秒，pyautogui 每次调用后
+还会再停 PAUSE (0.1 秒)，一条 200 字的消息要输入 20 秒。现在所有输入都经过 InputEngine：
+- 事件可以批量提交 (move / click / hotkey / press / text / pause)，一次执行完
+- 节奏由运动配置决定: instant (无移动动画、无停顿)、fast (默认)、humanlike
+  (移动时间随距离增加，按键间隔带随机抖动)；pyautogui 的固定 PAUSE 不再生效
+- 文字自动选择粘贴或逐字输入：较长的文本、中文等键盘不能直接输入的字符、换行都走剪贴板
+- 每个事件记录实际派发耗时 (扣除配置计划的移动/输入时间)，批量执行返回延迟统计
+后端可替换：默认 pyautogui，"record" 只记录事件不操作真实设备 (测试/演练)，
+XlibBackend 把 XTest 事件发往指定的 X 显示器 (多显示器会话，见 sessions.py)。
+
+也可以通过环境变量选择默认配置：
+    DESKTOP_AUTOMATION_MOTION_PROFILE=humanlike
+"""
+import contextlib
+import math
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+try:
+    from .profiling import span
+    from .lazy_import import lazy_module
+    from .sessions import current_session
+except ImportError:
+    from profiling import span
+    from lazy_import import lazy_module
+    from sessions import current_session
+
+pyautogui = lazy_module("pyautogui")
+
+PROFILE_ENV = "DESKTOP_AUTOMATION_MOTION_PROFILE"
+DEFAULT_PROFILE = "fast"
+PASTE_THRESHOLD = 32        # characters; longer text is pasted instead of typed
+PASTE_SETTLE_ENV = "DESKTOP_AUTOMATION_PASTE_SETTLE_S"
+# seconds the target app gets to read the clipboard after Ctrl+V before it is changed again
+PASTE_SETTLE_S = float(os.environ.get(PASTE_SETTLE_ENV) or 0.15)
+
+# move_s + move_per_px * distance (capped at max_move_s) is the mouse travel time,
+# type_interval the delay per character, event_gap the pause between events of a
+# batch and jitter the +/- fraction applied to all of them.
+MotionProfile = namedtuple('MotionProfile', 'name move_s move_per_px max_move_s type_interval event_gap jitter')
+
+PROFILES = {
+    "instant": MotionProfile("instant", 0.0, 0.0, 0.0, 0.0, 0.0, 0.0),
+    "fast": MotionProfile("fast", 0.0, 0.0, 0.0, 0.005, 0.02, 0.0),
+    "humanlike": MotionProfile("humanlike", 0.12, 0.0004, 0.8, 0.05, 0.08, 0.3),
+}
+
+EVENT_TYPES = ("move", "click", "hotkey", "press", "text", "pause")
+TEXT_METHODS = ("auto", "type", "paste")
+
+
+def get_motion_profile(profile=None):
+    """Returns a MotionProfile from a name, a MotionProfile, or None (the default)."""
+    if isinstance(profile, MotionProfile):
+        return profile
+    name = profile or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown motion profile '{name}'. Available: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def is_typeable(text):
+    """True when every character can be typed as a plain key press (printable ASCII)."""
+    return all(32 <= ord(c) < 127 for c in text)
+
+
+def choose_text_method(text, threshold=PASTE_THRESHOLD):
+    """
+    "paste" for text the keyboard can't type directly (CJK, emoji, newlines -
+    typing "\\n" would press Enter and send a chat message early) or text
+    longer than threshold, otherwise "type".
+    """
+    if not is_typeable(text) or len(text) > threshold:
+        return "paste"
+    return "type"
+
+
+# --- Backends ---
+
+class InputBackend:
+    """
+    Sends input to the desktop. Subclasses implement the primitives below;
+    they must not add delays of their own beyond the requested duration/interval,
+    except paste_settle after Ctrl+V: apps read the clipboard asynchronously.
+    """
+    name = "base"
+    paste_settle = PASTE_SETTLE_S
+
+    def position(self):
+        raise NotImplementedError
+
+    def move_to(self, x, y, duration=0.0):
+        raise NotImplementedError
+
+    def click(self, button='left', clicks=1):
+        raise NotImplementedError
+
+    def hotkey(self, keys):
+        raise NotImplementedError
+
+    def press(self, key, presses=1):
+        raise NotImplementedError
+
+    def write(self, text, interval=0.0):
+        raise NotImplementedError
+
+    def paste(self, text):
+        """Puts text on the clipboard, presses Ctrl+V and restores the previous clipboard."""
+        import pyperclip
+        original_clipboard = ""
+        try:
+            original_clipboard = pyperclip.paste()
+        except Exception:
+            pass
+        pyperclip.copy(text)
+        self.hotkey(('ctrl', 'v'))
+        self._settle()
+        try:
+            if original_clipboard:
+                pyperclip.copy(original_clipboard)
+        except Exception:
+            pass
+
+    def _settle(self):
+        if self.paste_settle:
+            time.sleep(self.paste_settle)
+
+
+class PyAutoGUIBackend(InputBackend):
+    """Real mouse and keyboard through pyautogui, with its per-call PAUSE disabled."""
+    name = "pyautogui"
+
+    def position(self):
+        x, y = pyautogui.position()
+        return x, y
+
+    def move_to(self, x, y, duration=0.0):
+        if duration:
+            pyautogui.moveTo(x, y, duration=duration, tween=pyautogui.easeInOutQuad, _pause=False)
+        else:
+            pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, button='left', clicks=1):
+        pyautogui.click(button=button, clicks=clicks, _pause=False)
+
+    def hotkey(self, keys):
+        pyautogui.hotkey(*keys, _pause=False)
+
+    def press(self, key, presses=1):
+        pyautogui.press(key, presses=presses, _pause=False)
+
+    def write(self, text, interval=0.0):
+        pyautogui.write(text, interval=interval, _pause=False)
+
+
+class RecordingBackend(InputBackend):
+    """Records events instead of sending them (tests, dry runs). events is a list of tuples."""
+    name = "record"
+
+    def __init__(self):
+        self.events = []
+        self._position = (0, 0)
+
+    def position(self):
+        return self._position
+
+    def move_to(self, x, y, duration=0.0):
+        self._position = (x, y)
+        self.events.append(("move", x, y, duration))
+
+    def click(self, button='left', clicks=1):
+        self.events.append(("click", button, clicks))
+
+    def hotkey(self, keys):
+        self.events.append(("hotkey", tuple(keys)))
+
+    def press(self, key, presses=1):
+        self.events.append(("press", key, presses))
+
+    def write(self, text, interval=0.0):
+        self.events.append(("write", text, interval))
+
+    def paste(self, text):
+        self.events.append(("paste", text))
+
+
+# pyautogui key names -> X keysym names
+X_KEY_NAMES = {
+    'ctrl': 'Control_L', 'ctrlleft': 'Control_L', 'ctrlright': 'Control_R',
+    'alt': 'Alt_L', 'altleft': 'Alt_L', 'altright': 'Alt_R',
+    'shift': 'Shift_L', 'shiftleft': 'Shift_L', 'shiftright': 'Shift_R',
+    'win': 'Super_L', 'winleft': 'Super_L', 'super': 'Super_L',
+    'enter': 'Return', 'return': 'Return', 'esc': 'Escape', 'escape': 'Escape',
+    'tab': 'Tab', 'backspace': 'BackSpace', 'delete': 'Delete', 'del': 'Delete',
+    'space': 'space', 'up': 'Up', 'down': 'Down', 'left': 'Left', 'right': 'Right',
+    'home': 'Home', 'end': 'End', 'pageup': 'Prior', 'pagedown': 'Next', 'insert': 'Insert',
+}
+X_BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+
+class XlibBackend(InputBackend):
+    """
+    Sends XTest events to one X display (e.g. an Xvfb instance). pyautogui is
+    bound to $DISPLAY at import time, so per-display sessions need this backend.
+    Pasting uses xclip on the same display.
+    """
+    name = "xlib"
+
+    def __init__(self, display):
+        from Xlib import X, XK
+        from Xlib import display as xdisplay
+        from Xlib.ext import xtest
+        self._X, self._XK, self._xtest = X, XK, xtest
+        self.display_name = display
+        self._display = xdisplay.Display(display)
+        self._root = self._display.screen().root
+        self._lock = threading.Lock()   # Xlib connections are not thread safe
+
+    def _fake(self, event, detail=0, **kwargs):
+        self._xtest.fake_input(self._display, event, detail, **kwargs)
+
+    def position(self):
+        with self._lock:
+            pointer = self._root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def move_to(self, x, y, duration=0.0):
+        steps = max(1, int(duration / 0.01))
+        start_x, start_y = self.position() if steps > 1 else (x, y)
+        for step in range(1, steps + 1):
+            t = step / steps
+            with self._lock:
+                self._fake(self._X.MotionNotify, x=int(start_x + (x - start_x) * t),
+                           y=int(start_y + (y - start_y) * t))
+                self._display.sync()
+            if step < steps:
+                time.sleep(duration / steps)
+
+    def click(self, button='left', clicks=1):
+        code = X_BUTTONS[button]
+        with self._lock:
+            for _ in range(clicks):
+                self._fake(self._X.ButtonPress, code)
+                self._fake(self._X.ButtonRelease, code)
+            self._display.sync()
+
+    def _keycode(self, key):
+        """Returns (keycode, needs_shift) for a pyautogui key name or a single character."""
+        if len(key) == 1:
+            keysym = ord(key)   # Latin-1 keysyms equal the code point
+        else:
+            keysym = self._XK.string_to_keysym(X_KEY_NAMES.get(key.lower(), key))
+        keycode = self._display.keysym_to_keycode(keysym)
+        if not keycode:
+            raise ValueError(f"No key for {key!r} on display {self.display_name}")
+        return keycode, self._display.keycode_to_keysym(keycode, 0) != keysym
+
+    def _tap(self, keys):
+        codes = []
+        for key in keys:
+            keycode, shift = self._keycode(key)
+            if shift:
+                codes.append(self._keycode('shift')[0])
+            codes.append(keycode)
+        for keycode in codes:
+            self._fake(self._X.KeyPress, keycode)
+        for keycode in reversed(codes):
+            self._fake(self._X.KeyRelease, keycode)
+
+    def hotkey(self, keys):
+        with self._lock:
+            self._tap(keys)
+            self._display.sync()
+
+    def press(self, key, presses=1):
+        with self._lock:
+            for _ in range(presses):
+                self._tap((key,))
+            self._display.sync()
+
+    def write(self, text, interval=0.0):
+        for char in text:
+            name = {'\n': 'enter', '\t': 'tab'}.get(char, char)
+            with self._lock:
+                self._tap((name,))
+                self._display.sync()
+            if interval:
+                time.sleep(interval)
+
+    def paste(self, text):
+        import subprocess
+        try:
+            subprocess.run(["xclip", "-selection", "clipboard", "-display", self.display_name],
+                           input=text.encode('utf-8'), check=True, timeout=5)
+        except FileNotFoundError:
+            raise RuntimeError("xclip is required to paste on a separate display") from None
+        self.hotkey(('ctrl', 'v'))
+        self._settle()      # the next paste must not replace the selection before the app has read it
+
+    def close(self):
+        with self._lock:
+            self._display.close()
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "record": RecordingBackend,
+}
+
+
+def create_input_backend(name):
+    """Instantiates an input backend by name ("pyautogui" or "record")."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+# --- Engine ---
+
+def _percentile(values, fraction):
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class InputEngine:
+    """
+    Runs input events on a backend with a motion profile. run() takes a batch
+    of event dicts; click()/hotkey()/type_text() are one-event shortcuts.
+    """
+
+    def __init__(self, backend=None, profile=None, paste_threshold=PASTE_THRESHOLD):
+        self.backend = backend or PyAutoGUIBackend()
+        self.profile = get_motion_profile(profile)
+        self.paste_threshold = paste_threshold
+        self.event_count = 0
+        self.total_dispatch_ms = 0.0
+        self.last_dispatch_ms = 0.0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def _vary(self, seconds, profile):
+        if not seconds or not profile.jitter:
+            return seconds
+        return seconds * self._random.uniform(1 - profile.jitter, 1 + profile.jitter)
+
+    def _move_duration(self, x, y, profile):
+        if not (profile.move_s or profile.move_per_px):
+            return 0.0
+        try:
+            cx, cy = self.backend.position()
+            distance = math.hypot(x - cx, y - cy)
+        except Exception:
+            distance = 0.0
+        duration = min(profile.move_s + profile.move_per_px * distance, profile.max_move_s)
+        return self._vary(duration, profile)
+
+    def _type(self, text, interval, profile):
+        """Types text and returns the planned typing time."""
+        if profile.jitter and interval:
+            planned = 0.0
+            for char in text:
+                self.backend.write(char, 0.0)
+                pause = self._vary(interval, profile)
+                time.sleep(pause)
+                planned += pause
+            return planned
+        self.backend.write(text, interval)
+        return interval * len(text)
+
+    def _dispatch(self, event, profile):
+        """Sends one event. Returns (planned seconds, text method or None)."""
+        kind = event.get("type")
+        if kind in ("move", "click"):
+            with span("mouse"):
+                planned = 0.0
+                if event.get("x") is not None and event.get("y") is not None:
+                    planned = self._move_duration(event["x"], event["y"], profile)
+                    self.backend.move_to(event["x"], event["y"], planned)
+                if kind == "click":
+                    self.backend.click(event.get("button", "left"), event.get("clicks", 1))
+            return planned, None
+        if kind == "hotkey":
+            keys = event.get("keys") or ()
+            with span("keyboard"):
+                self.backend.hotkey(tuple(keys) if isinstance(keys, (list, tuple)) else (keys,))
+            return 0.0, None
+        if kind == "press":
+            with span("keyboard"):
+                self.backend.press(event["key"], event.get("presses", 1))
+            return 0.0, None
+        if kind == "text":
+            text = str(event.get("text", ""))
+            method = event.get("method") or "auto"
+            if method not in TEXT_METHODS:
+                raise ValueError(f"Unknown text method '{method}'. Available: {', '.join(TEXT_METHODS)}")
+            if method == "auto":
+                method = choose_text_method(text, self.paste_threshold)
+            with span("keyboard"):
+                if method == "paste":
+                    self.backend.paste(text)
+                    return 0.0, method
+                interval = event.get("interval")
+                return self._type(text, profile.type_interval if interval is None else interval, profile), method
+        if kind == "pause":
+            seconds = float(event.get("seconds", 0))
+            with span("sleep"):
+                time.sleep(seconds)
+            return seconds, None
+        raise ValueError(f"Unknown input event type {kind!r}. Available: {', '.join(EVENT_TYPES)}")
+
+    def run(self, events, profile=None):
+        """
+        Executes a batch of events in order and returns a report with the
+        per-event and summarised dispatch latency in milliseconds.
+        """
+        profile = get_motion_profile(profile) if profile else self.profile
+        events = list(events)
+        for index, event in enumerate(events):
+            if not isinstance(event, dict) or event.get("type") not in EVENT_TYPES:
+                raise ValueError(f"Event {index}: expected an object with a \"type\" in {', '.join(EVENT_TYPES)}, got {event!r}")
+
+        records = []
+        start = time.perf_counter()
+        # Mouse and keyboard are shared: batches from different threads must not interleave
+        with self._lock:
+            for index, event in enumerate(events):
+                if index and profile.event_gap:
+                    with span("sleep"):
+                        time.sleep(self._vary(profile.event_gap, profile))
+                event_start = time.perf_counter()
+                planned, method = self._dispatch(event, profile)
+                elapsed = (time.perf_counter() - event_start) * 1000
+                dispatch = max(0.0, elapsed - planned * 1000)
+                record = {"type": event["type"], "dispatch_ms": round(dispatch, 3),
+                          "planned_ms": round(planned * 1000, 3)}
+                if method:
+                    record["method"] = method
+                records.append(record)
+                self.event_count += 1
+                self.total_dispatch_ms += dispatch
+                self.last_dispatch_ms = dispatch
+
+        dispatch_times = sorted(r["dispatch_ms"] for r in records)
+        report = {
+            "profile": profile.name,
+            "backend": self.backend.name,
+            "events": len(records),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            "planned_ms": round(sum(r["planned_ms"] for r in records), 3),
+            "records": records,
+        }
+        if dispatch_times:
+            report["dispatch_ms"] = {
+                "total": round(sum(dispatch_times), 3),
+                "p50": _percentile(dispatch_times, 0.50),
+                "p95": _percentile(dispatch_times, 0.95),
+                "max": dispatch_times[-1],
+            }
+        return report
+
+    def click(self, x, y, button='left', clicks=1):
+        return self.run([{"type": "click", "x": x, "y": y, "button": button, "clicks": clicks}])
+
+    def hotkey(self, keys):
+        return self.run([{"type": "hotkey", "keys": list(keys)}])
+
+    def type_text(self, text, interval=None, method="auto"):
+        """Returns the report; report["records"][0]["method"] tells whether it was typed or pasted."""
+        return self.run([{"type": "text", "text": text, "interval": interval, "method": method}])
+
+    def stats(self):
+        mean = self.total_dispatch_ms / self.event_count if self.event_count else 0.0
+        return {
+            "backend": self.backend.name,
+            "profile": self.profile.name,
+            "events": self.event_count,
+            "last_dispatch_ms": round(self.last_dispatch_ms, 3),
+            "mean_dispatch_ms": round(mean, 3),
+        }
+
+
+_current_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_input_engine():
+    """
+    Returns the active input engine: the current session's (see sessions.py),
+    otherwise the process-wide one, created on first use.
+    """
+    global _current_engine
+    session = current_session()
+    if session is not None:
+        return session.input_engine
+    if _current_engine is None:
+        with _engine_lock:
+            if _current_engine is None:
+                _current_engine = InputEngine()
+    return _current_engine
+
+
+def set_input_backend(backend):
+    """Switches the backend of the active engine. backend is an InputBackend or a registered name."""
+    if isinstance(backend, str):
+        backend = create_input_backend(backend)
+    get_input_engine().backend = backend
+    return backend
+
+
+def set_motion_profile(profile):
+    """Sets the default motion profile ("instant", "fast" or "humanlike") and returns its name."""
+    profile = get_motion_profile(profile)
+    get_input_engine().profile = profile
+    return profile.name
+
+
+@contextlib.contextmanager
+def motion_profile_override(profile):
+    """Uses profile as the default motion profile inside the block, then restores the previous one."""
+    engine = get_input_engine()
+    previous, engine.profile = engine.profile, get_motion_profile(profile)
+    try:
+        yield engine.profile
+    finally:
+        engine.profile = previous
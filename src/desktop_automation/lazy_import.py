@@ -0,0 +1,38 @@
+"""
+Deferred imports for heavy dependencies.
+
+pyautogui、PIL、numpy 等在导入时就要花费几十到上百毫秒 (pyautogui 还会连接显示服务)，
+而 wait、start_task_log 这类命令根本用不到它们。LazyModule 先占住模块名，
+第一次访问属性时才真正导入，调用处的写法 (pyautogui.click(...)、Image.new(...)) 不变。
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        if attr.startswith('__') and attr.endswith('__'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
@@ -0,0 +1,170 @@
+"""
+Learned click locations for smart_click_text.
+
+smart_click_text 每次都要对整个屏幕做OCR才能找到微信搜索框这类标签，而它们每次都在同一个位置。
+LocationCache 按 (目标文字, 匹配方式, 搜索区域/窗口, 屏幕分辨率) 记住上一次找到的文字框
+以及该区域的小像素签名 (change_detect.frame_signature)：
+- 命中时只截取这一小块区域比较签名，一致就直接点击 (通常只需几毫秒)
+- 签名不一致时丢弃记录，回退到完整OCR，找到后重新记录
+坐标相对于搜索区域保存，窗口移动后 (区域随窗口解析) 缓存仍然有效。
+签名取自刚做过OCR的那一帧，记录时不再额外截图。
+记录保存在 logs/location_cache.json，进程重启后继续使用；修改累积 SAVE_EVERY 次或进程退出时才写盘。
+"""
+import atexit
+import base64
+import json
+import os
+import sys
+import threading
+import weakref
+from datetime import datetime
+
+try:
+    from .change_detect import frame_signature, signature_distance
+except ImportError:
+    from change_detect import frame_signature, signature_distance
+
+# --- Configuration ---
+SIGNATURE_CELLS = (32, 8)   # at most this many cells; small labels use one cell per pixel
+VERIFY_THRESHOLD = 24       # max per-cell grey level difference that still counts as the same label
+CROP_PADDING = 4            # pixels of surroundings kept around the text box
+MAX_ENTRIES = 1000
+SAVE_EVERY = 20             # changes buffered before the file is rewritten (the rest is written at exit)
+
+_caches = weakref.WeakSet()
+
+
+def signature_size(width, height):
+    return (max(1, min(width, SIGNATURE_CELLS[0])), max(1, min(height, SIGNATURE_CELLS[1])))
+
+
+class LocationCache:
+    """
+    Persistent {key: entry} store. An entry holds the crop rectangle and the
+    click point relative to the search region origin, plus the crop signature.
+    """
+
+    def __init__(self, path=None, threshold=VERIFY_THRESHOLD, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.enabled = True
+        self._entries = None
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        _caches.add(self)
+
+    @staticmethod
+    def key(target_text, match, region, screen_size):
+        """Region specs keep window titles and region names, so each app/window gets its own entries."""
+        return json.dumps([target_text, match, region, list(screen_size)], ensure_ascii=False, sort_keys=True)
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable location cache '{self.path}': {e}", file=sys.stderr)
+        return self._entries
+
+    def _changed(self):
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY:
+            self._save()
+
+    def _save(self):
+        self._unsaved = 0
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError as e:
+            print(f"Could not save location cache: {e}", file=sys.stderr)
+
+    def lookup(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._load().get(key)
+
+    def crop_box(self, box, bounds):
+        """
+        Padded crop (left, top, width, height) around a screen-space text box,
+        clipped to bounds (left, top, width, height), e.g. the captured frame.
+        """
+        left, top, width, height = box
+        x1, y1 = max(bounds[0], left - CROP_PADDING), max(bounds[1], top - CROP_PADDING)
+        x2 = min(bounds[0] + bounds[2], left + width + CROP_PADDING)
+        y2 = min(bounds[1] + bounds[3], top + height + CROP_PADDING)
+        return (x1, y1, max(1, x2 - x1), max(1, y2 - y1))
+
+    def verify(self, entry, crop):
+        """True when the freshly captured crop still shows what was recorded."""
+        size = tuple(entry["signature_size"])
+        same = crop.size == tuple(entry["crop"][2:]) and \
+            signature_distance(frame_signature(crop, size), base64.b64decode(entry["signature"])) <= self.threshold
+        with self._lock:
+            if same:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return same
+
+    def store(self, key, crop_box, point, origin, crop):
+        """Remembers a location found by OCR. crop_box and point are in screen coordinates."""
+        if not self.enabled:
+            return
+        size = signature_size(*crop.size)
+        entry = {
+            "crop": [crop_box[0] - origin[0], crop_box[1] - origin[1], crop_box[2], crop_box[3]],
+            "point": [point[0] - origin[0], point[1] - origin[1]],
+            "signature_size": list(size),
+            "signature": base64.b64encode(frame_signature(crop, size)).decode('ascii'),
+            "updated_at": datetime.now().isoformat(),
+        }
+        with self._lock:
+            entries = self._load()
+            entries[key] = entry
+            if len(entries) > self.max_entries:
+                for old in sorted(entries, key=lambda k: entries[k]["updated_at"])[:len(entries) - self.max_entries]:
+                    del entries[old]
+            self.stores += 1
+            self._changed()
+
+    def forget(self, key=None):
+        """Drops one entry, or every entry when key is None."""
+        with self._lock:
+            entries = self._load()
+            if key is None:
+                entries.clear()
+                self._save()        # an explicit reset goes to disk right away
+            elif entries.pop(key, None) is not None:
+                self._changed()
+
+    def flush(self):
+        """Writes buffered changes to the file."""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            return {"enabled": self.enabled, "entries": len(self._load()), "hits": self.hits,
+                    "misses": self.misses, "stores": self.stores, "threshold": self.threshold}
+
+
+def _flush_on_exit():
+    for cache in list(_caches):
+        cache.flush()
+
+
+atexit.register(_flush_on_exit)
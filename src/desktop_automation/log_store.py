@@ -0,0 +1,536 @@
+"""
+Compact, indexed store for task logs.
+
+start_task_log 每个任务写一个 logs/task_*.jsonl，要统计成功的运行、失败热点或各动作的耗时
+就得用临时脚本扫描成千上万个JSON文件。compact_logs() 把这些JSONL日志增量导入一个 SQLite 数据库
+(默认 logs/task_logs.sqlite3)：
+- tasks          每个日志文件一行：开始/结束时间、结论 (task_verdict)、动作数、失败数
+- entries        每个动作一行：时间、动作、状态、耗时；参数和结果文本去重后存在 texts 中
+- action_rollup  按 (日期, 动作, 状态) 预先汇总的次数、耗时和耗时直方图
+- phase_rollup   按 (日期, 动作, 状态, 阶段) 汇总的顶层阶段耗时 (capture、ocr、search ...)
+文件按已导入的字节偏移增量导入 (日志只会追加)，重复运行只读取新写入的行；
+remove=True 时删除已完整导入且已有结论的JSONL文件。
+
+query_logs() 回答汇总问题：summary、actions (成功率、p50/p95耗时)、phases、failures (失败热点)、
+tasks、daily，以及只读的原始SQL。按整天、动作、状态过滤的汇总直接读预汇总表，耗时与日志总量无关；
+带具体时刻或结论 (verdict) 的过滤回退到逐条记录。p50/p95 由 10% 宽的几何直方图桶估计 (误差约5%)。
+cli.py 的 compact_logs / query_logs 子命令调用这里。本模块只依赖标准库，不加载 core。
+"""
+import array
+import glob
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+
+# --- Configuration ---
+LOGS_DIR = "logs"
+LOG_PATTERN = "task_*.jsonl"
+DEFAULT_DB = os.path.join(LOGS_DIR, "task_logs.sqlite3")
+SCHEMA_VERSION = 2
+RESULT_CHARS = 2000         # longer results are truncated in the store
+HOTSPOT_CHARS = 120         # failure results are grouped by this prefix
+BUCKET_GROWTH = 1.1         # duration histogram: bucket i holds [1.1**i, 1.1**(i+1)) ms
+BUCKETS = 128               # the last bucket collects everything from ~3 minutes up
+
+VERDICT_ACTION = "task_verdict"
+# An action that did not succeed; the verdict line is the task's outcome, not an action failure
+FAILED = f"(e.status != 'success' AND e.action != '{VERDICT_ACTION}')"
+
+REPORTS = ("summary", "actions", "phases", "failures", "tasks", "daily")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    offset INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT,
+    ended_at TEXT,
+    verdict TEXT,
+    feedback TEXT,
+    actions INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    value TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    task_id INTEGER NOT NULL REFERENCES tasks(id),
+    ts TEXT,
+    action TEXT NOT NULL,
+    status TEXT,
+    duration_ms REAL,
+    params_id INTEGER REFERENCES texts(id),
+    result_id INTEGER REFERENCES texts(id)
+);
+CREATE TABLE IF NOT EXISTS action_rollup (
+    day TEXT, action TEXT, status TEXT,
+    count INTEGER, timed INTEGER, total_ms REAL, max_ms REAL, hist BLOB,
+    PRIMARY KEY (day, action, status)
+);
+CREATE TABLE IF NOT EXISTS phase_rollup (
+    day TEXT, action TEXT, status TEXT, phase TEXT,
+    count INTEGER, timed INTEGER, total_ms REAL, max_ms REAL, hist BLOB,
+    PRIMARY KEY (day, action, status, phase)
+);
+CREATE INDEX IF NOT EXISTS entries_task ON entries(task_id);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries(ts);
+CREATE INDEX IF NOT EXISTS entries_failed ON entries(action, status)
+    WHERE status != 'success' AND action != '{VERDICT_ACTION}';
+CREATE INDEX IF NOT EXISTS tasks_started ON tasks(started_at);
+"""
+
+
+def connect(db_path=DEFAULT_DB, read_only=False):
+    """Opens (and for writing, creates) the log store."""
+    if read_only:
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No log store at '{db_path}'; run compact_logs first")
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    else:
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            conn.close()
+            raise RuntimeError(f"Log store '{db_path}' has schema version {version}; "
+                               f"delete it and run compact_logs again")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# --- Duration Statistics ---
+
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def _bucket(duration_ms):
+    if duration_ms < BUCKET_GROWTH:
+        return 0
+    return min(BUCKETS - 1, int(math.log(duration_ms) / _LOG_GROWTH))
+
+
+class DurationStats:
+    """count/total/max plus a geometric histogram; merges cheaply, so it can be stored per day."""
+    __slots__ = ('count', 'timed', 'total_ms', 'max_ms', 'hist')
+
+    def __init__(self):
+        self.count = 0
+        self.timed = 0
+        self.total_ms = 0.0
+        self.max_ms = None
+        self.hist = array.array('I', bytes(4 * BUCKETS))
+
+    def add(self, duration_ms=None, times=1):
+        self.count += times
+        if duration_ms is None:
+            return
+        self.timed += times
+        self.total_ms += duration_ms * times
+        self.max_ms = duration_ms if self.max_ms is None else max(self.max_ms, duration_ms)
+        self.hist[_bucket(duration_ms)] += times
+
+    def merge(self, count, timed, total_ms, max_ms, hist):
+        """Adds a stored row (count, timed, total_ms, max_ms, hist bytes)."""
+        self.count += count
+        self.timed += timed
+        self.total_ms += total_ms or 0.0
+        if max_ms is not None:
+            self.max_ms = max_ms if self.max_ms is None else max(self.max_ms, max_ms)
+        stored = array.array('I')
+        stored.frombytes(hist)
+        for i, n in enumerate(stored):
+            if n:
+                self.hist[i] += n
+
+    def row(self):
+        return (self.count, self.timed, round(self.total_ms, 3), self.max_ms, self.hist.tobytes())
+
+    def percentile(self, fraction):
+        """Nearest-rank percentile, estimated as the geometric middle of its bucket (never above max)."""
+        if not self.timed:
+            return None
+        rank = max(1, math.ceil(fraction * self.timed))
+        seen = 0
+        for i, n in enumerate(self.hist):
+            seen += n
+            if seen >= rank:
+                value = BUCKET_GROWTH ** (i + 0.5) if i else 1.0
+                return round(min(value, self.max_ms), 3)
+        return self.max_ms
+
+    def summary(self):
+        return {"count": self.count, "total_ms": round(self.total_ms, 3), "p50_ms": self.percentile(0.50),
+                "p95_ms": self.percentile(0.95), "max_ms": self.max_ms}
+
+
+# --- Compaction ---
+
+def _read_new_lines(path, offset):
+    """Complete lines after byte offset; returns (lines, new offset). A partial last line waits for the next run."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    return data[:end].decode('utf-8', errors='replace').splitlines(), offset + end
+
+
+def _compact_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True, default=str)
+
+
+class _Compactor:
+    """Imports log files over one connection, accumulating the rollups in memory until finish()."""
+
+    def __init__(self, conn, stats):
+        self.conn = conn
+        self.stats = stats
+        self.text_ids = {}
+        self.actions = {}
+        self.phases = {}
+
+    def _text_id(self, value):
+        if value is None:
+            return None
+        text_id = self.text_ids.get(value)
+        if text_id is None:
+            row = self.conn.execute("SELECT id FROM texts WHERE value = ?", (value,)).fetchone()
+            text_id = row[0] if row else self.conn.execute("INSERT INTO texts (value) VALUES (?)", (value,)).lastrowid
+            self.text_ids[value] = text_id
+        return text_id
+
+    def ingest(self, path):
+        """Imports the lines written since the last run; returns True when the file had any."""
+        size = os.path.getsize(path)
+        row = self.conn.execute("SELECT id, offset FROM tasks WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            task_id, offset = self.conn.execute("INSERT INTO tasks (path) VALUES (?)", (path,)).lastrowid, 0
+        else:
+            task_id, offset = row["id"], row["offset"]
+            if offset == size:
+                return False
+            if offset > size:
+                # logs are append-only; the rollups already hold the old lines, so re-importing would double them
+                print(f"Skipping '{path}': it shrank after it was imported", file=sys.stderr)
+                self.stats["skipped"] += 1
+                return False
+
+        lines, new_offset = _read_new_lines(path, offset)
+        rows = []
+        failures = 0
+        first = last = verdict = feedback = None
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                action = str(entry["action"])
+            except (ValueError, KeyError, TypeError):
+                self.stats["bad_lines"] += 1
+                continue
+            ts = entry.get("timestamp")
+            first = first or ts
+            last = ts or last
+            status = entry.get("status")
+            params = entry.get("parameters")
+            if action == VERDICT_ACTION:
+                verdict = status
+                feedback = params.get("user_feedback") if isinstance(params, dict) else None
+            elif status != "success":
+                failures += 1
+            timing = entry.get("timing") if isinstance(entry.get("timing"), dict) else {}
+            duration = timing.get("duration_ms")
+            result = entry.get("result")
+            if result is not None and not isinstance(result, str):
+                result = _compact_json(result)
+            rows.append((task_id, ts, action, status, duration, self._text_id(_compact_json(params)),
+                         self._text_id(result[:RESULT_CHARS] if result is not None else None)))
+
+            day = ts[:10] if ts else None
+            self.actions.setdefault((day, action, status), DurationStats()).add(duration)
+            for node in timing.get("spans") or ():
+                if node.get("action"):
+                    continue        # nested actions have entries of their own
+                count = node.get("count", 1) or 1
+                self.phases.setdefault((day, action, status, node["name"]), DurationStats()).add(
+                    node.get("duration_ms", 0.0) / count, count)
+
+        self.conn.executemany(
+            "INSERT INTO entries (task_id, ts, action, status, duration_ms, params_id, result_id)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.execute(
+            "UPDATE tasks SET offset = ?, started_at = COALESCE(started_at, ?), ended_at = COALESCE(?, ended_at),"
+            " verdict = COALESCE(?, verdict), feedback = COALESCE(?, feedback),"
+            " actions = actions + ?, failures = failures + ? WHERE id = ?",
+            (new_offset, first, last, verdict, feedback, len(rows), failures, task_id))
+        self.stats["entries"] += len(rows)
+        return True
+
+    def _merge(self, table, key_columns, accumulated):
+        where = " AND ".join(f"{c} IS ?" for c in key_columns)
+        columns = ", ".join(key_columns + ("count", "timed", "total_ms", "max_ms", "hist"))
+        placeholders = ", ".join("?" * (len(key_columns) + 5))
+        for key, stats in accumulated.items():
+            row = self.conn.execute(f"SELECT count, timed, total_ms, max_ms, hist FROM {table} WHERE {where}",
+                                    key).fetchone()
+            if row is not None:
+                stats.merge(*row)
+            self.conn.execute(f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})", key + stats.row())
+
+    def finish(self):
+        self._merge("action_rollup", ("day", "action", "status"), self.actions)
+        self._merge("phase_rollup", ("day", "action", "status", "phase"), self.phases)
+
+
+def compact_logs(logs_dir=LOGS_DIR, db_path=None, remove=False):
+    """
+    Imports new lines of every logs_dir/task_*.jsonl into the store. With
+    remove=True, logs that are fully imported and carry a verdict are deleted.
+    Returns {"files", "updated", "entries", "bad_lines", "skipped", "removed", "db", "elapsed_s"}.
+    """
+    start = time.perf_counter()
+    db_path = db_path or os.path.join(logs_dir, os.path.basename(DEFAULT_DB))
+    stats = {"files": 0, "updated": 0, "entries": 0, "bad_lines": 0, "skipped": 0, "removed": 0}
+    paths = sorted(os.path.abspath(p) for p in glob.glob(os.path.join(logs_dir, LOG_PATTERN)))
+    conn = connect(db_path)
+    try:
+        with conn:
+            compactor = _Compactor(conn, stats)
+            for path in paths:
+                stats["files"] += 1
+                if compactor.ingest(path):
+                    stats["updated"] += 1
+            compactor.finish()
+        if remove:
+            for path in paths:
+                row = conn.execute("SELECT offset, verdict FROM tasks WHERE path = ?", (path,)).fetchone()
+                if row is not None and row["verdict"] and row["offset"] == os.path.getsize(path):
+                    os.remove(path)
+                    stats["removed"] += 1
+    finally:
+        conn.close()
+    stats["db"] = db_path
+    stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+# --- Queries ---
+
+def _whole_days(since, until):
+    return all(bound is None or len(bound) <= 10 for bound in (since, until))
+
+
+def _where(clauses):
+    return (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+
+def _entry_filters(since=None, until=None, action=None, status=None, verdict=None):
+    """Clauses over entries e joined with tasks t."""
+    clauses, args = [], []
+    if since:
+        clauses.append("e.ts >= ?")
+        args.append(since)
+    if until:
+        # a bare date includes that whole day
+        clauses.append("e.ts < ?" if len(until) > 10 else "substr(e.ts, 1, 10) <= ?")
+        args.append(until)
+    if action:
+        clauses.append("e.action = ?")
+        args.append(action)
+    if status == "failure":
+        clauses.append(FAILED)
+    elif status:
+        clauses.append("e.status = ?")
+        args.append(status)
+    if verdict:
+        clauses.append("t.verdict = ?")
+        args.append(verdict)
+    return clauses, args
+
+
+def _rollup_filters(since=None, until=None, action=None, status=None):
+    """Clauses over a rollup table; since/until are whole days."""
+    clauses, args = [], []
+    if since:
+        clauses.append("day >= ?")
+        args.append(since[:10])
+    if until:
+        clauses.append("day <= ?")
+        args.append(until[:10])
+    if action:
+        clauses.append("action = ?")
+        args.append(action)
+    if status == "failure":
+        clauses.append(f"status != 'success' AND action != '{VERDICT_ACTION}'")
+    elif status:
+        clauses.append("status = ?")
+        args.append(status)
+    return clauses, args
+
+
+def _task_filters(since=None, until=None, action=None, status=None, verdict=None):
+    """Clauses over tasks t; action/status select tasks with at least one such entry."""
+    clauses, args = [], []
+    if since:
+        clauses.append("t.started_at >= ?")
+        args.append(since)
+    if until:
+        clauses.append("t.started_at < ?" if len(until) > 10 else "substr(t.started_at, 1, 10) <= ?")
+        args.append(until)
+    if verdict:
+        clauses.append("t.verdict = ?")
+        args.append(verdict)
+    if action or status:
+        entry_clauses, entry_args = _entry_filters(action=action, status=status)
+        clauses.append(f"t.id IN (SELECT e.task_id FROM entries e{_where(entry_clauses)})")
+        args += entry_args
+    return clauses, args
+
+
+def _rows(conn, sql, args=()):
+    return [dict(row) for row in conn.execute(sql, args)]
+
+
+def _action_stats(conn, filters):
+    """{action: {status: DurationStats}}, from the rollup unless the filters need individual entries."""
+    grouped = {}
+    if filters["verdict"] or not _whole_days(filters["since"], filters["until"]):
+        clauses, args = _entry_filters(**filters)
+        for action, status, duration in conn.execute(
+                f"SELECT e.action, e.status, e.duration_ms FROM entries e JOIN tasks t ON t.id = e.task_id"
+                f"{_where(clauses)}", args):
+            grouped.setdefault(action, {}).setdefault(status, DurationStats()).add(duration)
+    else:
+        clauses, args = _rollup_filters(filters["since"], filters["until"], filters["action"], filters["status"])
+        for row in conn.execute(
+                f"SELECT action, status, count, timed, total_ms, max_ms, hist FROM action_rollup{_where(clauses)}",
+                args):
+            grouped.setdefault(row[0], {}).setdefault(row[1], DurationStats()).merge(*row[2:])
+    return grouped
+
+
+def _rollup_only(report, filters):
+    if filters["verdict"] or not _whole_days(filters["since"], filters["until"]):
+        raise ValueError(f"The {report} report filters by whole days (YYYY-MM-DD), action and status only")
+    return _rollup_filters(filters["since"], filters["until"], filters["action"], filters["status"])
+
+
+def _summary_report(conn, filters):
+    statuses = {}
+    entries = failures = 0
+    for action, by_status in _action_stats(conn, filters).items():
+        for status, stats in by_status.items():
+            statuses[status] = statuses.get(status, 0) + stats.count
+            entries += stats.count
+            if status != "success" and action != VERDICT_ACTION:
+                failures += stats.count
+    clauses, args = _task_filters(**filters)
+    where = _where(clauses)
+    tasks, first, last = conn.execute(
+        f"SELECT COUNT(*), MIN(t.started_at), MAX(t.ended_at) FROM tasks t{where}", args).fetchone()
+    verdicts = {row[0] or "none": row[1] for row in conn.execute(
+        f"SELECT t.verdict, COUNT(*) FROM tasks t{where} GROUP BY t.verdict", args)}
+    return {"tasks": tasks, "entries": entries, "failures": failures, "first": first, "last": last,
+            "statuses": statuses, "verdicts": verdicts}
+
+
+def _actions_report(conn, filters, limit):
+    rows = []
+    for action, by_status in _action_stats(conn, filters).items():
+        total = DurationStats()
+        for stats in by_status.values():
+            total.merge(*stats.row())
+        succeeded = by_status["success"].count if "success" in by_status else 0
+        row = {"action": action, "succeeded": succeeded,
+               "success_rate": round(succeeded / total.count, 4) if total.count else None}
+        row.update(total.summary())
+        rows.append(row)
+    rows.sort(key=lambda r: -r["count"])
+    return rows[:limit]
+
+
+def _phases_report(conn, filters, limit):
+    clauses, args = _rollup_only("phases", filters)
+    grouped = {}
+    for row in conn.execute(
+            f"SELECT action, phase, count, timed, total_ms, max_ms, hist FROM phase_rollup{_where(clauses)}", args):
+        grouped.setdefault(f"{row[0]}/{row[1]}", DurationStats()).merge(*row[2:])
+    rows = [dict(phase=phase, **stats.summary()) for phase, stats in grouped.items()]
+    rows.sort(key=lambda r: -r["total_ms"])
+    return rows[:limit]
+
+
+def _failures_report(conn, filters, limit):
+    clauses, args = _entry_filters(**filters)
+    clauses.append(FAILED)
+    return _rows(conn, f"""
+        SELECT e.action AS action, e.status AS status, substr(r.value, 1, {HOTSPOT_CHARS}) AS result,
+               COUNT(*) AS count, COUNT(DISTINCT e.task_id) AS tasks, MAX(e.ts) AS last_seen
+        FROM entries e JOIN tasks t ON t.id = e.task_id LEFT JOIN texts r ON r.id = e.result_id{_where(clauses)}
+        GROUP BY e.action, e.status, substr(r.value, 1, {HOTSPOT_CHARS})
+        ORDER BY count DESC LIMIT ?""", args + [limit])
+
+
+def _tasks_report(conn, filters, limit):
+    clauses, args = _task_filters(**filters)
+    return _rows(conn, f"""
+        SELECT t.path AS path, t.started_at AS started_at, t.ended_at AS ended_at, t.verdict AS verdict,
+               t.feedback AS feedback, t.actions AS actions, t.failures AS failures
+        FROM tasks t{_where(clauses)} ORDER BY t.started_at DESC LIMIT ?""", args + [limit])
+
+
+def _daily_report(conn, filters, limit):
+    clauses, args = _rollup_only("daily", filters)
+    days = {row["day"]: dict(row, tasks=0, successful_tasks=0) for row in _rows(conn, f"""
+        SELECT day, SUM(count) AS entries,
+               SUM(CASE WHEN status != 'success' AND action != '{VERDICT_ACTION}' THEN count ELSE 0 END) AS failures
+        FROM action_rollup{_where(clauses)} GROUP BY day""", args)}
+    task_clauses, task_args = _task_filters(filters["since"], filters["until"])
+    for day, tasks, successful in conn.execute(f"""
+            SELECT substr(t.started_at, 1, 10) AS day, COUNT(*), SUM(t.verdict = 'success')
+            FROM tasks t{_where(task_clauses)} GROUP BY day""", task_args):
+        if day in days:
+            days[day].update(tasks=tasks, successful_tasks=successful)
+    return [days[day] for day in sorted(days, key=str, reverse=True)][:limit]
+
+
+def query_logs(report="summary", db_path=DEFAULT_DB, since=None, until=None, action=None, status=None,
+               verdict=None, limit=20, sql=None):
+    """
+    Answers an aggregate question over the log store. report is one of
+    REPORTS, or "sql" to run a read-only query (sql). since/until are ISO
+    dates or timestamps, status "failure" means any action that did not succeed.
+    Returns a JSON-serialisable dict with the rows and the query time.
+    """
+    start = time.perf_counter()
+    filters = {"since": since, "until": until, "action": action, "status": status, "verdict": verdict}
+    conn = connect(db_path, read_only=True)
+    try:
+        if report == "sql":
+            if not sql:
+                raise ValueError("Report 'sql' needs a query")
+            rows = _rows(conn, sql)
+        elif report == "summary":
+            rows = _summary_report(conn, filters)
+        elif report == "actions":
+            rows = _actions_report(conn, filters, limit)
+        elif report == "phases":
+            rows = _phases_report(conn, filters, limit)
+        elif report == "failures":
+            rows = _failures_report(conn, filters, limit)
+        elif report == "tasks":
+            rows = _tasks_report(conn, filters, limit)
+        elif report == "daily":
+            rows = _daily_report(conn, filters, limit)
+        else:
+            raise ValueError(f"Unknown report '{report}'. Available: {', '.join(REPORTS + ('sql',))}")
+    finally:
+        conn.close()
+    return {"report": report, "db": db_path, "rows": rows,
+            "query_ms": round((time.perf_counter() - start) * 1000, 3)}
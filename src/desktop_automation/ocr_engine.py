@@ -0,0 +1,559 @@
+"""
+OCR engine: a pool of warm, long-lived Tesseract workers.
+
+pytesseract 每次调用都会启动一个新的 tesseract 进程、写临时图片并重新加载
+chi_sim+eng 语言模型，模型加载占了大部分时间。这里维护一个常驻的 worker 池：
+- tesserocr:   进程内的 TessBaseAPI，每个 worker 按语言保持已初始化的实例
+- process:     常驻子进程 (内部使用 tesserocr)，通过管道传图，崩溃时自动重启
+- pytesseract: 旧的每次调用一个子进程的方式，仅做并发限制 (未安装 tesserocr 时的兜底)
+只有前两种是常驻 worker，都需要安装 tesserocr。没有 tesserocr 时 "auto" 和 "process" 都退回
+pytesseract：每次调用仍会启动 tesseract 并重新加载模型，此时会在 stderr 提示一次，stats() 的 "warm" 为 False。
+
+池的大小限制了同时运行的 OCR 数量；health_check() 检查所有空闲 worker，
+出错或崩溃的 worker 会被重建。
+"""
+import multiprocessing
+import os
+import queue
+import shlex
+import sys
+import threading
+import time
+
+# --- Configuration ---
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+ACQUIRE_TIMEOUT = 60        # seconds to wait for a free worker
+PROCESS_CALL_TIMEOUT = 120  # seconds a worker process may spend on one image
+
+DATA_KEYS = ('text', 'conf', 'left', 'top', 'width', 'height', 'block_num', 'line_num')
+
+
+def _tesserocr_available():
+    try:
+        import tesserocr  # noqa: F401  (optional dependency)
+        return True
+    except ImportError:
+        return False
+
+
+def _parse_config(config):
+    """Splits a tesseract CLI config string into (psm, {variable: value})."""
+    psm = None
+    variables = {}
+    tokens = shlex.split(config or '')
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '--psm' and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif token == '-c' and i + 1 < len(tokens):
+            name, _, value = tokens[i + 1].partition('=')
+            variables[name] = value
+            i += 1
+        i += 1
+    return psm, variables
+
+
+# --- Workers ---
+
+class _PytesseractWorker:
+    """Stateless: every call still launches tesseract, the pool only bounds concurrency."""
+    backend = "pytesseract"
+    warm = False
+
+    def run(self, image, output, lang, config):
+        import pytesseract
+        kwargs = {"config": config or ''}
+        if lang:
+            kwargs["lang"] = lang
+        if output == "data":
+            return pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT, **kwargs)
+        return pytesseract.image_to_string(image, **kwargs)
+
+    def healthy(self):
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def restart(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _TesserocrWorker:
+    """Keeps one initialised TessBaseAPI per (lang, psm, variables) in this worker."""
+    backend = "tesserocr"
+    warm = True
+
+    def __init__(self):
+        self._apis = {}
+
+    def _api(self, lang, config):
+        import tesserocr
+        psm, variables = _parse_config(config)
+        key = (lang or 'eng', psm, tuple(sorted(variables.items())))
+        api = self._apis.get(key)
+        if api is None:
+            kwargs = {"lang": key[0]}
+            if psm is not None:
+                kwargs["psm"] = psm
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            for name, value in variables.items():
+                api.SetVariable(name, value)
+            self._apis[key] = api
+        return api
+
+    def run(self, image, output, lang, config):
+        api = self._api(lang, config)
+        api.SetImage(image)
+        if output != "data":
+            return api.GetUTF8Text()
+        return _iterate_words(api)
+
+    def healthy(self):
+        try:
+            from PIL import Image
+            self.run(Image.new("L", (32, 16), 255), "string", None, '--psm 6')
+            return True
+        except Exception:
+            return False
+
+    def restart(self):
+        self.close()
+
+    def close(self):
+        for api in self._apis.values():
+            try:
+                api.End()
+            except Exception:
+                pass
+        self._apis = {}
+
+
+def _iterate_words(api):
+    """Builds a pytesseract-style image_to_data dict from a tesserocr API."""
+    from tesserocr import RIL, iterate_level
+    data = {key: [] for key in DATA_KEYS}
+    api.Recognize()
+    iterator = api.GetIterator()
+    block_num = line_num = 0
+    for word in iterate_level(iterator, RIL.WORD):
+        if word.IsAtBeginningOf(RIL.BLOCK):
+            block_num += 1
+        if word.IsAtBeginningOf(RIL.TEXTLINE):
+            line_num += 1
+        text = word.GetUTF8Text(RIL.WORD)
+        box = word.BoundingBox(RIL.WORD)
+        if text is None or box is None:
+            continue
+        x1, y1, x2, y2 = box
+        data['text'].append(text)
+        data['conf'].append(word.Confidence(RIL.WORD))
+        data['left'].append(x1)
+        data['top'].append(y1)
+        data['width'].append(x2 - x1)
+        data['height'].append(y2 - y1)
+        data['block_num'].append(block_num)
+        data['line_num'].append(line_num)
+    return data
+
+
+def _process_worker_main(connection):
+    """Child process loop: receives raw frames over the pipe, answers with OCR results."""
+    from PIL import Image
+    worker = _TesserocrWorker()     # OCREngine only starts process workers when tesserocr is installed
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        mode, size, pixels, output, lang, config = message
+        try:
+            image = Image.frombytes(mode, size, pixels)
+            connection.send(("ok", worker.run(image, output, lang, config)))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+    worker.close()
+
+
+class _ProcessWorker:
+    """A long-lived child process holding warm Tesseract models (tesserocr), fed over a pipe."""
+    backend = "process"
+    warm = True
+
+    def __init__(self):
+        self._process = None
+        self._connection = None
+        self._start()
+
+    def _start(self):
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_process_worker_main, args=(child,), daemon=True)
+        process.start()
+        child.close()
+        self._process, self._connection = process, parent
+
+    def run(self, image, output, lang, config):
+        if not self._process.is_alive():
+            raise RuntimeError("OCR worker process is not running")
+        self._connection.send((image.mode, image.size, image.tobytes(), output, lang, config))
+        if not self._connection.poll(PROCESS_CALL_TIMEOUT):
+            # The child is still busy with this image; its late answer would be
+            # read by the next call, so replace the process
+            self.restart()
+            raise TimeoutError("OCR worker process did not answer in time")
+        status, payload = self._connection.recv()
+        if status != "ok":
+            raise RuntimeError(payload)
+        return payload
+
+    def healthy(self):
+        return self._process is not None and self._process.is_alive()
+
+    def restart(self):
+        self.close()
+        self._start()
+
+    def close(self):
+        if self._process is None:
+            return
+        try:
+            self._connection.send(None)
+        except Exception:
+            pass
+        self._process.join(timeout=2)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._connection.close()
+        self._process = None
+
+
+WORKER_TYPES = {
+    "pytesseract": _PytesseractWorker,
+    "tesserocr": _TesserocrWorker,
+    "process": _ProcessWorker,
+}
+
+
+_cold_warning_shown = False
+
+
+def _warn_cold_workers(requested):
+    global _cold_warning_shown
+    if not _cold_warning_shown:
+        _cold_warning_shown = True
+        print(f"OCR backend '{requested}': tesserocr is not installed, falling back to pytesseract, which "
+              f"starts tesseract and reloads the language models on every call (no warm workers). "
+              f"pip install tesserocr to keep them loaded.", file=sys.stderr)
+
+
+class OCREngine:
+    """
+    Bounded pool of OCR workers. Every call borrows a worker, so at most
+    `workers` recognitions run at once; failing workers are restarted.
+    Without tesserocr "auto" and "process" fall back to pytesseract, which
+    is not persistent (a warning is printed once).
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, backend="auto"):
+        if backend in ("auto", "process") and not _tesserocr_available():
+            # a process worker would only add a pipe in front of the same per-call launch
+            _warn_cold_workers(backend)
+            backend = "pytesseract"
+        elif backend == "auto":
+            backend = "tesserocr"
+        if backend not in WORKER_TYPES:
+            raise ValueError(f"Unknown OCR backend '{backend}'. Available: {', '.join(WORKER_TYPES)}")
+        self.backend = backend
+        self.size = max(1, int(workers))
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.restarts = 0
+        self.total_ms = 0.0
+        for _ in range(self.size):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = WORKER_TYPES[self.backend]()
+        self._all.append(worker)
+        self._idle.put(worker)
+
+    def _acquire(self):
+        try:
+            return self._idle.get(timeout=ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError(f"No OCR worker free after {ACQUIRE_TIMEOUT} seconds")
+
+    def _restart(self, worker):
+        try:
+            worker.restart()
+        finally:
+            with self._lock:
+                self.restarts += 1
+
+    def run(self, image, output="string", lang=None, config=''):
+        """Runs OCR on a PIL image. output is "string" or "data" (word boxes dict)."""
+        worker = self._acquire()
+        start = time.perf_counter()
+        try:
+            return worker.run(image, output, lang, config)
+        except Exception:
+            # A failed call may leave the worker broken: recycle it if it no longer looks healthy
+            if not worker.healthy():
+                self._restart(worker)
+            raise
+        finally:
+            with self._lock:
+                self.calls += 1
+                self.total_ms += (time.perf_counter() - start) * 1000
+            self._idle.put(worker)
+
+    def image_to_string(self, image, lang=None, config=''):
+        return self.run(image, "string", lang, config)
+
+    def image_to_data(self, image, lang=None, config=''):
+        return self.run(image, "data", lang, config)
+
+    def health_check(self):
+        """Checks every idle worker, restarting unhealthy ones. Returns a status dict."""
+        checked = []
+        restarted = 0
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if not worker.healthy():
+                self._restart(worker)
+                restarted += 1
+            checked.append(worker)
+        for worker in checked:
+            self._idle.put(worker)
+        return {"checked": len(checked), "restarted": restarted, **self.stats()}
+
+    def stats(self):
+        with self._lock:
+            mean = self.total_ms / self.calls if self.calls else 0.0
+            return {
+                "backend": self.backend,
+                "warm": getattr(WORKER_TYPES[self.backend], "warm", False),
+                "workers": self.size,
+                "calls": self.calls,
+                "restarts": self.restarts,
+                "mean_ms": round(mean, 3),
+            }
+
+    def close(self):
+        for worker in self._all:
+            worker.close()
+        self._all = []
+
+
+# --- Capability Probe ---
+
+def installed_languages():
+    """Returns the set of traineddata languages Tesseract can load on this host."""
+    if _tesserocr_available():
+        import tesserocr
+        return set(tesserocr.get_languages()[1])
+    import pytesseract
+    return set(pytesseract.get_languages(config=''))
+
+
+def tesseract_version():
+    if _tesserocr_available():
+        import tesserocr
+        return str(tesserocr.tesseract_version()).splitlines()[0]
+    import pytesseract
+    return str(pytesseract.get_tesseract_version())
+
+
+def tesseract_install():
+    """
+    Identifies the Tesseract installation without launching it: the binary
+    (or the tesserocr module) and its mtime, plus the mtime of $TESSDATA_PREFIX
+    when set, so upgrades and new language packs there change the result.
+    """
+    if _tesserocr_available():
+        import tesserocr
+        path = tesserocr.__file__
+    else:
+        import shutil
+        import pytesseract
+        command = pytesseract.pytesseract.tesseract_cmd
+        path = shutil.which(command) or command
+    parts = [os.path.abspath(path)]
+    for item in (path, os.environ.get("TESSDATA_PREFIX")):
+        try:
+            parts.append(str(os.stat(item).st_mtime_ns) if item else "-")
+        except OSError:
+            parts.append("missing")
+    return "|".join(parts)
+
+
+def probe_ocr_capabilities(candidates, engine=None, profile_path=None, force=False):
+    """
+    Picks the first (lang, config) candidate that works on this host.
+
+    Languages are checked against the installed traineddata first, then the
+    chosen configuration is confirmed with one OCR pass on a tiny image, so
+    later calls never pay for a failing Tesseract launch. With profile_path
+    the decision is stored per host and Tesseract installation (binary path
+    and mtime, see tesseract_install) and reused by later processes without
+    launching Tesseract at all; force=True re-probes, e.g. after installing
+    a language pack outside $TESSDATA_PREFIX. Returns {"lang", "config",
+    "languages", "host", "tesseract_version", "source"}.
+    """
+    import json
+    import socket
+    from PIL import Image
+
+    host = socket.gethostname()
+    profile_key = f"{host}|{tesseract_install()}"
+
+    profiles = {}
+    if profile_path and os.path.exists(profile_path):
+        try:
+            with open(profile_path, 'r', encoding='utf-8') as f:
+                profiles = json.load(f)
+        except (OSError, ValueError):
+            profiles = {}
+        if not force and profile_key in profiles:
+            return dict(profiles[profile_key], source="profile")
+
+    # Only on a profile miss: each of these launches tesseract under pytesseract
+    version = tesseract_version()
+    languages = installed_languages()
+    engine = engine or get_ocr_engine()
+    probe_image = Image.new("L", (64, 24), 255)
+    chosen = None
+    errors = []
+    for lang, config in candidates:
+        if lang and not set(lang.split('+')) <= languages:
+            errors.append(f"{lang}: traineddata not installed")
+            continue
+        try:
+            engine.run(probe_image, "string", lang, config)
+        except Exception as e:
+            errors.append(f"{lang or 'default'} {config}: {e}")
+            continue
+        chosen = {"lang": lang, "config": config}
+        break
+    if chosen is None:
+        raise RuntimeError("No working OCR configuration: " + "; ".join(errors))
+
+    decision = dict(chosen, languages=sorted(languages), host=host,
+                    tesseract_version=version, rejected=errors)
+    if profile_path:
+        profiles[profile_key] = decision
+        directory = os.path.dirname(profile_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(profile_path, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, ensure_ascii=False, indent=2)
+    return dict(decision, source="probe")
+
+
+# --- Tile Process Pool ---
+# 整屏分析时把画面切成水平条带，分发到多个进程并行识别 (每个进程一个常驻worker)
+
+_tile_executor = None
+_tile_executor_workers = 0
+_tile_executor_lock = threading.Lock()
+
+
+def _init_tile_process():
+    global _engine
+    # One worker per process: the parallelism comes from the process pool
+    _engine = OCREngine(workers=1, backend="tesserocr" if _tesserocr_available() else "pytesseract")
+
+
+def _ocr_tile_task(mode, size, pixels, output, lang, config):
+    from PIL import Image
+    try:
+        return get_ocr_engine().run(Image.frombytes(mode, size, pixels), output, lang, config)
+    except Exception as e:
+        # Some pytesseract exceptions cannot be unpickled in the parent and would break the pool
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def get_tile_executor(workers=None):
+    """Returns the shared process pool for tiled OCR, (re)creating it for a new size."""
+    global _tile_executor, _tile_executor_workers
+    from concurrent.futures import ProcessPoolExecutor
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    with _tile_executor_lock:
+        if _tile_executor is None or _tile_executor_workers != workers:
+            if _tile_executor is not None:
+                _tile_executor.shutdown(wait=False)
+            _tile_executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_tile_process)
+            _tile_executor_workers = workers
+        return _tile_executor
+
+
+def parallel_ocr_data(image, lang=None, config='', workers=None, overlap=None):
+    """
+    OCRs a frame as overlapping horizontal bands in the tile process pool and
+    merges the word boxes back into one screen-space OCR data dict.
+    """
+    try:
+        from .tiling import make_bands, merge_tile_results, DEFAULT_OVERLAP
+    except ImportError:
+        from tiling import make_bands, merge_tile_results, DEFAULT_OVERLAP
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    bands = make_bands(image.size[0], image.size[1], workers,
+                       DEFAULT_OVERLAP if overlap is None else overlap)
+    executor = get_tile_executor(workers)
+    futures = []
+    for box in bands:
+        tile = image.crop(box)
+        futures.append(executor.submit(_ocr_tile_task, tile.mode, tile.size, tile.tobytes(),
+                                       "data", lang, config))
+    results = [future.result() for future in futures]
+    return merge_tile_results(zip(bands, results), image.size)
+
+
+def shutdown_tile_executor():
+    global _tile_executor
+    with _tile_executor_lock:
+        if _tile_executor is not None:
+            _tile_executor.shutdown(wait=True)
+            _tile_executor = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine():
+    """Returns the process-wide OCR engine, starting it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = OCREngine(
+                    workers=int(os.environ.get("DESKTOP_AUTOMATION_OCR_WORKERS", DEFAULT_WORKERS)),
+                    backend=os.environ.get("DESKTOP_AUTOMATION_OCR_BACKEND", "auto"),
+                )
+    return _engine
+
+
+def configure_ocr_engine(workers=DEFAULT_WORKERS, backend="auto"):
+    """Replaces the process-wide OCR engine (closing the old workers)."""
+    global _engine
+    with _engine_lock:
+        previous = _engine
+        _engine = OCREngine(workers=workers, backend=backend)
+    if previous is not None:
+        previous.close()
+    return _engine
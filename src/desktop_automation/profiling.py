@@ -0,0 +1,256 @@
+"""
+Timing spans for actions and their phases, and task log profiling.
+
+以前日志只有一个时间戳，看不出慢的工作流时间花在哪里。这里记录嵌套的计时区间 (span)：
+- 每个动作 (被 traced_action 装饰的函数) 是一个 span，嵌套调用的动作成为子 span
+  (如 smart_click_text -> find_text_on_screen)
+- 动作内部的阶段 (capture、ocr、search、mouse、keyboard、sleep ...) 用 span(name) 记录
+- _log_action 写日志时把当前动作的 span 树放进 "timing" 字段
+profile_task_log 把一个任务日志汇总成每个动作/阶段的 p50/p95/max，
+export_trace 导出火焰图 (collapsed stacks) 或 Chrome trace 格式。
+"""
+import contextvars
+import functools
+import json
+import math
+import time
+from contextlib import contextmanager
+
+# --- Configuration ---
+MAX_SPANS = 256     # spans kept per top-level action; later ones merge into same-name siblings
+
+_current = contextvars.ContextVar("desktop_automation_span", default=None)
+
+
+class Span:
+    """One timed interval; children are the spans opened while it was current."""
+
+    __slots__ = ("name", "action", "parent", "root", "start", "end", "children", "count", "total")
+
+    def __init__(self, name, parent=None, action=False):
+        self.name = name
+        self.action = action
+        self.parent = parent
+        self.root = parent.root if parent is not None else self
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+        self.count = 1
+        self.total = 1 if parent is None else 0   # spans recorded under this root
+
+    def path(self):
+        names = []
+        node = self
+        while node is not None:
+            if node.action:
+                names.append(node.name)
+            node = node.parent
+        return ';'.join(reversed(names))
+
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def _attach(self):
+        """Adds a closed span to its parent, merging it into a same-name sibling past MAX_SPANS."""
+        parent = self.parent
+        root = self.root
+        if root.total >= MAX_SPANS and not self.children:
+            for sibling in reversed(parent.children):
+                if sibling.name == self.name and not sibling.children:
+                    sibling.count += 1
+                    sibling.end = (sibling.end or sibling.start) + self.duration()
+                    return
+        root.total += 1
+        parent.children.append(self)
+
+    def to_dict(self, origin):
+        node = {"name": self.name, "start_ms": round((self.start - origin) * 1000, 3),
+                "duration_ms": round(self.duration() * 1000, 3)}
+        if self.action:
+            node["action"] = True
+        if self.count > 1:
+            node["count"] = self.count
+        if self.children:
+            node["children"] = [c.to_dict(origin) for c in self.children]
+        return node
+
+
+@contextmanager
+def span(name):
+    """Times a phase of the current action. Does nothing outside an action."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    node = Span(name, parent)
+    token = _current.set(node)
+    try:
+        yield node
+    finally:
+        node.end = time.perf_counter()
+        _current.reset(token)
+        node._attach()
+
+
+def traced_action(func=None, name=None):
+    """
+    Decorator that opens an action span around every call of func.
+    name (used as @traced_action(name=...)) overrides the span name, for a
+    helper that does a public action's work.
+    """
+    if func is None:
+        return functools.partial(traced_action, name=name)
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        parent = _current.get()
+        node = Span(name, parent, action=True)
+        token = _current.set(node)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            node.end = time.perf_counter()
+            _current.reset(token)
+            if parent is not None:
+                node._attach()
+    return wrapper
+
+
+def current_timing(action_name):
+    """
+    Returns the "timing" record of the running action for its log entry, or
+    None when action_name is not the innermost running action.
+    """
+    node = _current.get()
+    while node is not None and not node.action:
+        node = node.parent
+    if node is None or node.name != action_name:
+        return None
+    return {
+        "path": node.path(),
+        "started_at": round(time.time() - node.duration(), 6),
+        "duration_ms": round(node.duration() * 1000, 3),
+        "spans": [c.to_dict(node.start) for c in node.children],
+    }
+
+
+# --- Profiling Reports ---
+
+def read_timed_entries(log_file_path):
+    """Returns the log entries of a task log that carry timing spans."""
+    entries = []
+    with open(log_file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry.get("timing"), dict):
+                entries.append(entry)
+    return entries
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _summary(samples):
+    values = sorted(samples)
+    return {"count": len(values), "total_ms": round(sum(values), 3),
+            "p50_ms": round(_percentile(values, 0.50), 3),
+            "p95_ms": round(_percentile(values, 0.95), 3),
+            "max_ms": round(values[-1], 3)}
+
+
+def _phase_samples(action, spans, prefix, samples):
+    """Collects phase durations of one action; nested actions are reported by their own entries."""
+    for node in spans:
+        if node.get("action"):
+            continue
+        key = f"{action}/{prefix}{node['name']}"
+        count = node.get("count", 1)
+        samples.setdefault(key, []).extend([node["duration_ms"] / count] * count)
+        _phase_samples(action, node.get("children", []), f"{prefix}{node['name']}/", samples)
+
+
+def profile_task_log(log_file_path):
+    """
+    Aggregates a task log into latency statistics:
+    {"actions": {name: stats}, "phases": {"action/phase": stats}} where
+    stats has count, total_ms, p50_ms, p95_ms and max_ms.
+    """
+    action_samples = {}
+    phase_samples = {}
+    for entry in read_timed_entries(log_file_path):
+        timing = entry["timing"]
+        action_samples.setdefault(entry["action"], []).append(timing["duration_ms"])
+        _phase_samples(entry["action"], timing.get("spans", []), "", phase_samples)
+    by_total = lambda item: -item[1]["total_ms"]
+    return {
+        "log_file": log_file_path,
+        "actions": dict(sorted(((k, _summary(v)) for k, v in action_samples.items()), key=by_total)),
+        "phases": dict(sorted(((k, _summary(v)) for k, v in phase_samples.items()), key=by_total)),
+    }
+
+
+def _top_level(entries):
+    """Entries of actions that were not nested in another action (their trees cover the rest)."""
+    return [e for e in entries if ';' not in e["timing"].get("path", e["action"])]
+
+
+def _collapse(stack, node, stacks):
+    stack = stack + [node["name"]]
+    children = node.get("children", [])
+    self_ms = node["duration_ms"] - sum(c["duration_ms"] for c in children)
+    key = ';'.join(stack)
+    stacks[key] = stacks.get(key, 0) + max(0, int(round(self_ms * 1000)))
+    for child in children:
+        _collapse(stack, child, stacks)
+
+
+def _chrome_events(node, base_us, events):
+    event = {"name": node["name"], "cat": "action" if node.get("action") else "phase", "ph": "X",
+             "ts": round(base_us + node["start_ms"] * 1000, 1), "dur": round(node["duration_ms"] * 1000, 1),
+             "pid": 1, "tid": 1}
+    if node.get("count", 1) > 1:
+        event["args"] = {"count": node["count"]}
+    events.append(event)
+    for child in node.get("children", []):
+        _chrome_events(child, base_us, events)
+
+
+def export_trace(log_file_path, output_path, trace_format="collapsed"):
+    """
+    Writes the spans of a task log as a flame graph input. "collapsed" is the
+    folded-stacks format of flamegraph.pl / speedscope (microseconds of self
+    time per stack); "chrome" is a Chrome trace (chrome://tracing, Perfetto).
+    Returns the number of records written.
+    """
+    roots = []
+    for entry in _top_level(read_timed_entries(log_file_path)):
+        timing = entry["timing"]
+        roots.append((timing["started_at"], {"name": entry["action"], "start_ms": 0, "action": True,
+                                             "duration_ms": timing["duration_ms"],
+                                             "children": timing.get("spans", [])}))
+    if trace_format == "collapsed":
+        stacks = {}
+        for _, root in roots:
+            _collapse([], root, stacks)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for key, value in stacks.items():
+                f.write(f"{key} {value}\n")
+        return len(stacks)
+    if trace_format == "chrome":
+        events = []
+        for started_at, root in roots:
+            _chrome_events(root, started_at * 1e6, events)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events)
+    raise ValueError(f"Unknown trace format '{trace_format}'. Available: collapsed, chrome")
@@ -0,0 +1,115 @@
+"""
+Region-of-interest handling for text search actions.
+
+搜索区域可以是：
+- 绝对坐标: [left, top, width, height] 或 {"x": .., "y": .., "width": .., "height": ..}
+- 窗口相对坐标: {"window": "微信", "x": 0, "y": 60, "width": 300, "height": 800}
+  (省略 width/height 时使用整个窗口)
+- 命名区域: "chat_list"，在工作流JSON的 "regions" 中定义或通过 register_regions 注册
+工作流的 "regions" 只在这次运行内有效 (regions_scope，保存在 contextvars 中，与会话一样每个线程互不影响)，
+运行结束后自动移除；register_regions 注册的区域对整个进程有效，直到 clear_regions。
+窗口相对坐标依赖 pyautogui 的窗口查找，目前只有 Windows 支持。
+"""
+import contextlib
+import contextvars
+import sys
+import threading
+
+_named_regions = {}
+_regions_lock = threading.Lock()
+_scoped_regions = contextvars.ContextVar("named_regions", default=None)
+
+
+def register_regions(regions):
+    """Registers named regions for the whole process (until clear_regions())."""
+    with _regions_lock:
+        _named_regions.update(regions or {})
+
+
+def clear_regions():
+    with _regions_lock:
+        _named_regions.clear()
+
+
+@contextlib.contextmanager
+def regions_scope(regions):
+    """
+    Makes named regions (e.g. the "regions" block of a workflow file)
+    available inside the block only; they shadow process-wide ones.
+    """
+    token = _scoped_regions.set(dict(_scoped_regions.get() or {}, **(regions or {})))
+    try:
+        yield
+    finally:
+        _scoped_regions.reset(token)
+
+
+def get_named_regions():
+    with _regions_lock:
+        regions = dict(_named_regions)
+    regions.update(_scoped_regions.get() or {})
+    return regions
+
+
+def _find_window(title):
+    # Checked before importing pyautogui, which fails on a Linux machine without $DISPLAY
+    if sys.platform != 'win32':
+        raise NotImplementedError(f"Window-relative regions ('{title}') need window lookup, which pyautogui "
+                                  f"only supports on Windows; use absolute coordinates on this platform")
+    import pyautogui
+    windows = [w for w in pyautogui.getWindowsWithTitle(title) if w.width > 0 and w.height > 0]
+    if not windows:
+        raise ValueError(f"Window '{title}' not found for region lookup")
+    return windows[0]
+
+
+def resolve_region(region, _depth=0):
+    """
+    Resolves a region spec into an absolute (left, top, width, height) tuple.
+    Returns None when region is None (meaning the full screen).
+    """
+    if region is None:
+        return None
+    if _depth > 8:
+        raise ValueError("Named regions reference each other in a loop")
+
+    if isinstance(region, str):
+        spec = get_named_regions().get(region)
+        if spec is None:
+            raise ValueError(f"Unknown region '{region}'")
+        return resolve_region(spec, _depth + 1)
+
+    if isinstance(region, (list, tuple)):
+        if len(region) != 4:
+            raise ValueError(f"Region must be [left, top, width, height], got {region}")
+        left, top, width, height = (int(v) for v in region)
+    elif isinstance(region, dict):
+        offset_x = offset_y = 0
+        width = region.get("width")
+        height = region.get("height")
+        if region.get("window"):
+            window = _find_window(region["window"])
+            offset_x, offset_y = window.left, window.top
+            if width is None:
+                width = window.width - int(region.get("x", 0))
+            if height is None:
+                height = window.height - int(region.get("y", 0))
+        if width is None or height is None:
+            raise ValueError(f"Region {region} needs width and height")
+        left = offset_x + int(region.get("x", 0))
+        top = offset_y + int(region.get("y", 0))
+        width, height = int(width), int(height)
+    else:
+        raise ValueError(f"Unsupported region spec: {region!r}")
+
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Region has no area: {region!r}")
+    return (max(0, left), max(0, top), width, height)
+
+
+def to_screen(location, region):
+    """Maps a region-relative {"x", "y"} location back to screen coordinates (in place)."""
+    if location and region:
+        location["x"] += region[0]
+        location["y"] += region[1]
+    return location
@@ -0,0 +1,406 @@
+"""
+Screen sources: where vision functions get their frames from.
+
+所有截图都通过当前的 ScreenSource 获取，可以在以下实现之间切换：
+- pyautogui: 默认，真实屏幕
+- mss: 直接读取帧缓冲 (X11/Xvfb/Windows)，比 pyautogui 快
+- replay: 从磁盘读取录制好的 PNG/raw 帧，无需显示器 (CI/基准测试)
+
+也可以通过环境变量选择：
+    DESKTOP_AUTOMATION_SCREEN_SOURCE=replay
+    DESKTOP_AUTOMATION_REPLAY_DIR=path/to/frames
+"""
+import contextlib
+import glob
+import os
+import re
+import threading
+import time
+
+try:
+    from .lazy_import import lazy_module
+    from .sessions import current_session
+except ImportError:
+    from lazy_import import lazy_module
+    from sessions import current_session
+
+Image = lazy_module("PIL.Image")
+np = lazy_module("numpy")
+
+SOURCE_ENV = "DESKTOP_AUTOMATION_SCREEN_SOURCE"
+REPLAY_DIR_ENV = "DESKTOP_AUTOMATION_REPLAY_DIR"
+
+IMAGE_EXTENSIONS = ('.png', '.bmp', '.jpg', '.jpeg')
+# Raw frames are plain RGB bytes named like "frame_0001_1920x1080.rgb"
+RAW_FRAME_PATTERN = re.compile(r'_(\d+)x(\d+)\.rgb$')
+
+
+class ScreenSource:
+    """
+    Base class for frame providers. Subclasses implement grab(region),
+    callers use capture(region) which also records capture latency.
+    region is (left, top, width, height) in screen coordinates.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.capture_count = 0
+        self.total_capture_ms = 0.0
+        self.last_capture_ms = 0.0
+
+    def grab(self, region=None):
+        raise NotImplementedError
+
+    def grab_array(self, pool, region=None):
+        """
+        Captures into a pooled FrameBuffer (see frame_buffers.py). This
+        fallback copies a PIL frame; sources that can write straight into
+        the buffer override it.
+        """
+        frame = self.grab(region)
+        if frame.mode != "RGB":
+            frame = frame.convert("RGB")
+        buffer = pool.acquire((frame.size[1], frame.size[0], 3))
+        buffer.array[...] = np.asarray(frame)
+        return buffer
+
+    def _timed(self, grab, *args):
+        start = time.perf_counter()
+        frame = grab(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.capture_count += 1
+        self.total_capture_ms += elapsed
+        self.last_capture_ms = elapsed
+        return frame
+
+    def capture(self, region=None):
+        return self._timed(self.grab, region)
+
+    def capture_array(self, pool, region=None):
+        """Like capture(), but returns a FrameBuffer from pool that the caller must release."""
+        return self._timed(self.grab_array, pool, region)
+
+    def size(self):
+        return self.capture().size
+
+    def close(self):
+        pass
+
+    def stats(self):
+        mean = self.total_capture_ms / self.capture_count if self.capture_count else 0.0
+        return {
+            "source": self.name,
+            "captures": self.capture_count,
+            "last_ms": round(self.last_capture_ms, 3),
+            "mean_ms": round(mean, 3),
+        }
+
+
+def _crop(image, region):
+    if not region:
+        return image
+    left, top, width, height = region
+    return image.crop((left, top, left + width, top + height))
+
+
+class PyAutoGUISource(ScreenSource):
+    """Captures the real screen through pyautogui.screenshot()."""
+    name = "pyautogui"
+
+    def grab(self, region=None):
+        import pyautogui
+        if region:
+            return pyautogui.screenshot(region=tuple(region))
+        return pyautogui.screenshot()
+
+    def size(self):
+        import pyautogui
+        return tuple(pyautogui.size())
+
+
+class MSSSource(ScreenSource):
+    """
+    Grabs frames straight from the framebuffer with mss (X11 shared memory
+    on Linux/Xvfb, GDI on Windows). display selects an X display such as ":99".
+    """
+    name = "mss"
+
+    def __init__(self, monitor=1, display=None):
+        super().__init__()
+        import mss  # optional dependency: pip install mss
+        self._mss_module = mss
+        self.monitor_index = monitor
+        self.display = display
+        # mss handles are not thread safe, keep one per thread
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            kwargs = {"display": self.display} if self.display else {}
+            sct = self._mss_module.mss(**kwargs)
+            self._local.sct = sct
+        return sct
+
+    def _grab_shot(self, region):
+        sct = self._sct()
+        monitor = sct.monitors[self.monitor_index]
+        if region:
+            left, top, width, height = region
+            area = {"left": monitor["left"] + left, "top": monitor["top"] + top,
+                    "width": width, "height": height}
+        else:
+            area = monitor
+        return sct.grab(area)
+
+    def grab(self, region=None):
+        shot = self._grab_shot(region)
+        return Image.frombytes("RGB", shot.size, shot.raw, "raw", "BGRX")
+
+    def grab_array(self, pool, region=None):
+        shot = self._grab_shot(region)
+        width, height = shot.size
+        # shot.raw is mss's own BGRA buffer (shot.bgra would copy it); swap channels into the pooled array
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(height, width, 4)
+        buffer = pool.acquire((height, width, 3))
+        for channel in range(3):
+            buffer.array[..., channel] = bgra[..., 2 - channel]
+        return buffer
+
+    def size(self):
+        monitor = self._sct().monitors[self.monitor_index]
+        return (monitor["width"], monitor["height"])
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+def load_frame(path):
+    """Loads a recorded frame (image file or raw RGB) as a PIL Image."""
+    match = RAW_FRAME_PATTERN.search(path)
+    if match:
+        width, height = int(match.group(1)), int(match.group(2))
+        with open(path, 'rb') as f:
+            return Image.frombytes("RGB", (width, height), f.read())
+    with Image.open(path) as image:
+        return image.convert("RGB")
+
+
+def save_frame(image, path):
+    """Saves a frame for later replay. A ".rgb" path stores raw RGB bytes."""
+    if path.endswith('.rgb'):
+        width, height = image.size
+        if not RAW_FRAME_PATTERN.search(path):
+            path = f"{path[:-4]}_{width}x{height}.rgb"
+        with open(path, 'wb') as f:
+            f.write(image.convert("RGB").tobytes())
+    else:
+        image.save(path)
+    return path
+
+
+class ReplaySource(ScreenSource):
+    """
+    Replays recorded frames from a directory (or a list of files) in name
+    order. Every capture advances to the next frame unless advance="manual",
+    in which case call next_frame() explicitly. Frames are decoded once.
+    """
+    name = "replay"
+
+    def __init__(self, frames, loop=True, advance="auto"):
+        super().__init__()
+        if isinstance(frames, str):
+            directory = frames
+            frames = sorted(
+                p for p in glob.glob(os.path.join(directory, '*'))
+                if p.lower().endswith(IMAGE_EXTENSIONS) or RAW_FRAME_PATTERN.search(p)
+            )
+            if not frames:
+                raise FileNotFoundError(f"No recorded frames found in {directory}")
+        self.paths = list(frames)
+        self.loop = loop
+        self.advance = advance
+        self.position = 0
+        self._decoded = {}
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def _frame(self, index):
+        image = self._decoded.get(index)
+        if image is None:
+            image = load_frame(self.paths[index])
+            self._decoded[index] = image
+        return image
+
+    def next_frame(self):
+        """Moves to the next recorded frame."""
+        with self._lock:
+            if self.position < len(self.paths) - 1:
+                self.position += 1
+            elif self.loop:
+                self.position = 0
+
+    def seek(self, index):
+        """Jumps to recorded frame number index (0-based)."""
+        if not 0 <= index < len(self.paths):
+            raise IndexError(f"Frame {index} out of range (0-{len(self.paths) - 1})")
+        with self._lock:
+            self.position = index
+
+    def grab(self, region=None):
+        with self._lock:
+            image = self._frame(self.position)
+        if self.advance == "auto":
+            self.next_frame()
+        # Hand out a copy so callers can't modify the recorded frame
+        return _crop(image, region) if region else image.copy()
+
+    def grab_array(self, pool, region=None):
+        with self._lock:
+            pixels = self._arrays.get(self.position)
+            if pixels is None:
+                pixels = self._arrays[self.position] = np.asarray(self._frame(self.position))
+        if self.advance == "auto":
+            self.next_frame()
+        if region:
+            left, top, width, height = region
+            pixels = pixels[top:top + height, left:left + width]
+        buffer = pool.acquire(pixels.shape)
+        np.copyto(buffer.array, pixels)
+        return buffer
+
+    def size(self):
+        return self._frame(self.position).size
+
+
+class RecordingSource(ScreenSource):
+    """Wraps another source and writes every captured full frame to a directory."""
+    name = "recording"
+
+    def __init__(self, inner, directory, raw=False):
+        super().__init__()
+        self.inner = inner
+        self.directory = directory
+        self.raw = raw
+        self._counter = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def grab(self, region=None):
+        frame = self.inner.capture(region)
+        if not region:
+            self._counter += 1
+            extension = '.rgb' if self.raw else '.png'
+            save_frame(frame, os.path.join(self.directory, f"frame_{self._counter:05d}{extension}"))
+        return frame
+
+    def size(self):
+        return self.inner.size()
+
+
+SOURCES = {
+    "pyautogui": PyAutoGUISource,
+    "mss": MSSSource,
+    "replay": ReplaySource,
+}
+
+
+def create_screen_source(name, **kwargs):
+    """Instantiates a screen source by name ("pyautogui", "mss" or "replay")."""
+    if name not in SOURCES:
+        raise ValueError(f"Unknown screen source '{name}'. Available: {', '.join(SOURCES)}")
+    if name == "replay" and "frames" not in kwargs:
+        kwargs["frames"] = os.environ.get(REPLAY_DIR_ENV, "")
+    return SOURCES[name](**kwargs)
+
+
+_current_source = None
+_source_lock = threading.Lock()
+
+
+def get_screen_source():
+    """
+    Returns the active screen source: the current session's (see sessions.py),
+    otherwise the process-wide one, created on first use.
+    """
+    global _current_source
+    session = current_session()
+    if session is not None:
+        return session.screen_source
+    if _current_source is None:
+        with _source_lock:
+            if _current_source is None:
+                _current_source = create_screen_source(os.environ.get(SOURCE_ENV, "pyautogui"))
+    return _current_source
+
+
+def set_screen_source(source, **kwargs):
+    """
+    Switches the active screen source (of the current session, if any).
+    source is a ScreenSource or a registered name.
+    """
+    global _current_source
+    if isinstance(source, str):
+        source = create_screen_source(source, **kwargs)
+    session = current_session()
+    if session is not None:
+        previous, session.screen_source = session.screen_source, source
+        if previous is not source:
+            previous.close()
+        return source
+    with _source_lock:
+        previous = _current_source
+        _current_source = source
+    if previous is not None and previous is not source:
+        previous.close()
+    return source
+
+
+@contextlib.contextmanager
+def screen_source_override(source, **kwargs):
+    """
+    Makes source the active screen source (of the current session, if any)
+    inside the block and restores the previous one afterwards without
+    closing it. A source created here from a name is closed on exit.
+    """
+    global _current_source
+    owned = isinstance(source, str)
+    if owned:
+        source = create_screen_source(source, **kwargs)
+    session = current_session()
+    if session is not None:
+        previous, session.screen_source = session.screen_source, source
+    else:
+        with _source_lock:
+            previous, _current_source = _current_source, source
+    try:
+        yield source
+    finally:
+        if session is not None:
+            session.screen_source = previous
+        else:
+            with _source_lock:
+                _current_source = previous
+        if owned:
+            source.close()
+
+
+def measure_capture_latency(source=None, samples=20):
+    """Captures `samples` full frames and returns latency statistics in milliseconds."""
+    source = source or get_screen_source()
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        source.capture()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "source": source.name,
+        "samples": samples,
+        "min_ms": round(timings[0], 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+    }
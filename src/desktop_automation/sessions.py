@@ -0,0 +1,238 @@
+"""
+Isolated automation sessions on separate (virtual) displays.
+
+core.py 的接口默认只有一个屏幕和一套鼠标键盘，一台机器同一时间只能跑一个工作流。
+AutomationSession 把一个显示器 (例如一个独立的 Xvfb 实例) 需要的状态打包在一起：
+截图来源、输入引擎 (通过 XTest 发往该显示器)、帧/OCR缓存和任务日志。
+在 session.activate() 内 (或通过 session.run(...)) 调用 core.py 的任何动作都只作用于这个会话；
+当前会话保存在 contextvars 中，每个线程互不影响，会话之外仍然使用全局默认的屏幕和输入。
+
+SessionPool 为每个会话开一个工作线程，从共享队列领取任务，多个显示器上的工作流同时执行；
+OCR 在所有会话共享的 worker 池中进行，池大小按会话数扩容 (不超过CPU核数)。
+
+本模块在导入时不加载其他模块 (screen_source、input_engine 会反过来查询当前会话)。
+"""
+import contextlib
+import contextvars
+import os
+import queue
+import subprocess
+import threading
+import time
+
+_current_session = contextvars.ContextVar("automation_session", default=None)
+
+
+def current_session():
+    """Returns the AutomationSession active in this context, or None."""
+    return _current_session.get()
+
+
+class VirtualDisplay:
+    """An Xvfb server on display :number. start() waits until it accepts connections."""
+
+    def __init__(self, number, width=1920, height=1080, depth=24):
+        self.number = int(number)
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.process = None
+
+    @property
+    def name(self):
+        return f":{self.number}"
+
+    def start(self, timeout=10):
+        socket_path = f"/tmp/.X11-unix/X{self.number}"
+        try:
+            self.process = subprocess.Popen(
+                ["Xvfb", self.name, "-screen", "0", f"{self.width}x{self.height}x{self.depth}", "-nolisten", "tcp"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            raise RuntimeError("Xvfb is not installed (apt-get install xvfb)") from None
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(socket_path):
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Xvfb {self.name} exited with code {self.process.returncode}")
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Xvfb {self.name} did not start within {timeout} seconds")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class AutomationSession:
+    """
+    Screen source, input engine, frame cache and task log of one display.
+    display (e.g. ":99") selects an mss screen source and an XTest input
+    backend for that X display; screen_source/input_backend override them
+    (objects or registered names such as "replay" / "record").
+    """
+
+    def __init__(self, name, display=None, screen_source=None, input_backend=None, motion_profile=None,
+                 virtual_display=None):
+        try:
+            from .screen_source import create_screen_source
+            from .input_engine import InputEngine, create_input_backend, XlibBackend
+            from .frame_cache import FrameCache
+        except ImportError:
+            from screen_source import create_screen_source
+            from input_engine import InputEngine, create_input_backend, XlibBackend
+            from frame_cache import FrameCache
+
+        self.name = name
+        self.virtual_display = virtual_display
+        self.display = display or (virtual_display.name if virtual_display else None)
+        if screen_source is None and self.display:
+            screen_source = create_screen_source("mss", display=self.display)
+        elif isinstance(screen_source, str):
+            screen_source = create_screen_source(screen_source)
+        if input_backend is None and self.display:
+            input_backend = XlibBackend(self.display)
+        elif isinstance(input_backend, str):
+            input_backend = create_input_backend(input_backend)
+        if screen_source is None or input_backend is None:
+            raise ValueError(f"Session '{name}' needs a display or both a screen source and an input backend")
+
+        self.screen_source = screen_source
+        self.input_engine = InputEngine(input_backend, motion_profile)
+        self.frame_cache = FrameCache()
+        self.log_file_path = None
+        self.jobs = 0
+
+    @classmethod
+    def virtual(cls, name, number, width=1920, height=1080, **kwargs):
+        """Starts an Xvfb display :number and returns a session that owns (and later stops) it."""
+        display = VirtualDisplay(number, width, height).start()
+        try:
+            return cls(name, virtual_display=display, **kwargs)
+        except Exception:
+            display.stop()
+            raise
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Makes this the current session for core.py actions called inside the block."""
+        token = _current_session.set(self)
+        try:
+            yield self
+        finally:
+            _current_session.reset(token)
+
+    def run(self, func, *args, **kwargs):
+        with self.activate():
+            return func(*args, **kwargs)
+
+    def start_log(self):
+        """Starts this session's task log; workflows run by a SessionPool log there."""
+        try:
+            from . import core
+        except ImportError:
+            import core
+        self.log_file_path = self.run(core.start_task_log)
+        return self.log_file_path
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "display": self.display,
+            "jobs": self.jobs,
+            "log_file_path": self.log_file_path,
+            "screen": self.screen_source.stats(),
+            "input": self.input_engine.stats(),
+            "frame_cache": self.frame_cache.stats(),
+        }
+
+    def close(self):
+        try:
+            from .task_logger import close_task_log
+        except ImportError:
+            from task_logger import close_task_log
+        if self.log_file_path:
+            close_task_log(self.log_file_path)
+        self.screen_source.close()
+        close = getattr(self.input_engine.backend, "close", None)
+        if close:
+            close()
+        if self.virtual_display is not None:
+            self.virtual_display.stop()
+
+
+def _ensure_ocr_capacity(workers):
+    """Grows the shared OCR worker pool so concurrent sessions don't queue for a worker."""
+    try:
+        from .ocr_engine import get_ocr_engine, configure_ocr_engine
+    except ImportError:
+        from ocr_engine import get_ocr_engine, configure_ocr_engine
+    engine = get_ocr_engine()
+    if engine.size < workers:
+        configure_ocr_engine(workers=workers, backend=engine.backend)
+
+
+class SessionPool:
+    """
+    Runs jobs on a set of sessions, one worker thread per session pulling
+    from a shared queue, so every display stays busy until the queue is empty.
+    ocr_workers sizes the shared OCR pool (default: one per session, at most
+    the number of CPU cores; 0 leaves it alone).
+    """
+
+    def __init__(self, sessions, ocr_workers=None):
+        self.sessions = list(sessions)
+        if not self.sessions:
+            raise ValueError("SessionPool needs at least one session")
+        if ocr_workers is None:
+            ocr_workers = min(len(self.sessions), os.cpu_count() or 1)
+        if ocr_workers:
+            _ensure_ocr_capacity(ocr_workers)
+
+    def map(self, func, items):
+        """
+        Calls func(session, item) for every item inside that session and
+        returns the results in item order. The first exception is re-raised
+        after all workers have finished.
+        """
+        items = list(items)
+        work = queue.Queue()
+        for index, item in enumerate(items):
+            work.put((index, item))
+        results = [None] * len(items)
+        errors = []
+
+        def worker(session):
+            while not errors:
+                try:
+                    index, item = work.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    results[index] = session.run(func, session, item)
+                    session.jobs += 1
+                except BaseException as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(session,), name=f"session:{session.name}", daemon=True)
+                   for session in self.sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return results
+
+    def stats(self):
+        return [session.stats() for session in self.sessions]
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
@@ -0,0 +1,255 @@
+"""
+Screen-state memo for workflow steps.
+
+工作流执行时每一步都盲目执行：屏幕已经处于目标状态时 smart_click_text 仍要OCR、点击、验证；
+中途失败后重新运行也要从第一步开始。StepMemo 在一次成功的运行中记录每一步前后屏幕的
+紧凑指纹 (change_detect.frame_signature 的低分辨率灰度缩略图)，以后再运行同一工作流
+(相同参数) 时：
+- 开始前当前屏幕与某一步之后的状态一致 (且与起始状态不一致) 时，从下一步继续 (断点续跑)
+- 某一步之前屏幕已经与该步执行后的状态一致时，跳过这一步 (后置条件已满足)
+只有前后指纹确实不同的步骤 (有可见效果) 才可能被跳过；wait、没有可见变化的快捷键等总是执行。
+输入步骤 (输入文字、按键、点击) 不能只凭屏幕判断：再发一条相同的消息时，上一条还显示在屏幕上。
+它们只有在同一次运行 (run_id，例如批量任务的多次重试) 中已经执行过时才会被跳过或续跑越过。
+每个步骤边界只截一次图，计算指纹只需几毫秒，远小于一次OCR。
+
+记录按 (工作流, 参数) 保存在 logs/step_memo.json；工作流的步骤或屏幕尺寸变化后旧记录自动失效。
+"""
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    from . import core as da
+    from .change_detect import frame_signature, signature_distance
+except ImportError:
+    import core as da
+    from change_detect import frame_signature, signature_distance
+
+# --- Configuration ---
+STEP_MEMO_FILE = os.path.join(da.LOGS_DIR, "step_memo.json")
+FINGERPRINT_SIZE = (32, 18)     # cells; each covers ~60x60 px at 1080p
+MATCH_THRESHOLD = 24            # max per-cell grey level difference that still counts as the same screen
+MAX_ENTRIES = 500               # oldest workflow/parameter records are dropped beyond this
+MAX_RUNS = 500                  # runs whose completed input steps are remembered (in memory)
+# Steps that send input: the screen after them may equal the screen before a repeat, so they
+# are only skipped when the same run already did them
+INPUT_ACTIONS = ('type_text', 'paste_text', 'press_hotkey', 'send_input_batch', 'move_and_click',
+                 'smart_click_text', 'find_and_click_image')
+
+
+def memo_key(workflow, workflow_params):
+    """Identifies one workflow with one parameter set."""
+    payload = json.dumps([workflow.name, workflow.source, workflow_params or {}], sort_keys=True,
+                         ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=12).hexdigest()
+
+
+class StepMemo:
+    """
+    Stores step fingerprints of successful runs and decides which steps of a
+    new run can be skipped. begin() returns the MemoRun CompiledWorkflow.run uses.
+    """
+
+    def __init__(self, path=STEP_MEMO_FILE, threshold=MATCH_THRESHOLD, size=FINGERPRINT_SIZE,
+                 max_entries=MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.size = tuple(size)
+        self.max_entries = max_entries
+        self._entries = None
+        self._runs = OrderedDict()      # run_id -> indices of input steps that run completed
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.resumed = 0
+        self.recorded = 0
+
+    def fingerprint(self, image=None):
+        """Fingerprint of image, or of the current screen (of the active session)."""
+        if image is None:
+            image = da._capture_screen()
+        return frame_signature(image, self.size), image.size
+
+    def matches(self, a, b):
+        return signature_distance(a, b) <= self.threshold
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring unreadable step memo '{self.path}': {e}", file=sys.stderr)
+        return self._entries
+
+    def lookup(self, workflow, workflow_params, frame_size):
+        """Returns the recorded fingerprints (one per step boundary) if they fit this plan, else None."""
+        with self._lock:
+            entry = self._load().get(memo_key(workflow, workflow_params))
+        if not entry or entry.get("actions") != [step.action for step in workflow.steps] or \
+                tuple(entry.get("frame_size", ())) != tuple(frame_size):
+            return None
+        return [base64.b64decode(fp) for fp in entry["fingerprints"]]
+
+    def record(self, workflow, workflow_params, frame_size, fingerprints):
+        """Saves the fingerprints of a successful run (len(steps) + 1 boundaries)."""
+        entry = {"workflow": workflow.name, "actions": [step.action for step in workflow.steps],
+                 "frame_size": list(frame_size), "recorded_at": datetime.now().isoformat(),
+                 "fingerprints": [base64.b64encode(fp).decode('ascii') for fp in fingerprints]}
+        with self._lock:
+            entries = self._load()
+            entries[memo_key(workflow, workflow_params)] = entry
+            if len(entries) > self.max_entries:
+                for key in sorted(entries, key=lambda k: entries[k]["recorded_at"])[:len(entries) - self.max_entries]:
+                    del entries[key]
+            self.recorded += 1
+            if self.path:
+                try:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                        json.dump(entries, f)
+                    os.replace(self.path + '.tmp', self.path)
+                except OSError as e:
+                    print(f"Could not save step memo: {e}", file=sys.stderr)
+
+    def forget(self, workflow=None, workflow_params=None):
+        """Drops the record of one workflow/parameter set, or all records."""
+        with self._lock:
+            entries = self._load()
+            if workflow is None:
+                entries.clear()
+            else:
+                entries.pop(memo_key(workflow, workflow_params), None)
+            if self.path and os.path.exists(self.path):
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+
+    def begin(self, workflow, workflow_params, log_file_path=None, run_id=None):
+        """
+        Starts a run. Attempts that share run_id (retries of one batch job)
+        may pass over input steps an earlier attempt completed; without one
+        every input step runs.
+        """
+        return MemoRun(self, workflow, workflow_params, log_file_path, run_id)
+
+    def _completed(self, run_id):
+        with self._lock:
+            completed = self._runs.pop(run_id, None) or set()
+            self._runs[run_id] = completed
+            while len(self._runs) > MAX_RUNS:
+                self._runs.popitem(last=False)
+            return completed
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._load()), "skipped": self.skipped, "resumed": self.resumed,
+                    "recorded": self.recorded, "threshold": self.threshold}
+
+
+class MemoRun:
+    """
+    One workflow run under a StepMemo. should_skip(step) is called before
+    each step, finish() after the last one succeeded.
+    """
+
+    def __init__(self, memo, workflow, workflow_params, log_file_path=None, run_id=None):
+        self.memo = memo
+        self.workflow = workflow
+        self.workflow_params = workflow_params
+        self.log_file_path = log_file_path
+        self.completed = memo._completed(run_id if run_id is not None else uuid.uuid4().hex)
+        self.recorded = None
+        self.observed = [None] * (len(workflow.steps) + 1)
+        self.resume_at = None
+        self.frame_size = None
+        self._current = None        # fingerprint still valid because nothing ran since it was taken
+
+    def _capture(self):
+        if self._current is None:
+            self._current, size = self.memo.fingerprint()
+            if self.frame_size is None:
+                self.frame_size = size
+        return self._current
+
+    def _start(self):
+        """Looks up the record and picks the step boundary this run starts from."""
+        current = self._capture()
+        self.recorded = self.memo.lookup(self.workflow, self.workflow_params, self.frame_size)
+        self.resume_at = 0
+        if self.recorded is None or self.memo.matches(current, self.recorded[0]):
+            return
+        # Earliest matching boundary: with repeated screens, redo steps rather than skip too many
+        boundary = next((i for i, fp in enumerate(self.recorded) if self.memo.matches(current, fp)), 0)
+        if boundary == len(self.recorded) - 1 and not self.memo.matches(self.recorded[0], self.recorded[-1]):
+            boundary = 0        # the screen already shows the end state: don't silently do nothing
+        if not all(self._done(step) for step in self.workflow.steps[:boundary]):
+            boundary = 0        # input this run has not sent yet: the screen may show an earlier send
+        if boundary:
+            self.resume_at = boundary
+            self.memo.resumed += 1
+            da._log_action(self.log_file_path, "workflow_resume",
+                           {"workflow": self.workflow.name, "step": boundary + 1}, "success",
+                           f"Screen matches the state after step {boundary}; resuming at step {boundary + 1}")
+            print(f"Workflow '{self.workflow.name}': screen matches step {boundary}, resuming at step {boundary + 1}")
+
+    def _done(self, step):
+        return step.action not in INPUT_ACTIONS or step.index in self.completed
+
+    def should_skip(self, step):
+        """True when step can be skipped because the screen already shows its result."""
+        position = step.index - 1
+        if self.resume_at is None:
+            self._start()
+        if position < self.resume_at:
+            return True
+        current = self._capture()
+        self.observed[position] = current
+        recorded = self.recorded
+        if position == self.resume_at or recorded is None or not self._done(step):
+            return False
+        before, after = recorded[position], recorded[position + 1]
+        if self.memo.matches(before, after) or self.memo.matches(current, before) or \
+                not self.memo.matches(current, after):
+            return False
+        self.observed[position] = before     # keep the state the step changes from
+        self.memo.skipped += 1
+        da._log_action(self.log_file_path, "workflow_step_skipped",
+                       {"workflow": self.workflow.name, "step": step.index, "action": step.action}, "success",
+                       "Screen already matches the state after this step")
+        print(f"Workflow step [{step.action}]: skipped, screen already matches its result")
+        return True
+
+    def step_ran(self, step):
+        self._current = None
+        self.completed.add(step.index)
+
+    def finish(self):
+        """Records the run: boundaries skipped by resuming keep their earlier fingerprints."""
+        if self.resume_at is None:
+            self._start()
+        self.observed[-1] = self._capture()
+        fingerprints = [fp if fp is not None else (self.recorded[i] if self.recorded else None)
+                        for i, fp in enumerate(self.observed)]
+        if any(fp is None for fp in fingerprints):
+            return
+        self.memo.record(self.workflow, self.workflow_params, self.frame_size, fingerprints)
+
+
+_step_memo = None
+_step_memo_lock = threading.Lock()
+
+
+def get_step_memo():
+    """Returns the process-wide StepMemo (logs/step_memo.json)."""
+    global _step_memo
+    with _step_memo_lock:
+        if _step_memo is None:
+            _step_memo = StepMemo()
+        return _step_memo
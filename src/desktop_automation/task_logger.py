@@ -0,0 +1,134 @@
+"""
+Buffered JSONL task logger.
+
+_log_action 以前每条记录都要打开、追加、关闭一次日志文件，轮询循环里每次都在付磁盘延迟。
+TaskLogger 持有打开的文件句柄和一个有界内存队列，由后台线程按条数/时间阈值批量写入；
+end_task_with_verdict 和解释器退出时保证全部落盘。
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+
+# --- Configuration ---
+FLUSH_INTERVAL = 0.5        # seconds a line may wait in memory
+FLUSH_BATCH = 64            # lines that trigger an immediate write
+MAX_QUEUE = 10000           # bounded buffer; writers block when it is full
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class TaskLogger:
+    """Owns one JSONL file; entries are queued and written by a background thread."""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH, max_queue=MAX_QUEUE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._closed = False
+        self.lines_written = 0
+        self.writes = 0
+        self._thread = threading.Thread(target=self._run, name=f"task-logger:{path}", daemon=True)
+        self._thread.start()
+
+    def write(self, entry):
+        """Queues one log entry (a dict) for writing."""
+        if self._closed:
+            raise ValueError(f"Task logger for {self.path} is closed")
+        self._queue.put(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def flush(self, timeout=10):
+        """Blocks until every entry queued so far is on disk."""
+        if self._closed or not self._thread.is_alive():
+            return
+        request = _FlushRequest()
+        self._queue.put(request)
+        request.done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _write_batch(self, lines):
+        if not lines:
+            return
+        try:
+            self._file.write(''.join(lines))
+            self._file.flush()
+            self.lines_written += len(lines)
+            self.writes += 1
+        except Exception as e:
+            print(f"Error writing to log file {self.path}: {e}")
+        lines.clear()
+
+    def _run(self):
+        pending = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._write_batch(pending)
+                continue
+            if item is None:
+                self._write_batch(pending)
+                break
+            if isinstance(item, _FlushRequest):
+                self._write_batch(pending)
+                item.done.set()
+                continue
+            pending.append(item)
+            if len(pending) >= self.flush_batch:
+                self._write_batch(pending)
+        self._file.close()
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def get_task_logger(path):
+    """Returns the shared logger for a log file path, opening it on first use."""
+    path = os.path.abspath(path)
+    with _loggers_lock:
+        logger = _loggers.get(path)
+        if logger is None or logger._closed:
+            logger = TaskLogger(path)
+            _loggers[path] = logger
+        return logger
+
+
+def flush_task_log(path):
+    """Writes out everything queued for a log file (no-op if it has no logger)."""
+    with _loggers_lock:
+        logger = _loggers.get(os.path.abspath(path))
+    if logger is not None:
+        logger.flush()
+
+
+def close_task_log(path):
+    """Flushes and closes the logger of a log file."""
+    with _loggers_lock:
+        logger = _loggers.pop(os.path.abspath(path), None)
+    if logger is not None:
+        logger.close()
+
+
+def close_all_task_logs():
+    with _loggers_lock:
+        loggers = list(_loggers.values())
+        _loggers.clear()
+    for logger in loggers:
+        logger.close()
+
+
+atexit.register(close_all_task_logs)
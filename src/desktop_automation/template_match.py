@@ -0,0 +1,258 @@
+"""
+In-process template matching (normalized cross-correlation).
+
+find_and_click_image 以前每次都要解码base64、写临时PNG，再用 pyautogui 在整屏上搜索。
+这里改为：
+- 模板按内容哈希缓存在内存里 (解码后的灰度数组、各缩放比例、金字塔)
+- NumPy 向量化的归一化互相关 (安装了 OpenCV 时使用 cv2.matchTemplate)
+- 先在金字塔的粗层级定位候选，再在原始分辨率的小邻域内精确匹配
+- 支持多缩放比例 (适配不同DPI) 和只搜索指定区域
+未安装 NumPy 时退回 pyautogui.locate (仍然在内存中完成，不写临时文件)。
+"""
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+try:
+    import cv2  # optional, faster matchTemplate
+except ImportError:
+    cv2 = None
+
+# --- Configuration ---
+MAX_TEMPLATES = 64          # decoded templates kept in memory
+MIN_PYRAMID_SIDE = 8        # coarsest level keeps the template at least this big
+COARSE_MARGIN = 0.15        # coarse candidates may score this much below the threshold
+MAX_CANDIDATES = 8          # coarse candidates refined at full resolution
+MULTI_SCALES = (0.75, 1.0, 1.25, 1.5, 2.0)
+
+
+LUMA = (0.299, 0.587, 0.114)
+
+
+def _gray(image):
+    """Grayscale float32 array of a PIL image or of an (h, w, 3) RGB array view (read in place)."""
+    if isinstance(image, np.ndarray):
+        # whole grey levels like PIL's "L": flat areas must have exactly zero variance
+        gray = image @ np.array(LUMA, dtype=np.float32)
+        return np.rint(gray, out=gray)
+    return np.asarray(image.convert("L"), dtype=np.float32)
+
+
+def _downsample(array):
+    """Halves an array by 2x2 block averaging."""
+    h, w = (array.shape[0] // 2) * 2, (array.shape[1] // 2) * 2
+    a = array[:h, :w]
+    return (a[0::2, 0::2] + a[1::2, 0::2] + a[0::2, 1::2] + a[1::2, 1::2]) * 0.25
+
+
+def ncc_map(haystack, template):
+    """
+    Normalized cross-correlation score for every placement of template in
+    haystack (both 2-D float32 arrays). Returns an array of shape
+    (H - h + 1, W - w + 1) with values in [-1, 1].
+    """
+    H, W = haystack.shape
+    h, w = template.shape
+    if h > H or w > W:
+        return np.empty((0, 0), dtype=np.float32)
+    if cv2 is not None:
+        return cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED)
+
+    n = h * w
+    t = template - template.mean()
+    t_norm = np.sqrt((t * t).sum())
+
+    # Correlation through FFT: sum over each window of haystack * t
+    fh, fw = H + h - 1, W + w - 1
+    spectrum = np.fft.rfft2(haystack, (fh, fw)) * np.fft.rfft2(t[::-1, ::-1], (fh, fw))
+    corr = np.fft.irfft2(spectrum, (fh, fw))[h - 1:H, w - 1:W]
+
+    # Window sums from integral images for the haystack normalisation
+    def window_sums(a):
+        s = np.pad(a, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+        return s[h:, w:] - s[:-h, w:] - s[h:, :-w] + s[:-h, :-w]
+
+    sums = window_sums(haystack.astype(np.float64))
+    sq_sums = window_sums(haystack.astype(np.float64) ** 2)
+    variance = np.maximum(sq_sums - sums * sums / n, 0)
+    denominator = np.sqrt(variance) * t_norm
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(denominator > 1e-6, corr / denominator, 0.0)
+    return scores.astype(np.float32)
+
+
+class Template:
+    """A decoded template with lazily built per-scale pyramids."""
+
+    def __init__(self, image):
+        self.image = image.convert("RGB")
+        self.size = self.image.size
+        self._pyramids = {}
+
+    def pyramid(self, scale):
+        """Returns [level0, level1, ...] grayscale arrays for the template scaled by `scale`."""
+        levels = self._pyramids.get(scale)
+        if levels is None:
+            image = self.image
+            if scale != 1.0:
+                size = (max(1, round(self.size[0] * scale)), max(1, round(self.size[1] * scale)))
+                image = image.resize(size, Image.LANCZOS)
+            levels = [_gray(image)]
+            while min(levels[-1].shape) // 2 >= MIN_PYRAMID_SIDE:
+                levels.append(_downsample(levels[-1]))
+            self._pyramids[scale] = levels
+        return levels
+
+
+class TemplateCache:
+    """LRU cache of decoded templates keyed by a hash of their encoded bytes."""
+
+    def __init__(self, max_entries=MAX_TEMPLATES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, encoded):
+        """encoded: base64 string, raw PNG bytes or a PIL image."""
+        if isinstance(encoded, Image.Image):
+            key = hashlib.blake2b(encoded.tobytes(), digest_size=16).hexdigest()
+        else:
+            data = encoded.encode('ascii') if isinstance(encoded, str) else encoded
+            key = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+        if isinstance(encoded, Image.Image):
+            image = encoded
+        else:
+            raw = base64.b64decode(encoded) if isinstance(encoded, str) else encoded
+            image = Image.open(io.BytesIO(raw))
+            image.load()
+        template = Template(image)
+        with self._lock:
+            self._entries[key] = template
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return template
+
+    def stats(self):
+        with self._lock:
+            return {"templates": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_template_cache = TemplateCache()
+
+
+def get_template(encoded):
+    return _template_cache.get(encoded)
+
+
+def _haystack_pyramid(haystack, levels):
+    pyramid = [haystack]
+    while len(pyramid) < levels:
+        pyramid.append(_downsample(pyramid[-1]))
+    return pyramid
+
+
+def _top_candidates(scores, count):
+    if scores.size == 0:
+        return []
+    flat = scores.ravel()
+    count = min(count, flat.size)
+    indices = np.argpartition(-flat, count - 1)[:count]
+    indices = indices[np.argsort(-flat[indices])]
+    width = scores.shape[1]
+    return [(int(i // width), int(i % width), float(flat[i])) for i in indices]
+
+
+def _match_scale(hay_pyramid, template_levels, threshold):
+    """Coarse-to-fine search of one template scale. Returns (score, x, y) or None."""
+    level = min(len(template_levels), len(hay_pyramid)) - 1
+    while level > 0 and (template_levels[level].shape[0] > hay_pyramid[level].shape[0] or
+                         template_levels[level].shape[1] > hay_pyramid[level].shape[1]):
+        level -= 1
+    coarse = ncc_map(hay_pyramid[level], template_levels[level])
+    candidates = _top_candidates(coarse, MAX_CANDIDATES)
+    if level == 0:
+        return max(((s, x, y) for y, x, s in candidates), default=None)
+
+    factor = 2 ** level
+    template = template_levels[0]
+    haystack = hay_pyramid[0]
+    h, w = template.shape
+    best = None
+    for cy, cx, score in candidates:
+        if score < threshold - COARSE_MARGIN and best is not None:
+            break
+        # Refine in a small neighbourhood at full resolution
+        x0 = max(0, cx * factor - factor)
+        y0 = max(0, cy * factor - factor)
+        x1 = min(haystack.shape[1], cx * factor + factor + w)
+        y1 = min(haystack.shape[0], cy * factor + factor + h)
+        fine = ncc_map(haystack[y0:y1, x0:x1], template)
+        for fy, fx, fine_score in _top_candidates(fine, 1):
+            if best is None or fine_score > best[0]:
+                best = (fine_score, x0 + fx, y0 + fy)
+    return best
+
+
+def locate_template(screen, template, threshold=0.9, scales=(1.0,), region=None):
+    """
+    Finds template (a Template) in screen, a PIL image or an RGB NumPy
+    array (e.g. a pooled frame buffer, searched without copying it).
+    region (left, top, width, height) restricts the search. Returns
+    {"left", "top", "width", "height", "x", "y", "score", "scale"} in
+    screen coordinates or None when no placement reaches threshold.
+    """
+    offset_x = offset_y = 0
+    if region:
+        offset_x, offset_y, width, height = region
+        if np is not None and isinstance(screen, np.ndarray):
+            screen = screen[offset_y:offset_y + height, offset_x:offset_x + width]
+        else:
+            screen = screen.crop((offset_x, offset_y, offset_x + width, offset_y + height))
+
+    if np is None:
+        return _locate_with_pyautogui(screen, template, threshold, offset_x, offset_y)
+
+    haystack = _gray(screen)
+    best = None
+    for scale in scales:
+        levels = template.pyramid(scale)
+        hay_pyramid = _haystack_pyramid(haystack, len(levels))
+        found = _match_scale(hay_pyramid, levels, threshold)
+        if found and (best is None or found[0] > best[0]):
+            h, w = levels[0].shape
+            best = (found[0], found[1], found[2], w, h, scale)
+    if best is None or best[0] < threshold:
+        return None
+    score, x, y, w, h, scale = best
+    return {"left": offset_x + x, "top": offset_y + y, "width": w, "height": h,
+            "x": offset_x + x + w // 2, "y": offset_y + y + h // 2,
+            "score": round(float(score), 4), "scale": scale}
+
+
+def _locate_with_pyautogui(screen, template, threshold, offset_x, offset_y):
+    import pyautogui
+    box = pyautogui.locate(template.image, screen, confidence=threshold)
+    if box is None:
+        return None
+    left, top, width, height = (int(v) for v in box)
+    return {"left": offset_x + left, "top": offset_y + top, "width": width, "height": height,
+            "x": offset_x + left + width // 2, "y": offset_y + top + height // 2,
+            "score": threshold, "scale": 1.0}
@@ -0,0 +1,185 @@
+"""
+Spatial index over OCR word boxes.
+
+一次OCR的结果建立成索引后可以回答多次查询：
+- 单词按行分组，行内文字去掉空格后拼接，因此被Tesseract拆开的词组 (如 "文件 传输 助手")
+  也能整体匹配，匹配到的字符再映射回覆盖它们的单词框
+- 匹配方式: exact (区分大小写)、casefold (忽略大小写，默认)、fuzzy (编辑距离)
+- 返回所有命中并按匹配质量和置信度排序，支持 near (离某点最近) 和 region (区域内) 过滤
+- 单词框放在均匀网格里，区域查询只检查相关网格内的行
+"""
+from collections import namedtuple
+
+try:
+    from .tiling import group_lines
+except ImportError:
+    from tiling import group_lines
+
+# --- Configuration ---
+MIN_CONFIDENCE = 30     # words at or below this confidence are not indexed
+GRID_CELL = 128         # pixels per grid cell
+MATCH_MODES = ('exact', 'casefold', 'fuzzy')
+
+Word = namedtuple('Word', 'text conf left top width height line')
+
+
+def _fuzzy_spans(pattern, text, max_distance):
+    """
+    Approximate substring search (Sellers' algorithm): returns (distance,
+    start, end) for every end position where some substring of text is
+    within max_distance edits of pattern.
+    """
+    m = len(pattern)
+    prev = list(range(m + 1))
+    prev_start = [0] * (m + 1)
+    spans = []
+    for j, ch in enumerate(text, 1):
+        cur = [0] * (m + 1)
+        cur_start = [j] * (m + 1)
+        for i in range(1, m + 1):
+            best, start = prev[i - 1] + (pattern[i - 1] != ch), prev_start[i - 1]
+            if cur[i - 1] + 1 < best:
+                best, start = cur[i - 1] + 1, cur_start[i - 1]
+            if prev[i] + 1 < best:
+                best, start = prev[i] + 1, prev_start[i]
+            cur[i], cur_start[i] = best, start
+        if cur[m] <= max_distance:
+            spans.append((cur[m], cur_start[m], j))
+        prev, prev_start = cur, cur_start
+    return spans
+
+
+def _non_overlapping(spans):
+    """Keeps the best (lowest distance, longest) span among overlapping ones."""
+    chosen = []
+    for span in sorted(spans, key=lambda s: (s[0], -(s[2] - s[1]))):
+        if all(span[2] <= c[1] or span[1] >= c[2] for c in chosen):
+            chosen.append(span)
+    return chosen
+
+
+class TextIndex:
+    """Words, lines and a uniform grid built from a pytesseract image_to_data dict."""
+
+    def __init__(self, ocr_data, min_confidence=MIN_CONFIDENCE, cell_size=GRID_CELL):
+        self.cell_size = cell_size
+        self.words = []
+        self.lines = []     # [(line_text, [word index per character])]
+        self._grid = {}
+
+        keep = {'text': [], 'conf': [], 'left': [], 'top': [], 'width': [], 'height': []}
+        for i, text in enumerate(ocr_data.get('text', [])):
+            try:
+                conf = float(ocr_data['conf'][i])
+            except (TypeError, ValueError):
+                continue
+            if not str(text).strip() or conf <= min_confidence:
+                continue
+            for key in keep:
+                keep[key].append(ocr_data[key][i] if key != 'conf' else conf)
+
+        for line_no, indices in enumerate(group_lines(keep)):
+            chars = []
+            owners = []
+            for i in indices:
+                word_index = len(self.words)
+                text = ''.join(str(keep['text'][i]).split())
+                self.words.append(Word(text, keep['conf'][i], int(keep['left'][i]), int(keep['top'][i]),
+                                       int(keep['width'][i]), int(keep['height'][i]), line_no))
+                chars.append(text)
+                owners.extend([word_index] * len(text))
+                self._add_to_grid(word_index)
+            self.lines.append((''.join(chars), owners))
+
+    def _cells(self, left, top, width, height):
+        size = self.cell_size
+        for cx in range(left // size, (left + max(width, 1) - 1) // size + 1):
+            for cy in range(top // size, (top + max(height, 1) - 1) // size + 1):
+                yield (cx, cy)
+
+    def _add_to_grid(self, word_index):
+        w = self.words[word_index]
+        for cell in self._cells(w.left, w.top, w.width, w.height):
+            self._grid.setdefault(cell, []).append(word_index)
+
+    def words_in(self, region):
+        """Returns indices of words whose centre lies inside region (left, top, width, height)."""
+        left, top, width, height = region
+        found = set()
+        for cell in self._cells(left, top, width, height):
+            for i in self._grid.get(cell, ()):
+                w = self.words[i]
+                cx, cy = w.left + w.width // 2, w.top + w.height // 2
+                if left <= cx < left + width and top <= cy < top + height:
+                    found.add(i)
+        return sorted(found)
+
+    def _hit(self, word_indices, distance, query):
+        words = [self.words[i] for i in sorted(set(word_indices))]
+        left = min(w.left for w in words)
+        top = min(w.top for w in words)
+        right = max(w.left + w.width for w in words)
+        bottom = max(w.top + w.height for w in words)
+        confidence = min(w.conf for w in words)
+        return {
+            "x": left + (right - left) // 2,
+            "y": top + (bottom - top) // 2,
+            "confidence": confidence,
+            "text": ''.join(w.text for w in words),
+            "box": [left, top, right - left, bottom - top],
+            "distance": distance,
+            "score": round(confidence * (1 - distance / max(1, len(query))), 2),
+        }
+
+    def search(self, query, mode='casefold', max_distance=None, near=None, region=None, limit=None):
+        """
+        Returns all matches of query, best first. Each hit is a dict with the
+        centre "x"/"y", "confidence", matched "text", "box" [l, t, w, h],
+        edit "distance" and ranking "score".
+
+        mode: 'exact', 'casefold' or 'fuzzy' (max_distance edits, default a
+        quarter of the query length). near=(x, y) orders hits by distance to
+        that point; region=(left, top, width, height) keeps hits centred in it.
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode '{mode}'. Available: {', '.join(MATCH_MODES)}")
+        needle = ''.join(str(query).split())
+        if not needle:
+            return []
+        if mode != 'exact':
+            needle = needle.casefold()
+        if mode == 'fuzzy' and max_distance is None:
+            max_distance = max(1, len(needle) // 4)
+
+        candidate_lines = range(len(self.lines))
+        if region:
+            candidate_lines = sorted({self.words[i].line for i in self.words_in(region)})
+
+        hits = []
+        for line_no in candidate_lines:
+            line_text, owners = self.lines[line_no]
+            haystack = line_text if mode == 'exact' else line_text.casefold()
+            if len(haystack) != len(owners):
+                # casefold can change the length (e.g. "ß" -> "ss"); fall back to lower()
+                haystack = line_text.lower()
+            if mode == 'fuzzy':
+                spans = _non_overlapping(_fuzzy_spans(needle, haystack, max_distance))
+            else:
+                spans = []
+                start = haystack.find(needle)
+                while start != -1:
+                    spans.append((0, start, start + len(needle)))
+                    start = haystack.find(needle, start + len(needle))
+            for distance, start, end in spans:
+                if end > start:
+                    hits.append(self._hit(owners[start:end], distance, needle))
+
+        if region:
+            left, top, width, height = region
+            hits = [h for h in hits if left <= h["x"] < left + width and top <= h["y"] < top + height]
+        if near:
+            px, py = near
+            hits.sort(key=lambda h: ((h["x"] - px) ** 2 + (h["y"] - py) ** 2, h["distance"]))
+        else:
+            hits.sort(key=lambda h: (h["distance"], -h["confidence"]))
+        return hits[:limit] if limit else hits
@@ -0,0 +1,256 @@
+"""
+Tile helpers for region-wise OCR.
+
+把画面切成带重叠的小块分别识别，再把各块的单词框映射回屏幕坐标并合并。
+重叠区域保证被块边界截断的单词在相邻块中是完整的。
+"""
+try:
+    from .lazy_import import lazy_module
+except ImportError:
+    from lazy_import import lazy_module
+
+ImageChops = lazy_module("PIL.ImageChops")
+
+# --- Configuration ---
+DEFAULT_TILE_SIZE = 320     # pixels, square tiles
+DEFAULT_OVERLAP = 48        # pixels shared between neighbouring tiles
+EDGE_MARGIN = 2             # words this close to an inner tile edge are treated as cut
+
+OCR_DATA_KEYS = ('text', 'conf', 'left', 'top', 'width', 'height')
+LAYOUT_KEYS = ('block_num', 'line_num')
+
+
+def make_tiles(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """
+    Splits a width x height frame into overlapping tiles.
+    Returns a list of (left, top, right, bottom) boxes covering the frame.
+    """
+    step = max(1, tile_size - overlap)
+
+    def starts(total):
+        if total <= tile_size:
+            return [0]
+        positions = list(range(0, total - tile_size, step))
+        positions.append(total - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def make_bands(width, height, count, overlap=DEFAULT_OVERLAP):
+    """
+    Splits a frame into `count` full-width horizontal bands that overlap by
+    `overlap` pixels. Text runs horizontally, so bands cut far fewer words
+    than square tiles. Returns (left, top, right, bottom) boxes.
+    """
+    count = max(1, min(int(count), height // max(1, overlap * 2) or 1))
+    band_height = -(-height // count)  # ceil
+    bands = []
+    for i in range(count):
+        top = max(0, i * band_height - overlap // 2)
+        bottom = min(height, (i + 1) * band_height + overlap // 2)
+        bands.append((0, top, width, bottom))
+    return bands
+
+
+def group_lines(ocr_data):
+    """
+    Groups the words of an OCR data dict into text lines by vertical overlap.
+    Returns a list of lines, each a list of word indices in left-to-right order.
+    """
+    order = sorted(
+        (i for i, text in enumerate(ocr_data['text']) if str(text).strip()),
+        key=lambda i: (ocr_data['top'][i], ocr_data['left'][i]))
+    lines = []  # [top, bottom, [indices]]
+    for i in order:
+        top = ocr_data['top'][i]
+        bottom = top + ocr_data['height'][i]
+        for line in lines:
+            overlap = min(bottom, line[1]) - max(top, line[0])
+            if overlap > 0.5 * min(bottom - top, line[1] - line[0]):
+                line[0], line[1] = min(top, line[0]), max(bottom, line[1])
+                line[2].append(i)
+                break
+        else:
+            lines.append([top, bottom, [i]])
+    lines.sort(key=lambda line: line[0])
+    return [sorted(line[2], key=lambda i: ocr_data['left'][i]) for line in lines]
+
+
+def changed_tiles(previous, current, tiles):
+    """Returns the tiles whose pixels differ between two equally sized frames."""
+    if previous is None or previous.size != current.size:
+        return list(tiles)
+    changed = []
+    for box in tiles:
+        if ImageChops.difference(previous.crop(box), current.crop(box)).getbbox():
+            changed.append(box)
+    return changed
+
+
+def _iou(a, b):
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+    iw = min(ax2, bx2) - max(ax1, bx1)
+    ih = min(ay2, by2) - max(ay1, by1)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - inter
+    return inter / union if union else 0.0
+
+
+def _same_line(a, b):
+    overlap = min(a[3], b[3]) - max(a[1], b[1])
+    return overlap > 0.5 * min(a[3] - a[1], b[3] - b[1])
+
+
+def _join_text(left_text, right_text, left_rect, right_rect):
+    """
+    Joins the texts of two fragments of one word; both read the strip where
+    they overlap. Prefers a suffix/prefix match close to the number of
+    characters the shared pixels should hold, else drops that many.
+    """
+    share = max(0, left_rect[2] - right_rect[0]) / max(1, right_rect[2] - right_rect[0])
+    expected = round(len(right_text) * share)
+    matches = [k for k in range(min(len(left_text), len(right_text)) + 1) if left_text.endswith(right_text[:k])]
+    shared = min(matches, key=lambda k: abs(k - expected))
+    if abs(shared - expected) > 1:
+        shared = expected    # OCR read the shared strip differently in the two tiles
+    return left_text + right_text[shared:]
+
+
+def _stitch_fragments(words):
+    """
+    A word wider than the overlap is cut in both tiles (at the right edge of
+    one and the left edge of the next), so no tile saw it whole. Joins such
+    pairs of fragments on the same line into one word, repeatedly for words
+    spanning several tiles.
+    """
+    while True:
+        pair = next(((a, b) for a in words if 'right' in a[3]
+                     for b in words if 'left' in b[3] and b[4] != a[4] and _same_line(a[2], b[2])
+                     and a[2][0] < b[2][0] <= a[2][2] + EDGE_MARGIN and b[2][2] > a[2][2]), None)
+        if pair is None:
+            return words
+        a, b = pair
+        (ax1, ay1, ax2, ay2), (bx1, by1, bx2, by2) = a[2], b[2]
+        words = [w for w in words if w is not a and w is not b]
+        words.append((_join_text(a[0], b[0], a[2], b[2]), min(a[1], b[1]),
+                      (ax1, min(ay1, by1), bx2, max(ay2, by2)), (a[3] - {'right'}) | (b[3] - {'left'}), b[4], a[5]))
+
+
+def merge_tile_results(tile_results, frame_size):
+    """
+    Merges per-tile OCR word boxes into one screen-space OCR data dict.
+
+    tile_results: iterable of (box, ocr_data) where ocr_data is a
+    pytesseract image_to_data dict in tile-local coordinates.
+    Words cut by an inner tile edge are only kept when no neighbouring tile
+    saw them whole, fragments of a word wider than the overlap are joined,
+    and duplicates from overlapping tiles are removed, keeping the highest
+    confidence copy.
+    When every tile has block_num/line_num they are kept, renumbered so that
+    blocks and lines from different tiles stay distinct.
+    """
+    frame_w, frame_h = frame_size
+    words = []
+    has_layout = True
+    for tile, (box, data) in enumerate(tile_results):
+        left, top, right, bottom = box
+        tile_layout = all(key in data for key in LAYOUT_KEYS)
+        has_layout = has_layout and tile_layout
+        for i, text in enumerate(data.get('text', [])):
+            if not str(text).strip():
+                continue
+            try:
+                conf = float(data['conf'][i])
+            except (TypeError, ValueError):
+                conf = -1.0
+            x1 = left + int(data['left'][i])
+            y1 = top + int(data['top'][i])
+            x2 = x1 + int(data['width'][i])
+            y2 = y1 + int(data['height'][i])
+            # Inner edges only: the frame border never cuts a word
+            cut = frozenset(edge for edge, is_cut in (
+                ('left', left > 0 and x1 - left <= EDGE_MARGIN),
+                ('right', right < frame_w and right - x2 <= EDGE_MARGIN),
+                ('top', top > 0 and y1 - top <= EDGE_MARGIN),
+                ('bottom', bottom < frame_h and bottom - y2 <= EDGE_MARGIN)) if is_cut)
+            layout = (tile, data['block_num'][i], data['line_num'][i]) if tile_layout else None
+            words.append((str(text), conf, (x1, y1, x2, y2), cut, box, layout))
+    words = _stitch_fragments(words)
+
+    # Whole words first (highest confidence first); cut fragments only fill gaps
+    words.sort(key=lambda w: (bool(w[3]), -w[1]))
+    kept = []
+    for text, conf, rect, cut, _, layout in words:
+        if cut:
+            if any(_iou(rect, k[2]) > 0 for k in kept):
+                continue
+        elif any(text == k[0] and _iou(rect, k[2]) > 0.5 for k in kept):
+            continue
+        kept.append((text, conf, rect, layout))
+
+    # Reading order: top-to-bottom, then left-to-right
+    kept.sort(key=lambda w: (w[2][1], w[2][0]))
+    merged = {key: [] for key in OCR_DATA_KEYS + (LAYOUT_KEYS if has_layout else ())}
+    blocks, lines = {}, {}
+    for text, conf, (x1, y1, x2, y2), layout in kept:
+        merged['text'].append(text)
+        merged['conf'].append(conf)
+        merged['left'].append(x1)
+        merged['top'].append(y1)
+        merged['width'].append(x2 - x1)
+        merged['height'].append(y2 - y1)
+        if has_layout:
+            # (tile, block) and (tile, block, line) numbered in reading order of their first word
+            merged['block_num'].append(blocks.setdefault(layout[:2], len(blocks) + 1))
+            merged['line_num'].append(lines.setdefault(layout, len(lines) + 1))
+    return merged
+
+
+class IncrementalOCR:
+    """
+    Keeps per-tile OCR results between polls and re-runs OCR only on tiles
+    whose pixels changed since the previous frame.
+
+    ocr_func(image) must return a pytesseract image_to_data dict. The
+    tracker is the store for tile results: ocr_func should not put them in
+    a shared cache, where a 4K frame's ~100 tiles would evict whole frames.
+    """
+
+    def __init__(self, ocr_func, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+        self.ocr_func = ocr_func
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self._previous = None
+        self._tiles = []
+        self._tile_index = {}
+        self.last_changed = 0
+
+    def update(self, frame):
+        """Feeds a new frame and returns the merged screen-space OCR data."""
+        if self._previous is None or self._previous.size != frame.size:
+            self._tiles = make_tiles(frame.size[0], frame.size[1], self.tile_size, self.overlap)
+            self._tile_index = {}
+            dirty = list(self._tiles)
+        else:
+            dirty = changed_tiles(self._previous, frame, self._tiles)
+
+        for box in dirty:
+            self._tile_index[box] = self.ocr_func(frame.crop(box))
+        self.last_changed = len(dirty)
+        self._previous = frame
+
+        return merge_tile_results(
+            ((box, self._tile_index[box]) for box in self._tiles), frame.size)
+
+    def reset(self):
+        self._previous = None
+        self._tiles = []
+        self._tile_index = {}
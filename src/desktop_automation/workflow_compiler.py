@@ -0,0 +1,262 @@
+"""
+Workflow compiler: parse and validate workflows once, run them many times.
+
+cli._execute_actions 以前每一步都要 getattr 查找函数、检查 __code__.co_varnames，
+并直接修改加载出来的字典来替换 {{param}} (同一个工作流第二次运行时占位符已经被替换掉了)；
+execute_workflow 每次启动还要重新读取清单和工作流JSON。这里改为先编译成不可变的执行计划：
+- 每一步的函数、是否接受 log_file_path、*args 参数都在编译时解析，参数用函数签名校验
+- {{param}} 占位符预先记录为替换槽位，运行时只填值，不修改计划本身
+- 编译结果按源文件 (清单、工作流JSON、core.py) 的 mtime 和大小缓存在磁盘 (纯JSON，不用pickle) 和内存中，
+  重复运行以及 send_wechat.py 这样的参数化复用都会跳过解析和校验
+"""
+import hashlib
+import inspect
+import json
+import os
+import sys
+import threading
+from collections import namedtuple
+
+try:
+    from . import core as da
+except ImportError:
+    import core as da
+
+# --- Configuration ---
+COMPILER_VERSION = 2
+WORKFLOW_CACHE_DIR = os.path.join(da.LOGS_DIR, "workflow_cache")
+
+# One validated step. kwargs/slots are tuples of pairs so the plan can't be mutated.
+CompiledStep = namedtuple('CompiledStep', 'index action func args kwargs slots varargs accepts_log')
+
+
+def _slot_name(value):
+    if isinstance(value, str) and value.startswith("{{") and value.endswith("}}"):
+        return value[2:-2]
+    return None
+
+
+class CompiledWorkflow(namedtuple('CompiledWorkflow', 'name source steps regions parameters')):
+    """
+    An immutable, validated plan. parameters is the frozenset of {{param}}
+    names the steps need; run() fills them in without touching the plan.
+    """
+    __slots__ = ()
+
+    def run(self, log_file_path=None, workflow_params=None, memo=None, run_id=None):
+        """
+        Executes every step in order. Raises ValueError when a step fails.
+        memo (a step_memo.StepMemo) skips steps whose result is already on
+        screen and records the fingerprints of a successful run; run_id ties
+        retries together so they can pass over input steps already done.
+        """
+        workflow_params = workflow_params or {}
+        missing = self.parameters - set(workflow_params)
+        if missing:
+            raise ValueError(f"Workflow '{self.name}' needs parameters: {', '.join(sorted(missing))}")
+        with da.regions_scope(dict(self.regions)):
+            memo_run = memo.begin(self, workflow_params, log_file_path, run_id) if memo is not None else None
+            for step in self.steps:
+                if memo_run is not None and memo_run.should_skip(step):
+                    continue
+                _run_step(step, log_file_path, workflow_params)
+                if memo_run is not None:
+                    memo_run.step_ran(step)
+            if memo_run is not None:
+                memo_run.finish()
+
+
+def _step_arguments(step, workflow_params, log_file_path=None):
+    """Returns the (args, kwargs) a step is called with for these parameters."""
+    kwargs = dict(step.kwargs)
+    for key, param_name in step.slots:
+        kwargs[key] = workflow_params[param_name]
+    args = step.args
+    if step.varargs:
+        value = kwargs.pop(step.varargs, ())
+        args = tuple(value) if isinstance(value, (list, tuple)) else (value,)
+    if step.accepts_log:
+        kwargs['log_file_path'] = log_file_path
+    return args, kwargs
+
+
+def _run_step(step, log_file_path, workflow_params):
+    args, kwargs = _step_arguments(step, workflow_params, log_file_path)
+    result = step.func(*args, **kwargs)
+
+    # Check for smart_click_text failures in workflows
+    if step.action == 'smart_click_text' and result:
+        print(f"Workflow step [{step.action}]: {result}")
+        if "not found" in result.lower() or "failed" in result.lower() or "error" in result.lower():
+            print(f"Workflow failed at step: {step.action}", file=sys.stderr)
+            raise ValueError(f"Smart click action failed: {result}")
+    elif result:
+        print(f"Workflow step [{step.action}]: {result}")
+
+
+def _compile_step(index, item):
+    """Resolves and validates one {"action", "params"} item into plain (JSON serialisable) step data."""
+    if not isinstance(item, dict) or not item.get("action"):
+        raise ValueError(f"Step {index}: expected an object with an \"action\", got {item!r}")
+    action = item["action"]
+    func = getattr(da, action, None)
+    if func is None or action.startswith('_') or not callable(func):
+        raise ValueError(f"Step {index}: action '{action}' not found in desktop_automation module.")
+    params = dict(item.get("params") or {})
+
+    signature = inspect.signature(func)
+    varargs = next((p.name for p in signature.parameters.values()
+                    if p.kind is inspect.Parameter.VAR_POSITIONAL), None)
+    accepts_log = 'log_file_path' in signature.parameters
+    params.pop('log_file_path', None)
+
+    slots = tuple((key, _slot_name(value)) for key, value in params.items() if _slot_name(value))
+    args = ()
+    if varargs and varargs in params and not _slot_name(params[varargs]):
+        value = params.pop(varargs)
+        args = tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+    # Validate against the signature; slot values are checked for presence only
+    try:
+        probe = {k: v for k, v in params.items() if k != varargs}
+        signature.bind(*args, **probe)
+    except TypeError as e:
+        raise ValueError(f"Step {index} ({action}): {e}") from None
+
+    kwargs = tuple((k, v) for k, v in params.items() if not _slot_name(v))
+    return (index, action, args, kwargs, slots, varargs if varargs in dict(slots) else None, accepts_log)
+
+
+def _build(name, source, steps_data, regions):
+    # steps data read back from the JSON cache has lists where the compiler made tuples
+    steps = tuple(CompiledStep(index, action, getattr(da, action), tuple(args), tuple(tuple(p) for p in kwargs),
+                               tuple(tuple(p) for p in slots), varargs, accepts_log)
+                  for index, action, args, kwargs, slots, varargs, accepts_log in steps_data)
+    parameters = frozenset(param for step in steps for _, param in step.slots)
+    return CompiledWorkflow(name, source, steps, tuple(sorted(regions.items())), parameters)
+
+
+def _compile_data(actions):
+    regions = {}
+    if isinstance(actions, dict):
+        regions = dict(actions.get("regions") or {})
+        actions = actions.get("actions", [])
+    if not isinstance(actions, list):
+        raise ValueError("A workflow must be a list of steps or {\"regions\": ..., \"actions\": [...]}")
+    return [_compile_step(i, item) for i, item in enumerate(actions, 1)], regions
+
+
+def compile_workflow(actions, name="<inline>"):
+    """Compiles an already loaded workflow (list of steps or {"regions", "actions"}) without caching."""
+    steps_data, regions = _compile_data(actions)
+    return _build(name, None, steps_data, regions)
+
+
+# --- Plan Cache ---
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def _cache_file(cache_dir, key):
+    digest = hashlib.blake2b(json.dumps(key).encode('utf-8'), digest_size=12).hexdigest()
+    return os.path.join(cache_dir, f"plan_{digest}.json")
+
+
+def _known_actions(steps_data):
+    """True when every cached step names a public, callable action (the cache file is not trusted)."""
+    return all(isinstance(step[1], str) and not step[1].startswith('_') and callable(getattr(da, step[1], None))
+               for step in steps_data)
+
+
+def _cached_plan(key, build, cache_dir):
+    """
+    Returns the compiled plan for key. build() -> (name, source, dependency
+    paths, steps data, regions). A cached plan is reused while none of its
+    dependencies (and core.py) changed.
+    """
+    with _plans_lock:
+        entry = _plans.get(json.dumps(key))
+    if entry is not None and all(_stat(p) == s for p, s in entry[0]):
+        return entry[1]
+
+    data = None
+    path = _cache_file(cache_dir, key) if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != COMPILER_VERSION or not _known_actions(data["steps"]) or \
+                    any(_stat(p) != tuple(s) for p, s in data["dependencies"]):
+                data = None
+        except Exception:
+            data = None
+
+    if data is None:
+        name, source, dependencies, steps_data, regions = build()
+        dependencies = list(dependencies) + [da.__file__]
+        data = {"version": COMPILER_VERSION, "name": name, "source": source, "steps": steps_data,
+                "regions": regions, "dependencies": [(p, _stat(p)) for p in dependencies]}
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(path + '.tmp', path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Could not cache compiled workflow '{name}': {e}", file=sys.stderr)
+
+    plan = _build(data["name"], data["source"], data["steps"], data["regions"])
+    with _plans_lock:
+        _plans[json.dumps(key)] = ([(p, tuple(s)) for p, s in data["dependencies"]], plan)
+    return plan
+
+
+def load_workflow(workflow_file, cache_dir=WORKFLOW_CACHE_DIR):
+    """Compiles a workflow JSON file, reusing the cached plan while the file is unchanged."""
+    workflow_file = os.path.abspath(workflow_file)
+
+    def build():
+        with open(workflow_file, 'r', encoding='utf-8') as f:
+            steps_data, regions = _compile_data(json.load(f))
+        name = os.path.splitext(os.path.basename(workflow_file))[0]
+        return name, workflow_file, [workflow_file], steps_data, regions
+
+    return _cached_plan(["file", workflow_file], build, cache_dir)
+
+
+def load_named_workflow(name, manifest_file, workflows_dir, cache_dir=WORKFLOW_CACHE_DIR):
+    """
+    Compiles the workflow registered as name in the manifest. On a cache hit
+    neither the manifest nor the workflow JSON is parsed again.
+    """
+    manifest_file = os.path.abspath(manifest_file)
+
+    def build():
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        workflow_meta = next((w for w in manifest['workflows'] if w['name'] == name), None)
+        if not workflow_meta:
+            raise FileNotFoundError(f"Workflow '{name}' not found in manifest.")
+        workflow_file = os.path.abspath(os.path.join(workflows_dir, workflow_meta['file']))
+        with open(workflow_file, 'r', encoding='utf-8') as f:
+            steps_data, regions = _compile_data(json.load(f))
+        return name, workflow_file, [manifest_file, workflow_file], steps_data, regions
+
+    return _cached_plan(["named", manifest_file, name], build, cache_dir)
+
+
+def clear_workflow_cache(cache_dir=WORKFLOW_CACHE_DIR):
+    """Forgets compiled plans in memory and on disk."""
+    with _plans_lock:
+        _plans.clear()
+    if cache_dir and os.path.isdir(cache_dir):
+        for filename in os.listdir(cache_dir):
+            # .pickle: plans written by older versions, never loaded
+            if filename.startswith("plan_") and filename.endswith((".json", ".pickle")):
+                os.remove(os.path.join(cache_dir, filename))
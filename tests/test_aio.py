@@ -0,0 +1,175 @@
+"""
+测试异步API：wait_any/wait_all 条件等待、超时与取消、异步 smart_click_text (回放帧，无需显示器)
+"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+import time
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image, ImageDraw
+
+from desktop_automation import aio, core, frame_buffers
+from desktop_automation.frame_buffers import FramePool
+from desktop_automation.sessions import AutomationSession
+from desktop_automation.screen_source import ReplaySource
+from desktop_automation.input_engine import RecordingBackend
+from desktop_automation.task_logger import flush_task_log
+
+SENT = (40, 30, 60, 16)         # where "已发送" shows up
+FAILED = (120, 80, 60, 16)      # where "发送失败" shows up
+# frame number -> words on screen
+SCREENS = {0: {}, 1: {"已发送": SENT}, 2: {"已发送": SENT, "发送失败": FAILED}}
+
+
+def _frame(path, boxes):
+    image = Image.new("RGB", (200, 120), "white")
+    for left, top, width, height in boxes:
+        ImageDraw.Draw(image).rectangle((left, top, left + width, top + height), fill="black")
+    image.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def desktop(tmp_path, monkeypatch):
+    frames = [_frame(tmp_path / f"{n}.png", SCREENS[n].values()) for n in sorted(SCREENS)]
+    source = ReplaySource(frames, advance="manual")
+    session = AutomationSession("aio", screen_source=source, input_backend=RecordingBackend())
+    ocr_calls = []
+
+    def fake_index(image, log_file_path=None):
+        ocr_calls.append(source.position)
+        words = SCREENS[source.position]
+        return core.TextIndex({'text': list(words), 'conf': [90] * len(words),
+                               'left': [b[0] for b in words.values()], 'top': [b[1] for b in words.values()],
+                               'width': [b[2] for b in words.values()], 'height': [b[3] for b in words.values()]})
+
+    monkeypatch.setattr(core, '_text_index', fake_index)
+    monkeypatch.setattr(core._location_cache, 'enabled', False)
+    monkeypatch.setattr(frame_buffers, '_pool', FramePool(max_bytes=2 ** 22))
+    return {"session": session, "source": source, "ocr_calls": ocr_calls, "log": str(tmp_path / "log.jsonl")}
+
+
+def _run(desktop, coroutine_function, *args, **kwargs):
+    return desktop["session"].run(asyncio.run, coroutine_function(*args, **kwargs))
+
+
+def _later(desktop, delay, frame):
+    asyncio.get_running_loop().call_later(delay, desktop["source"].seek, frame)
+
+
+def _log(desktop):
+    flush_task_log(desktop["log"])
+    with open(desktop["log"], encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestWaitAny:
+    """测试多个条件的等待"""
+
+    def test_first_condition_to_hold_wins(self, desktop):
+        async def main():
+            _later(desktop, 0.1, 1)
+            return await aio.wait_any(aio.text_appears("发送失败"), aio.text_appears("已发送"), timeout=5)
+
+        index, hit = _run(desktop, main)
+        assert index == 1 and hit["x"] == 70 and hit["y"] == 38
+
+    def test_timeout_shares_one_ocr_per_frame(self, desktop):
+        async def main():
+            start = time.monotonic()
+            found = await aio.wait_any(aio.text_appears("已发送"), aio.text_appears("发送失败"), timeout=0.3,
+                                       log_file_path=desktop["log"])
+            return found, time.monotonic() - start
+
+        found, elapsed = _run(desktop, main)
+        assert found is None and elapsed < 1
+        # both conditions were checked against one capture (core's frame cache makes that a single OCR);
+        # the unchanged screen was not read again
+        assert desktop["ocr_calls"] == [0, 0]
+        assert _log(desktop)[-1]["status"] == "timeout"
+
+    def test_text_disappears_and_plain_awaitables(self, desktop):
+        desktop["source"].seek(1)
+
+        async def main():
+            first = await aio.wait_any(aio.text_disappears("已发送"), aio.wait(0.05), timeout=5)
+            _later(desktop, 0.05, 0)
+            second = await aio.text_disappears("已发送").until(5)
+            return first, second
+
+        first, second = _run(desktop, main)
+        assert first == (1, "Waited for 0.05 seconds.")
+        assert second is True
+
+    def test_wait_all(self, desktop):
+        async def main():
+            _later(desktop, 0.05, 1)
+            _later(desktop, 0.15, 2)
+            return await aio.wait_all(aio.text_appears("已发送"), aio.text_appears("发送失败", region=[0, 0, 200, 120]),
+                                      timeout=5)
+
+        sent, failed = _run(desktop, main)
+        assert (sent["x"], sent["y"]) == (70, 38)
+        assert (failed["x"], failed["y"]) == (150, 88)
+
+
+class TestCancellation:
+    """测试取消与超时后的清理"""
+
+    def test_cancelled_wait_stops_promptly(self, desktop):
+        async def main():
+            task = asyncio.ensure_future(aio.wait_for_text_appear("不存在", timeout=30))
+            await asyncio.sleep(0.1)
+            start = time.monotonic()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return time.monotonic() - start
+
+        assert _run(desktop, main) < 0.5
+        time.sleep(0.1)     # a probe that was already running finishes in the background
+        assert frame_buffers.get_frame_pool().in_use_bytes == 0
+
+    def test_wait_for_text_appear_logs(self, desktop):
+        async def main():
+            _later(desktop, 0.05, 1)
+            appeared = await aio.wait_for_text_appear("已发送", timeout=5, log_file_path=desktop["log"])
+            missing = await aio.wait_for_text_appear("发送失败", timeout=0.1, log_file_path=desktop["log"])
+            return appeared, missing
+
+        assert _run(desktop, main) == (True, False)
+        assert [entry["status"] for entry in _log(desktop)] == ["success", "timeout"]
+
+
+class TestSmartClickText:
+    """测试异步点击：识别在线程池中执行，等待期间不阻塞事件循环"""
+
+    def test_click_after_text_appears(self, desktop):
+        ticks = []
+
+        async def heartbeat():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            beat = asyncio.ensure_future(heartbeat())
+            _later(desktop, 0.2, 1)
+            result = await aio.smart_click_text("已发送", max_retries=2, log_file_path=desktop["log"])
+            beat.cancel()
+            return result
+
+        assert _run(desktop, main) == "Successfully clicked '已发送' at (70, 38) on attempt 2"
+        events = desktop["session"].input_engine.backend.events
+        assert [(e[1], e[2]) for e in events if e[0] == "move"] == [(70, 38)]
+        assert len(ticks) > 10      # the loop kept running while the text was awaited
+        assert _log(desktop)[-1]["status"] == "success"
+
+    def test_not_found(self, desktop):
+        result = _run(desktop, aio.smart_click_text, "发送失败", max_retries=1)
+        assert result == "Failed to find text '发送失败' after 1 attempts"
@@ -0,0 +1,117 @@
+"""
+测试批量执行工作流：参数文件、重试、检查点续跑、报告
+"""
+import pytest
+import sys
+import os
+import json
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation import core
+from desktop_automation.workflow_compiler import compile_workflow
+from desktop_automation.batch_runner import BatchRunner, load_param_sets, read_checkpoint, run_workflow_batch
+
+
+WORKFLOW = [
+    {"action": "paste_text", "params": {"text": "{{contact_name}}"}},
+    {"action": "paste_text", "params": {"text": "{{message_content}}"}},
+]
+
+
+@pytest.fixture
+def pasted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(core, 'paste_text', lambda text, log_file_path=None: calls.append(text))
+    return calls
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("contact_name,message_content\n")
+        for name, message in rows:
+            f.write(f"{name},{message}\n")
+    return str(path)
+
+
+class TestParamSets:
+    """测试参数文件读取"""
+
+    def test_csv_and_jsonl(self, tmp_path):
+        csv_file = _write_csv(tmp_path / "a.csv", [("张三", "你好")])
+        jsonl_file = tmp_path / "a.jsonl"
+        jsonl_file.write_text('{"contact_name": "李四", "message_content": "hi"}\n\n', encoding='utf-8')
+        assert load_param_sets(csv_file) == [{"contact_name": "张三", "message_content": "你好"}]
+        assert load_param_sets(str(jsonl_file)) == [{"contact_name": "李四", "message_content": "hi"}]
+
+    def test_unknown_extension(self, tmp_path):
+        with pytest.raises(ValueError):
+            load_param_sets(str(tmp_path / "a.txt"))
+
+
+class TestBatchRunner:
+    """测试调度：顺序执行、重试、校验、续跑"""
+
+    def test_runs_every_row_and_reports(self, tmp_path, pasted):
+        batch = _write_csv(tmp_path / "contacts.csv", [("张三", "早"), ("李四", "晚")])
+        report = run_workflow_batch(compile_workflow(WORKFLOW), batch, report_file=str(tmp_path / "report.json"))
+        assert pasted == ["张三", "早", "李四", "晚"]
+        assert (report["total"], report["succeeded"], report["failed"]) == (2, 2, 0)
+        assert json.loads((tmp_path / "report.json").read_text(encoding='utf-8'))["succeeded"] == 2
+
+    def test_resume_skips_finished_jobs(self, tmp_path, pasted):
+        batch = _write_csv(tmp_path / "contacts.csv", [("张三", "早"), ("李四", "晚")])
+        run_workflow_batch(compile_workflow(WORKFLOW), batch)
+        assert len(read_checkpoint(batch + ".checkpoint.jsonl")) == 2
+        report = run_workflow_batch(compile_workflow(WORKFLOW), batch)
+        assert report["skipped"] == 2 and report["jobs"] == []
+        assert len(pasted) == 4
+
+    def test_fresh_run_ignores_the_checkpoint(self, tmp_path, pasted, capsys):
+        batch = _write_csv(tmp_path / "contacts.csv", [("张三", "早"), ("李四", "晚")])
+        run_workflow_batch(compile_workflow(WORKFLOW), batch)
+        run_workflow_batch(compile_workflow(WORKFLOW), batch)
+        assert "Skipping 2 of 2 job(s)" in capsys.readouterr().out
+        report = run_workflow_batch(compile_workflow(WORKFLOW), batch, fresh=True)
+        assert (report["skipped"], report["succeeded"]) == (0, 2)
+        assert len(pasted) == 8
+
+    def test_checkpoint_follows_row_content(self, tmp_path, pasted):
+        batch = _write_csv(tmp_path / "contacts.csv", [("张三", "早"), ("李四", "晚"), ("李四", "晚")])
+        run_workflow_batch(compile_workflow(WORKFLOW[1:]), batch)
+        # a row inserted at the top and one more identical row: only those two are new
+        _write_csv(tmp_path / "contacts.csv", [("王五", "午"), ("张三", "早"), ("李四", "晚"), ("李四", "晚"),
+                                               ("李四", "晚")])
+        report = run_workflow_batch(compile_workflow(WORKFLOW[1:]), batch)
+        assert report["skipped"] == 3
+        assert [job["index"] for job in report["jobs"]] == [1, 5]
+
+    def test_failed_job_is_retried(self, monkeypatch):
+        attempts = []
+
+        def flaky(text, log_file_path=None):
+            attempts.append(text)
+            if len(attempts) == 1:
+                raise RuntimeError("window not ready")
+        monkeypatch.setattr(core, 'paste_text', flaky)
+        runner = BatchRunner(compile_workflow(WORKFLOW[:1]), retries=1, backoff=0)
+        report = runner.run([{"contact_name": "张三"}])
+        assert report["jobs"][0]["status"] == "success"
+        assert report["jobs"][0]["attempts"] == 2
+
+    def test_no_retries_by_default(self, monkeypatch):
+        attempts = []
+
+        def fails(text, log_file_path=None):
+            attempts.append(text)
+            raise RuntimeError("window not ready")
+        monkeypatch.setattr(core, 'paste_text', fails)
+        report = BatchRunner(compile_workflow(WORKFLOW[:1]), backoff=0).run([{"contact_name": "张三"}])
+        assert report["jobs"][0]["status"] == "failed" and report["jobs"][0]["attempts"] == 1
+        assert attempts == ["张三"]
+
+    def test_missing_parameters_are_not_sent(self, pasted):
+        report = BatchRunner(compile_workflow(WORKFLOW), backoff=0).run([{"contact_name": "张三"}])
+        assert report["invalid"] == 1 and "message_content" in report["jobs"][0]["error"]
+        assert pasted == []
@@ -0,0 +1,54 @@
+"""
+测试基准测试工具 (合成语料 + 模板匹配阶段，不需要Tesseract)
+"""
+import pytest
+import sys
+import os
+
+# 添加src和benchmarks目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+pytest.importorskip("numpy")
+
+from corpus import generate_corpus, load_manifest
+from vision_bench import run_benchmark, compare_results, summarize
+
+
+class TestCorpus:
+    """测试合成语料"""
+
+    def test_generate_is_reproducible(self, tmp_path):
+        first = generate_corpus(str(tmp_path / "a"), resolutions=["1080p"], langs=["en"], scenes=["dialog"])
+        second = generate_corpus(str(tmp_path / "b"), resolutions=["1080p"], langs=["en"], scenes=["dialog"])
+        assert first["screens"] == second["screens"]
+        with open(tmp_path / "a" / "dialog_1080p_en.png", 'rb') as a, open(tmp_path / "b" / "dialog_1080p_en.png", 'rb') as b:
+            assert a.read() == b.read()
+        assert load_manifest(str(tmp_path / "a"))["screens"][0]["templates"][0]["name"] == "warning_icon"
+
+
+class TestVisionBench:
+    """测试基准测试结果"""
+
+    def test_template_stage(self, tmp_path):
+        corpus = str(tmp_path / "corpus")
+        generate_corpus(corpus, resolutions=["1080p"], langs=["en"], scenes=["dialog"])
+        results = run_benchmark(corpus, stages=["template"], repeat=1)
+        stage = results["stages"]["template"]
+        assert stage["count"] == 1
+        assert stage["accuracy"] == 1.0
+        assert stage["p50_ms"] <= stage["p95_ms"] <= stage["max_ms"]
+        assert results["corpus"]["screens"] == 1
+
+    def test_summarize_groups_by_resolution(self):
+        result = summarize([(10, "1080p"), (30, "4k"), (20, "1080p")], hits=[True, False, True])
+        assert result["count"] == 3
+        assert result["accuracy"] == round(2 / 3, 4)
+        assert result["by_resolution"]["1080p"]["count"] == 2
+
+    def test_compare_flags_regressions(self):
+        baseline = {"stages": {"template": {"p95_ms": 10, "accuracy": 1.0}}}
+        faster = {"stages": {"template": {"p95_ms": 11, "accuracy": 1.0}}}
+        slower = {"stages": {"template": {"p95_ms": 20, "accuracy": 0.5}}}
+        assert compare_results(faster, baseline, 0.2) == []
+        assert len(compare_results(slower, baseline, 0.2)) == 2
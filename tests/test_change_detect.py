@@ -0,0 +1,92 @@
+"""
+测试画面变化检测等待
+"""
+import pytest
+import sys
+import os
+import time
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image, ImageDraw
+
+from desktop_automation.change_detect import ChangeWaiter, frame_signature, signature_distance
+
+
+class _Screen:
+    """Returns a blank frame until `change_at`, then one with a dialog drawn."""
+
+    def __init__(self, change_at):
+        self.change_at = change_at
+        self.captures = 0
+        self.blank = Image.new("RGB", (320, 180), "white")
+        self.dialog = self.blank.copy()
+        ImageDraw.Draw(self.dialog).rectangle((100, 60, 220, 120), fill="black")
+
+    def capture(self, region=None):
+        self.captures += 1
+        return self.dialog if time.monotonic() >= self.change_at else self.blank
+
+
+class TestSignature:
+    """测试缩略图签名"""
+
+    def test_small_change_ignored_large_change_detected(self):
+        blank = Image.new("RGB", (1920, 1080), "white")
+        caret = blank.copy()
+        ImageDraw.Draw(caret).line((100, 100, 100, 118), fill="black")
+        toast = blank.copy()
+        ImageDraw.Draw(toast).text((900, 500), "Saved", fill="black")
+        assert signature_distance(frame_signature(blank), frame_signature(caret)) <= 16
+        assert signature_distance(frame_signature(blank), frame_signature(toast)) > 16
+
+
+class TestChangeWaiter:
+    """测试事件驱动等待"""
+
+    def test_returns_soon_after_change(self):
+        screen = _Screen(time.monotonic() + 0.1)
+        waiter = ChangeWaiter(screen.capture, settle=0.05)
+        start = time.monotonic()
+        frame = waiter.wait_for_change(2)
+        assert frame is screen.dialog
+        assert time.monotonic() - start < 1
+
+    def test_timeout_without_change(self):
+        screen = _Screen(time.monotonic() + 60)
+        waiter = ChangeWaiter(screen.capture, max_interval=0.1)
+        assert waiter.wait_for_change(0.3) is None
+        # backoff keeps the number of samples low
+        assert screen.captures < 10
+
+    def test_poll_checks_only_after_changes(self):
+        screen = _Screen(time.monotonic() + 0.2)
+        checks = []
+
+        def check(frame):
+            checks.append(frame)
+            return "found" if frame is screen.dialog else None
+
+        result, elapsed = ChangeWaiter(screen.capture, settle=0.05).poll(check, 2)
+        assert result == "found"
+        assert len(checks) == 2
+
+    def test_poll_rechecks_changes_below_threshold(self):
+        blank = Image.new("RGB", (1920, 1080), "white")
+        caret = blank.copy()
+        ImageDraw.Draw(caret).line((100, 100, 100, 118), fill="black")
+        change_at = time.monotonic() + 0.1
+        waiter = ChangeWaiter(lambda region: caret if time.monotonic() >= change_at else blank, max_interval=0.05)
+
+        result, elapsed = waiter.poll(lambda frame: frame is caret, 2, recheck_interval=0.2)
+        assert result is True and elapsed < 1
+        assert waiter.changes == 0 and waiter.rechecks >= 1
+        # without rechecks the same change is never noticed
+        change_at = time.monotonic() + 0.1
+        waiter = ChangeWaiter(lambda region: caret if time.monotonic() >= change_at else blank, max_interval=0.05)
+        assert waiter.poll(lambda frame: frame is caret, 0.4)[0] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
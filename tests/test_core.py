@@ -47,5 +47,25 @@ class TestSmartFunctions:
         assert hasattr(core, 'verify_operation_result')
 
 
+
+class TestRegionSearch:
+    """测试区域搜索坐标映射"""
+
+    def test_find_text_in_region_returns_screen_coordinates(self, monkeypatch):
+        captured = {}
+
+        def fake_capture(region=None):
+            captured['region'] = region
+            return None
+
+        ocr_data = {'text': ['确定'], 'conf': [90], 'left': [10], 'top': [20], 'width': [20], 'height': [10]}
+        monkeypatch.setattr(core, '_capture_screen', fake_capture)
+        monkeypatch.setattr(core, '_text_index', lambda image, log_file_path=None: core.TextIndex(ocr_data))
+
+        location = core.find_text_on_screen('确定', region=[100, 200, 300, 400])
+        assert captured['region'] == (100, 200, 300, 400)
+        assert (location['x'], location['y']) == (120, 225)
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+测试常驻守护进程的本地JSON-RPC接口
+"""
+import pytest
+import sys
+import os
+import threading
+import types
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from desktop_automation import cli, daemon, preprocess, screen_source
+from desktop_automation.daemon import AutomationDaemon, DaemonClient, DaemonError, connect_daemon, call_action
+
+
+@pytest.fixture
+def running(tmp_path):
+    state_file = str(tmp_path / "daemon.json")
+    server = AutomationDaemon(port=0, state_file=state_file, warm_up=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while not os.path.exists(state_file):
+        pass
+    yield server, state_file
+    server.shutdown()
+    thread.join(5)
+
+
+class TestDaemon:
+    """测试请求处理"""
+
+    def test_action_roundtrip(self, running):
+        server, state_file = running
+        client = connect_daemon(state_file)
+        assert client is not None
+        try:
+            result, output = client.call("wait", {"seconds": 0})
+            assert result == "Waited for 0 seconds."
+            assert client.call("ping")[0]["pid"] == os.getpid()
+            assert client.call("stats")[0]["requests"] == 3
+        finally:
+            client.close()
+
+    def test_errors(self, running):
+        server, state_file = running
+        client = connect_daemon(state_file)
+        try:
+            with pytest.raises(DaemonError) as info:
+                client.call("_log_action", {})
+            assert info.value.code == daemon.METHOD_NOT_FOUND
+            with pytest.raises(DaemonError) as info:
+                client.call("wait", {"secs": 1})
+            assert info.value.code == daemon.INVALID_PARAMS
+        finally:
+            client.close()
+
+    def test_overrides_last_one_request(self, running, tmp_path):
+        server, state_file = running
+        Image.new("RGB", (40, 30), "white").save(str(tmp_path / "frame.png"))
+        before = (screen_source._current_source, preprocess._active_config)
+        client = connect_daemon(state_file)
+        try:
+            overrides = {"screen_source": "replay", "replay_dir": str(tmp_path), "preprocess": "accurate"}
+            result, _ = client.call("benchmark_screen_capture", {"samples": 2}, overrides)
+            assert result["source"] == "replay"
+            assert (screen_source._current_source, preprocess._active_config) == before
+            with pytest.raises(DaemonError) as info:
+                client.call("ping", None, {"motion_profile": "instant"})
+            assert info.value.code == daemon.INVALID_PARAMS
+            with pytest.raises(DaemonError) as info:
+                client.call("wait", {"seconds": 0}, {"display": ":1"})
+            assert info.value.code == daemon.INVALID_PARAMS
+        finally:
+            client.close()
+
+    def test_token_required(self, running):
+        server, state_file = running
+        bad = DaemonClient("127.0.0.1", server.port, "wrong")
+        try:
+            with pytest.raises(DaemonError) as info:
+                bad.call("ping")
+            assert info.value.code == daemon.UNAUTHORIZED
+        finally:
+            bad.close()
+
+    def test_state_file_removed_on_shutdown(self, tmp_path):
+        state_file = str(tmp_path / "daemon.json")
+        server = AutomationDaemon(port=0, state_file=state_file, warm_up=False)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        while not os.path.exists(state_file):
+            pass
+        client = connect_daemon(state_file)
+        client.call("shutdown")
+        client.close()
+        thread.join(5)
+        assert not os.path.exists(state_file)
+        assert connect_daemon(state_file) is None
+
+
+class TestCallAction:
+    """测试参数转换"""
+
+    def test_varargs_and_log_file_path(self):
+        calls = []
+        def hotkey(*keys, log_file_path=None):
+            calls.append((keys, log_file_path))
+        def plain(seconds):
+            calls.append(seconds)
+        call_action(hotkey, {"keys": ["ctrl", "v"], "log_file_path": "x.jsonl"})
+        call_action(plain, {"seconds": 2, "log_file_path": "x.jsonl"})
+        assert calls == [(("ctrl", "v"), "x.jsonl"), 2]
+
+
+class TestForwarding:
+    """测试客户端转发前把路径参数解析为绝对路径"""
+
+    def test_paths_are_made_absolute(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        params = cli._absolute_paths({"file_path": "shot.png", "log_file_path": None, "report": "out/r.json",
+                                      "template_file": "t.png", "target_text": "a/b", "seconds": 1})
+        assert params == {"file_path": str(tmp_path / "shot.png"), "log_file_path": None,
+                          "report": str(tmp_path / "out" / "r.json"), "template_file": str(tmp_path / "t.png"),
+                          "target_text": "a/b", "seconds": 1}
+
+    def test_workflow_params_are_forwarded_unchanged(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        calls = []
+        client = types.SimpleNamespace(call=lambda method, params, overrides: calls.append((params, overrides))
+                                       or (True, ""), close=lambda: None)
+        args = types.SimpleNamespace(action='execute_workflow', batch=None, name="weekly",
+                                     params='{"report": "weekly", "contact_file": "张三"}', memo=False)
+        params = {"log_file_path": "task.jsonl", "screen_source": None, "replay_dir": None,
+                  "motion_profile": None, "preprocess": None}
+        assert cli._forward_to_daemon(client, args, params) == 0
+        sent, overrides = calls[0]
+        assert sent["params"] == {"report": "weekly", "contact_file": "张三"}
+        assert sent["log_file_path"] == str(tmp_path / "task.jsonl")
+        assert overrides == {}
@@ -0,0 +1,138 @@
+"""
+测试帧缓冲池：复用、内存上限、零拷贝采样和截图的 raw/async 保存 (回放帧，无需显示器)
+"""
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from desktop_automation import core, frame_buffers
+from desktop_automation.frame_buffers import FramePool, FrameMemoryError
+from desktop_automation.change_detect import ChangeWaiter, array_signature, frame_signature, signature_distance
+from desktop_automation.screen_source import ReplaySource, load_frame
+from desktop_automation.sessions import AutomationSession
+from desktop_automation.input_engine import RecordingBackend
+from desktop_automation.template_match import _gray
+
+FRAME_BYTES = 120 * 200 * 3
+
+
+def _frame(path, box=(40, 30, 100, 46), fill="black"):
+    image = Image.new("RGB", (200, 120), "white")
+    ImageDraw.Draw(image).rectangle(box, fill=fill)
+    image.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = FramePool(max_bytes=4 * FRAME_BYTES)
+    monkeypatch.setattr(frame_buffers, '_pool', pool)
+    return pool
+
+
+@pytest.fixture
+def source(tmp_path):
+    return ReplaySource([_frame(tmp_path / "0.png"), _frame(tmp_path / "1.png", box=(120, 60, 180, 100))],
+                        advance="manual")
+
+
+class TestFramePool:
+    """测试复用与内存上限"""
+
+    def test_buffers_are_reused(self, pool):
+        for _ in range(5):
+            with pool.acquire((120, 200, 3)) as buffer:
+                assert buffer.size == (200, 120)
+        stats = pool.stats()
+        assert pool.allocations == 1 and pool.reuses == 4
+        assert pool.in_use_bytes == 0 and pool.idle_bytes == FRAME_BYTES
+        assert stats["peak_mb"] == round(FRAME_BYTES / 2 ** 20, 1)
+
+    def test_hard_cap(self, pool):
+        held = [pool.acquire((120, 200, 3)) for _ in range(4)]
+        with pytest.raises(FrameMemoryError):
+            pool.acquire((120, 200, 3))
+        assert pool.rejections == 1
+        for buffer in held:
+            buffer.release()
+        # idle buffers of another shape are dropped to make room
+        with pool.acquire((240, 400, 3)):
+            pass
+        assert pool.in_use_bytes + pool.idle_bytes <= pool.max_bytes
+        assert pool.peak_bytes == 4 * FRAME_BYTES
+
+    def test_double_release_is_harmless(self, pool):
+        buffer = pool.acquire((10, 10, 3))
+        buffer.release()
+        buffer.release()
+        assert pool.in_use_bytes == 0
+
+
+class TestArrayCapture:
+    """测试写入缓冲区的截图和在视图上计算的签名"""
+
+    def test_replay_capture_array(self, pool, source):
+        with source.capture_array(pool, (40, 30, 20, 10)) as crop:
+            assert crop.array.shape == (10, 20, 3) and crop.array.max() == 0
+        with source.capture_array(pool) as frame:
+            assert np.array_equal(frame.array, np.asarray(source.capture()))
+            assert frame.image().size == (200, 120)
+        assert source.capture_count == 3
+
+    def test_array_signature(self, pool, source):
+        with source.capture_array(pool) as frame:
+            first = array_signature(frame.array)
+            assert len(first) == len(frame_signature(frame.image()))
+        assert array_signature(np.asarray(source.capture())) == first
+        source.seek(1)
+        with source.capture_array(pool) as frame:
+            assert signature_distance(array_signature(frame.array), first) > 16
+
+    def test_gray_of_array_matches_pil(self, source):
+        image = source.capture()
+        assert np.array_equal(_gray(np.asarray(image)), _gray(image))
+
+    def test_change_waiter_samples_into_one_buffer(self, pool, source):
+        waiter = ChangeWaiter(source.capture, capture_array=lambda region: source.capture_array(pool, region),
+                              min_interval=0.001, max_interval=0.005, settle=0.01)
+        assert waiter.wait_for_change(0.05) is None       # nothing changes
+        source.seek(1)
+        frame = waiter.wait_for_change(1)
+        assert isinstance(frame, Image.Image) and frame.getpixel((150, 80)) == (0, 0, 0)
+        assert waiter.samples > 3 and pool.allocations == 1
+        assert pool.in_use_bytes == 0
+
+
+class TestScreenshots:
+    """测试 take_screenshot 的 raw 与 async 保存"""
+
+    @pytest.fixture
+    def session(self, source):
+        return AutomationSession("shots", screen_source=source, input_backend=RecordingBackend())
+
+    def test_raw_screenshot_is_replayable(self, pool, source, session, tmp_path):
+        result = session.run(core.take_screenshot, str(tmp_path / "shot.rgb"), encoding="raw")
+        path = str(tmp_path / "shot_200x120.rgb")
+        assert result == f"Screenshot saved to {path}"
+        assert np.array_equal(np.asarray(load_frame(path)), np.asarray(source.capture()))
+        assert pool.in_use_bytes == 0
+
+    def test_async_screenshot(self, pool, session, tmp_path):
+        path = str(tmp_path / "shot.png")
+        assert "queued" in session.run(core.take_screenshot, path, encoding="async")
+        frame_buffers.get_screenshot_writer().flush()
+        assert Image.open(path).size == (200, 120)
+        assert pool.in_use_bytes == 0
+
+    def test_configure_frame_buffers(self, pool, tmp_path):
+        stats = core.configure_frame_buffers(max_mb=1, clear=True)
+        assert stats["max_mb"] == 1 and stats["available"]
+        assert "saved" in stats["screenshots"]
+        stats = core.configure_frame_buffers(enabled=False)
+        assert not stats["enabled"] and not core._frame_buffers_enabled()
@@ -0,0 +1,91 @@
+"""
+测试帧/OCR缓存
+"""
+import pytest
+import sys
+import os
+import time
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from desktop_automation import core
+from desktop_automation.frame_cache import FrameCache, frame_digest
+from desktop_automation.sessions import AutomationSession
+from desktop_automation.screen_source import ReplaySource
+from desktop_automation.input_engine import RecordingBackend
+
+
+class TestFrameDigest:
+    """测试画面哈希"""
+
+    def test_same_pixels_same_digest(self):
+        a = Image.new("RGB", (40, 20), "white")
+        b = Image.new("RGB", (40, 20), "white")
+        assert frame_digest(a) == frame_digest(b)
+
+    def test_changed_pixel_changes_digest(self):
+        a = Image.new("RGB", (40, 20), "white")
+        b = a.copy()
+        b.putpixel((3, 3), (0, 0, 0))
+        assert frame_digest(a) != frame_digest(b)
+
+
+class TestFrameCache:
+    """测试LRU与TTL"""
+
+    def test_get_or_compute_runs_once(self):
+        cache = FrameCache()
+        calls = []
+        compute = lambda: calls.append(1) or "ocr"
+        assert cache.get_or_compute("k", compute) == "ocr"
+        assert cache.get_or_compute("k", compute) == "ocr"
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_lru_eviction(self):
+        cache = FrameCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+    def test_ttl_expiry(self):
+        cache = FrameCache(ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = FrameCache()
+        cache.enabled = False
+        cache.put("a", 1)
+        assert cache.get("a") is None
+
+
+class TestSharedCacheUse:
+    """测试增量OCR的分块结果不进入共享缓存"""
+
+    def test_incremental_tiles_do_not_evict_frames(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "frame.png")
+        Image.new("RGB", (1280, 720), "white").save(path)
+        session = AutomationSession("tiles", screen_source=ReplaySource([path], advance="manual"),
+                                    input_backend=RecordingBackend())
+        tiles = []
+        empty = {key: [] for key in ('text', 'conf', 'left', 'top', 'width', 'height')}
+        monkeypatch.setattr(core, '_get_ocr_settings', lambda log_file_path=None: {"lang": None, "config": ""})
+        monkeypatch.setattr(core, '_preprocessed_ocr', lambda image, *args: tiles.append(image.size) or empty)
+
+        frame = session.screen_source.capture()
+        session.run(core._run_ocr, frame, "data")
+        assert not session.run(core.wait_for_text_appear, "x", timeout=0.1, incremental=True, event_driven=False)
+        assert len(tiles) > 10
+        assert session.frame_cache.stats()["entries"] == 1      # just the full frame
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
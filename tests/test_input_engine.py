@@ -0,0 +1,105 @@
+"""
+测试输入引擎：批量事件、运动配置、粘贴/输入选择
+"""
+import pytest
+import sys
+import os
+import types
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation import core, input_engine
+from desktop_automation.input_engine import InputEngine, RecordingBackend, choose_text_method, get_motion_profile
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = InputEngine(RecordingBackend(), "instant")
+    monkeypatch.setattr(input_engine, '_current_engine', engine)
+    return engine
+
+
+class TestTextMethod:
+    """测试粘贴/输入的自动选择"""
+
+    def test_short_ascii_is_typed(self):
+        assert choose_text_method("hello") == "type"
+
+    def test_chinese_newlines_and_long_text_are_pasted(self):
+        assert choose_text_method("你好") == "paste"
+        assert choose_text_method("line one\nline two") == "paste"
+        assert choose_text_method("x" * 200) == "paste"
+        assert choose_text_method("x" * 20, threshold=10) == "paste"
+
+
+class TestInputEngine:
+    """测试批量执行"""
+
+    def test_batch_runs_in_order_with_report(self, engine):
+        report = engine.run([
+            {"type": "click", "x": 10, "y": 20},
+            {"type": "text", "text": "你好"},
+            {"type": "text", "text": "ok"},
+            {"type": "hotkey", "keys": ["ctrl", "enter"]},
+        ])
+        assert engine.backend.events == [
+            ("move", 10, 20, 0.0), ("click", "left", 1),
+            ("paste", "你好"), ("write", "ok", 0.0), ("hotkey", ("ctrl", "enter")),
+        ]
+        assert report["events"] == 4
+        assert [r.get("method") for r in report["records"]] == [None, "paste", "type", None]
+        assert report["dispatch_ms"]["p50"] <= report["dispatch_ms"]["max"]
+
+    def test_humanlike_moves_take_longer_with_distance(self):
+        engine = InputEngine(RecordingBackend(), "humanlike")
+        profile = get_motion_profile("humanlike")
+        near = engine._move_duration(10, 0, profile)
+        far = engine._move_duration(1500, 0, profile)
+        assert 0 < near < far <= profile.max_move_s * (1 + profile.jitter)
+
+    def test_invalid_batch_sends_nothing(self, engine):
+        with pytest.raises(ValueError):
+            engine.run([{"type": "click", "x": 1, "y": 1}, {"type": "teleport"}])
+        assert engine.backend.events == []
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            get_motion_profile("slow")
+
+
+class TestPaste:
+    """测试剪贴板粘贴：目标程序读取剪贴板之后才恢复原内容"""
+
+    def test_clipboard_restored_after_settle(self, monkeypatch):
+        class ClipboardBackend(RecordingBackend):
+            paste = input_engine.InputBackend.paste
+
+        backend = ClipboardBackend()
+        clipboard = ["old"]
+        monkeypatch.setitem(sys.modules, 'pyperclip', types.SimpleNamespace(
+            paste=lambda: clipboard[-1],
+            copy=lambda text: (clipboard.append(text), backend.events.append(("copy", text)))))
+        monkeypatch.setattr(input_engine.time, 'sleep', lambda seconds: backend.events.append(("sleep", seconds)))
+        backend.paste("你好")
+        assert backend.events == [("copy", "你好"), ("hotkey", ("ctrl", "v")),
+                                  ("sleep", input_engine.PASTE_SETTLE_S), ("copy", "old")]
+
+
+class TestCoreInput:
+    """测试 core 的输入动作走输入引擎"""
+
+    def test_move_and_click(self, engine):
+        assert core.move_and_click(5, 6) == "Clicked left button at (5, 6)"
+        assert engine.backend.events == [("move", 5, 6, 0.0), ("click", "left", 1)]
+
+    def test_type_text_picks_paste_for_chinese(self, engine):
+        assert core.type_text("你好") == "Pasted text: 你好"
+        assert core.type_text("hi", method="type") == "Typed text: hi"
+        assert engine.backend.events == [("paste", "你好"), ("write", "hi", 0.0)]
+
+    def test_send_input_batch_reports_errors(self, engine):
+        report = core.send_input_batch([{"type": "press", "key": "enter"}], profile="fast")
+        assert report["profile"] == "fast"
+        assert engine.backend.events == [("press", "enter", 1)]
+        assert core.send_input_batch([{"type": "nope"}]).startswith("Error sending input batch")
@@ -0,0 +1,61 @@
+"""
+测试延迟导入：非视觉命令不加载 pyautogui/PIL/numpy
+"""
+import pytest
+import sys
+import os
+import subprocess
+
+# 添加src目录到路径
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, SRC_DIR)
+
+from desktop_automation.lazy_import import LazyModule
+
+
+def _run(code, cwd):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    completed = subprocess.run([sys.executable, "-c", code], env=env, cwd=cwd,
+                               capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    return completed.stdout.strip()
+
+
+class TestColdImport:
+    """测试导入时不加载重量级依赖、没有文件系统副作用"""
+
+    def test_core_import_stays_light(self, tmp_path):
+        out = _run("import sys, desktop_automation.core\n"
+                   "print(','.join(m for m in ('pyautogui', 'PIL.Image', 'numpy', 'cv2') if m in sys.modules))",
+                   str(tmp_path))
+        assert out == ""
+        assert not os.path.exists(tmp_path / "logs")
+
+    def test_package_attributes_resolve_on_demand(self, tmp_path):
+        out = _run("import sys, desktop_automation as da\n"
+                   "print('desktop_automation.core' in sys.modules, callable(da.wait),"
+                   " 'desktop_automation.core' in sys.modules, 'wait' in dir(da))",
+                   str(tmp_path))
+        assert out == "False True True True"
+
+    def test_unknown_attribute(self):
+        import desktop_automation
+        with pytest.raises(AttributeError):
+            desktop_automation.no_such_action
+
+
+class TestLazyModule:
+    """测试 LazyModule 代理"""
+
+    def test_imports_on_first_access(self):
+        proxy = LazyModule("json")
+        assert "not loaded" in repr(proxy)
+        assert proxy.dumps([1]) == "[1]"
+        assert "loaded" in repr(proxy) and "not loaded" not in repr(proxy)
+
+    def test_dunder_lookups_do_not_import(self):
+        proxy = LazyModule("no_such_module_for_lazy_test")
+        assert not hasattr(proxy, "__wrapped__")
+        with pytest.raises(ImportError):
+            proxy.anything
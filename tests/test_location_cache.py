@@ -0,0 +1,129 @@
+"""
+测试 smart_click_text 的位置缓存：命中时只做小区域签名校验，不一致时回退OCR (回放帧，无需显示器)
+"""
+import json
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image, ImageDraw
+
+from desktop_automation import core
+from desktop_automation.sessions import AutomationSession
+from desktop_automation.screen_source import ReplaySource
+from desktop_automation.input_engine import RecordingBackend
+from desktop_automation import location_cache
+from desktop_automation.location_cache import LocationCache
+from desktop_automation.task_logger import flush_task_log
+
+LABEL = (40, 30, 60, 16)        # left, top, width, height of the "搜索" label
+
+
+def _frame(path, label_at=LABEL, fill="black"):
+    image = Image.new("RGB", (200, 120), "white")
+    left, top, width, height = label_at
+    ImageDraw.Draw(image).rectangle((left + 4, top + 4, left + width - 4, top + height - 4), fill=fill)
+    image.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def desktop(tmp_path, monkeypatch):
+    frames = [_frame(tmp_path / "0.png"), _frame(tmp_path / "1.png", fill="gray"),
+              _frame(tmp_path / "2.png", label_at=(120, 80, 60, 16))]
+    source = ReplaySource(frames, advance="manual")
+    session = AutomationSession("click", screen_source=source, input_backend=RecordingBackend())
+    boxes = {0: LABEL, 1: LABEL, 2: (120, 80, 60, 16)}
+    ocr_calls = []
+
+    def fake_index(image, log_file_path=None):
+        ocr_calls.append(source.position)
+        left, top, width, height = boxes[source.position]
+        return core.TextIndex({'text': ['搜索'], 'conf': [90], 'left': [left], 'top': [top],
+                               'width': [width], 'height': [height]})
+
+    monkeypatch.setattr(core, '_text_index', fake_index)
+    cache = LocationCache(str(tmp_path / "locations.json"))
+    monkeypatch.setattr(core, '_location_cache', cache)
+    return {"session": session, "source": source, "ocr_calls": ocr_calls, "cache": cache, "tmp_path": tmp_path}
+
+
+def _click(desktop, **kwargs):
+    return desktop["session"].run(core.smart_click_text, "搜索", max_retries=1, **kwargs)
+
+
+def _clicks(desktop):
+    return [(e[1], e[2]) for e in desktop["session"].input_engine.backend.events if e[0] == "move"]
+
+
+class TestLocationCache:
+    """测试学习、命中与失效"""
+
+    def test_second_click_skips_ocr(self, desktop):
+        assert "attempt 1" in _click(desktop)
+        assert "from the location cache" in _click(desktop)
+        assert desktop["ocr_calls"] == [0]
+        assert _clicks(desktop) == [(70, 38), (70, 38)]
+        assert desktop["cache"].stats()["hits"] == 1
+
+    def test_changed_label_falls_back_to_ocr(self, desktop):
+        _click(desktop)
+        desktop["source"].seek(1)           # same place, different pixels
+        assert "attempt 1" in _click(desktop)
+        assert desktop["ocr_calls"] == [0, 1]
+        assert desktop["cache"].stats()["misses"] == 1
+        # the refreshed entry describes the new pixels
+        assert "from the location cache" in _click(desktop)
+
+    def test_moved_label_is_relearned(self, desktop):
+        _click(desktop)
+        desktop["source"].seek(2)
+        _click(desktop)
+        _click(desktop)
+        assert desktop["ocr_calls"] == [0, 2]
+        assert _clicks(desktop)[-2:] == [(150, 88), (150, 88)]
+
+    def test_learning_reuses_the_ocr_frame(self, desktop):
+        _click(desktop)
+        assert desktop["source"].stats()["captures"] == 1     # no second capture for the signature
+        assert "from the location cache" in _click(desktop)
+
+    def test_lookup_is_still_a_timed_find_text_action(self, desktop):
+        log = str(desktop["tmp_path"] / "log.jsonl")
+        _click(desktop, log_file_path=log)
+        flush_task_log(log)
+        with open(log, encoding="utf-8") as f:
+            find, click = [json.loads(line) for line in f]
+        assert find["action"] == "find_text_on_screen"
+        assert find["timing"]["path"] == "smart_click_text;find_text_on_screen"
+        assert "find_text_on_screen" in [s["name"] for s in click["timing"]["spans"]]
+
+    def test_persists_between_processes(self, desktop):
+        _click(desktop)
+        path = desktop["tmp_path"] / "locations.json"
+        assert not path.exists()            # buffered until SAVE_EVERY changes or exit
+        location_cache._flush_on_exit()
+        assert LocationCache(str(path)).stats()["entries"] == 1
+
+    def test_writes_are_batched(self, desktop, monkeypatch):
+        monkeypatch.setattr(location_cache, 'SAVE_EVERY', 3)
+        cache, path = desktop["cache"], desktop["tmp_path"] / "locations.json"
+        crop = Image.new("RGB", (10, 10))
+        for n in range(4):
+            cache.store(f"label {n}", (0, 0, 10, 10), (5, 5), (0, 0), crop)
+        assert LocationCache(str(path)).stats()["entries"] == 3
+        cache.flush()
+        assert LocationCache(str(path)).stats()["entries"] == 4
+
+    def test_cache_can_be_bypassed_or_disabled(self, desktop):
+        _click(desktop)
+        _click(desktop, use_cache=False)
+        assert desktop["ocr_calls"] == [0, 0]
+        stats = core.configure_location_cache(enabled=False, clear=True)
+        assert stats["entries"] == 0 and not stats["enabled"]
+        _click(desktop)
+        assert desktop["ocr_calls"] == [0, 0, 0]
+        assert desktop["cache"].stats()["entries"] == 0
@@ -0,0 +1,136 @@
+"""
+测试任务日志的压缩存储与查询 (SQLite)
+"""
+import pytest
+import sys
+import os
+import json
+import sqlite3
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation.log_store import compact_logs, query_logs
+
+
+def _entry(ts, action, status="success", duration=None, spans=(), result="ok", **params):
+    entry = {"timestamp": ts, "action": action, "parameters": params, "status": status, "result": result}
+    if duration is not None:
+        entry["timing"] = {"path": action, "started_at": 0, "duration_ms": duration, "spans": list(spans)}
+    return entry
+
+
+def _write_log(logs_dir, name, entries, mode='w'):
+    path = logs_dir / f"task_{name}.jsonl"
+    with open(path, mode, encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return path
+
+
+@pytest.fixture
+def logs(tmp_path):
+    logs_dir = tmp_path / "logs"
+    logs_dir.mkdir()
+    _write_log(logs_dir, "2026-09-01_10-00-00", [
+        _entry("2026-09-01T10:00:01", "smart_click_text", duration=40,
+               spans=[{"name": "ocr", "start_ms": 0, "duration_ms": 30}], target_text="搜索"),
+        _entry("2026-09-01T10:00:02", "type_text", duration=10, text="你好"),
+        _entry("2026-09-01T10:00:03", "task_verdict", result="Task ended with status: success",
+               status="success", user_feedback="done"),
+    ])
+    _write_log(logs_dir, "2026-09-02_10-00-00", [
+        _entry("2026-09-02T10:00:01", "smart_click_text", status="not_found", duration=900,
+               result="Failed to find text '搜索' after 3 attempts"),
+        _entry("2026-09-02T10:00:02", "smart_click_text", status="not_found", duration=1100,
+               result="Failed to find text '搜索' after 3 attempts"),
+        _entry("2026-09-02T10:00:03", "task_verdict", status="failure", result="Task ended with status: failure"),
+    ])
+    return logs_dir
+
+
+def _query(logs_dir, report="summary", **filters):
+    return query_logs(report, str(logs_dir / "task_logs.sqlite3"), **filters)["rows"]
+
+
+class TestCompaction:
+    """测试导入与增量更新"""
+
+    def test_imports_every_log(self, logs):
+        stats = compact_logs(str(logs))
+        assert stats["files"] == 2 and stats["entries"] == 6
+        summary = _query(logs)
+        assert summary["tasks"] == 2 and summary["entries"] == 6
+        assert summary["verdicts"] == {"success": 1, "failure": 1}
+        assert summary["statuses"]["not_found"] == 2
+
+    def test_incremental_and_partial_lines(self, logs):
+        compact_logs(str(logs))
+        assert compact_logs(str(logs))["updated"] == 0
+        path = _write_log(logs, "2026-09-01_10-00-00",
+                          [_entry("2026-09-01T10:05:00", "press_hotkey", duration=5)], mode='a')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"timestamp": "2026-09-01T10:06:00", "act')     # still being written
+        stats = compact_logs(str(logs))
+        assert stats["updated"] == 1 and stats["entries"] == 1
+        assert _query(logs)["entries"] == 7
+
+    def test_shrunk_log_is_skipped(self, logs):
+        compact_logs(str(logs))
+        _write_log(logs, "2026-09-02_10-00-00", [_entry("2026-09-02T11:00:00", "wait")])
+        assert compact_logs(str(logs))["skipped"] == 1
+        assert _query(logs)["entries"] == 6
+
+    def test_remove_finished_logs(self, logs):
+        _write_log(logs, "2026-09-03_10-00-00", [_entry("2026-09-03T10:00:00", "wait")])
+        stats = compact_logs(str(logs), remove=True)
+        assert stats["removed"] == 2
+        assert [p.name for p in logs.glob("task_*.jsonl")] == ["task_2026-09-03_10-00-00.jsonl"]
+        assert _query(logs)["entries"] == 7
+
+
+class TestQueries:
+    """测试汇总报表与过滤"""
+
+    def test_action_stats(self, logs):
+        compact_logs(str(logs))
+        rows = {r["action"]: r for r in _query(logs, "actions")}
+        click = rows["smart_click_text"]
+        assert click["count"] == 3 and click["succeeded"] == 1
+        assert click["success_rate"] == pytest.approx(1 / 3, abs=1e-3)
+        # percentiles come from ~10% wide histogram buckets
+        assert click["p50_ms"] == pytest.approx(900, rel=0.1)
+        assert click["p95_ms"] == pytest.approx(1100, rel=0.1) and click["max_ms"] == 1100
+        assert rows["task_verdict"]["p50_ms"] is None
+
+    def test_failure_hotspots_and_filters(self, logs):
+        compact_logs(str(logs))
+        [hotspot] = _query(logs, "failures", verdict="failure")
+        assert hotspot["action"] == "smart_click_text" and hotspot["count"] == 2
+        assert _query(logs, "failures", since="2026-09-03") == []
+        tasks = _query(logs, "tasks", status="failure")
+        assert len(tasks) == 1 and tasks[0]["verdict"] == "failure"
+        assert _query(logs, "summary", until="2026-09-01")["entries"] == 3
+        # verdicts and times of day are answered from the individual entries
+        assert _query(logs, "summary", verdict="failure")["entries"] == 3
+        assert _query(logs, "summary", since="2026-09-02T10:00:02")["entries"] == 2
+
+    def test_phases_and_daily(self, logs):
+        compact_logs(str(logs))
+        [phase] = _query(logs, "phases")
+        assert phase["phase"] == "smart_click_text/ocr" and phase["total_ms"] == 30
+        days = {r["day"]: r for r in _query(logs, "daily")}
+        assert days["2026-09-01"]["successful_tasks"] == 1 and days["2026-09-02"]["failures"] == 2
+        with pytest.raises(ValueError):
+            _query(logs, "phases", verdict="failure")
+
+    def test_sql_is_read_only(self, logs):
+        compact_logs(str(logs))
+        rows = _query(logs, "sql", sql="SELECT COUNT(*) AS n FROM entries")
+        assert rows == [{"n": 6}]
+        with pytest.raises(sqlite3.OperationalError):
+            _query(logs, "sql", sql="DELETE FROM entries")
+
+    def test_missing_store(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            query_logs("summary", str(tmp_path / "none.sqlite3"))
@@ -0,0 +1,147 @@
+"""
+测试OCR worker池
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation import ocr_engine
+from desktop_automation.ocr_engine import OCREngine, _parse_config
+
+
+class _FakeWorker:
+    backend = "fake"
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.broken = False
+        self.restarts = 0
+
+    def run(self, image, output, lang, config):
+        with _FakeWorker.lock:
+            _FakeWorker.active += 1
+            _FakeWorker.peak = max(_FakeWorker.peak, _FakeWorker.active)
+        time.sleep(0.02)
+        with _FakeWorker.lock:
+            _FakeWorker.active -= 1
+        if image == "crash":
+            self.broken = True
+            raise RuntimeError("worker crashed")
+        return f"{output}:{lang}:{config}"
+
+    def healthy(self):
+        return not self.broken
+
+    def restart(self):
+        self.broken = False
+        self.restarts += 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    monkeypatch.setitem(ocr_engine.WORKER_TYPES, "fake", _FakeWorker)
+    _FakeWorker.active = _FakeWorker.peak = 0
+    return "fake"
+
+
+class TestOCREngine:
+    """测试并发限制与崩溃重启"""
+
+    def test_concurrency_is_bounded(self, fake_backend):
+        engine = OCREngine(workers=2, backend=fake_backend)
+        threads = [threading.Thread(target=engine.run, args=("img",)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert _FakeWorker.peak <= 2
+        assert engine.stats()["calls"] == 6
+
+    def test_crashed_worker_is_restarted(self, fake_backend):
+        engine = OCREngine(workers=1, backend=fake_backend)
+        with pytest.raises(RuntimeError):
+            engine.run("crash")
+        assert engine.stats()["restarts"] == 1
+        assert engine.run("img", "data", "eng", "--psm 6") == "data:eng:--psm 6"
+
+    def test_health_check_restarts_unhealthy(self, fake_backend):
+        engine = OCREngine(workers=2, backend=fake_backend)
+        engine._all[0].broken = True
+        status = engine.health_check()
+        assert status["checked"] == 2
+        assert status["restarted"] == 1
+
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError):
+            OCREngine(backend="nope")
+
+    def test_fallback_without_tesserocr_is_reported(self, monkeypatch, capsys):
+        monkeypatch.setattr(ocr_engine, '_tesserocr_available', lambda: False)
+        monkeypatch.setattr(ocr_engine, '_cold_warning_shown', False)
+        for backend in ("process", "auto"):
+            engine = OCREngine(workers=1, backend=backend)
+            assert engine.backend == "pytesseract" and engine.stats()["warm"] is False
+        # warned once, not per engine
+        assert capsys.readouterr().err.count("tesserocr is not installed") == 1
+
+
+class TestCapabilityProbe:
+    """测试OCR能力探测与主机配置持久化"""
+
+    CANDIDATES = (('chi_sim+eng', '--psm 6'), (None, '--psm 6'), (None, ''))
+
+    @pytest.fixture
+    def english_only_host(self, monkeypatch, fake_backend):
+        self.launches = []
+        monkeypatch.setattr(ocr_engine, "installed_languages", lambda: self.launches.append("--list-langs")
+                            or {"eng", "osd"})
+        monkeypatch.setattr(ocr_engine, "tesseract_version", lambda: self.launches.append("--version") or "5.3.0")
+        monkeypatch.setattr(ocr_engine, "tesseract_install", lambda: "/usr/bin/tesseract|1700000000")
+        return OCREngine(workers=1, backend=fake_backend)
+
+    def test_missing_language_skipped_without_launch(self, english_only_host):
+        decision = ocr_engine.probe_ocr_capabilities(self.CANDIDATES, english_only_host)
+        assert (decision["lang"], decision["config"]) == (None, "--psm 6")
+        assert decision["source"] == "probe"
+        # only the chosen configuration was actually run
+        assert english_only_host.stats()["calls"] == 1
+
+    def test_decision_persisted_per_host(self, english_only_host, tmp_path):
+        profile = str(tmp_path / "ocr_profile.json")
+        ocr_engine.probe_ocr_capabilities(self.CANDIDATES, english_only_host, profile)
+        again = ocr_engine.probe_ocr_capabilities(self.CANDIDATES, english_only_host, profile)
+        assert again["source"] == "profile"
+        assert again["config"] == "--psm 6"
+        assert english_only_host.stats()["calls"] == 1
+        # the stored profile is found without launching tesseract for its version or languages
+        assert self.launches == ["--version", "--list-langs"]
+
+    def test_changed_install_is_probed_again(self, english_only_host, tmp_path, monkeypatch):
+        profile = str(tmp_path / "ocr_profile.json")
+        ocr_engine.probe_ocr_capabilities(self.CANDIDATES, english_only_host, profile)
+        monkeypatch.setattr(ocr_engine, "tesseract_install", lambda: "/usr/bin/tesseract|1800000000")
+        again = ocr_engine.probe_ocr_capabilities(self.CANDIDATES, english_only_host, profile)
+        assert again["source"] == "probe"
+        assert len(self.launches) == 4
+
+
+class TestParseConfig:
+    """测试tesseract命令行配置解析"""
+
+    def test_psm_and_variables(self):
+        assert _parse_config("--psm 6 -c preserve_interword_spaces=1") == (6, {"preserve_interword_spaces": "1"})
+        assert _parse_config("") == (None, {})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
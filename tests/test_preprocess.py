@@ -0,0 +1,142 @@
+"""
+测试OCR前的帧预处理：区域检测、缩放、自适应阈值与坐标映射 (合成图片，无需 Tesseract)
+"""
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from desktop_automation import core, preprocess
+from desktop_automation.preprocess import (get_preprocess_config, set_preprocess_config, detect_text_regions,
+                                           adaptive_threshold, estimate_line_height, prepare_frame, ocr_frame,
+                                           get_preprocess_stats, reset_preprocess_stats)
+
+
+@pytest.fixture(autouse=True)
+def _default_config(monkeypatch):
+    monkeypatch.setattr(preprocess, '_active_config', None)
+    monkeypatch.delenv(preprocess.PREPROCESS_ENV, raising=False)
+
+
+def _frame(*boxes, size=(640, 480), background="white", ink="black"):
+    image = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(image)
+    for left, top, right, bottom in boxes:
+        # "text": thin horizontal strokes inside the box
+        for y in range(top, bottom, 4):
+            draw.rectangle((left, y, right, y + 1), fill=ink)
+    return image
+
+
+class TestConfig:
+    """测试预设与覆盖"""
+
+    def test_presets_and_overrides(self):
+        assert get_preprocess_config().name == "off"
+        config = get_preprocess_config("accurate", max_scale=2.0)
+        assert config.threshold == "adaptive" and config.max_scale == 2.0
+        with pytest.raises(ValueError):
+            get_preprocess_config("sharpest")
+        with pytest.raises(ValueError):
+            get_preprocess_config("fast", blur=3)
+
+    def test_environment_and_active_config(self, monkeypatch):
+        monkeypatch.setenv(preprocess.PREPROCESS_ENV, "off")
+        assert get_preprocess_config().name == "off"
+        set_preprocess_config("accurate", scale=2.0)
+        assert get_preprocess_config().scale == 2.0
+        assert set_preprocess_config(threshold=None).name == "accurate"
+
+    def test_core_action_reports_config_and_stages(self):
+        result = core.configure_ocr_preprocessing("accurate")
+        assert result["config"]["name"] == "accurate"
+        assert set(result["stages"]) == set(preprocess.STAGES)
+
+
+class TestRegions:
+    """测试文字区域检测跳过空白区域"""
+
+    def test_finds_separate_blocks(self):
+        gray = np.asarray(_frame((40, 40, 200, 70), (400, 300, 600, 330)).convert("L"))
+        regions = detect_text_regions(gray, get_preprocess_config("fast"))
+        assert len(regions) == 2
+        (l1, t1, r1, b1), (l2, t2, r2, b2) = sorted(regions)
+        assert l1 <= 40 and t1 <= 40 and r1 >= 200 and b1 >= 70
+        assert l2 <= 400 and t2 <= 300 and r2 >= 600 and b2 >= 330
+        covered = (r1 - l1) * (b1 - t1) + (r2 - l2) * (b2 - t2)
+        assert covered < 0.2 * 640 * 480
+
+    def test_blank_frame_has_no_regions(self):
+        gray = np.asarray(_frame().convert("L"))
+        assert detect_text_regions(gray, get_preprocess_config("fast")) == []
+        assert ocr_frame(_frame(), lambda image: pytest.fail("OCR on a blank frame"), "string", "fast") == ""
+
+    def test_busy_frame_is_recognised_whole(self):
+        gray = np.asarray(_frame((0, 0, 640, 480)).convert("L"))
+        assert detect_text_regions(gray, get_preprocess_config("fast")) is None
+        regions = prepare_frame(_frame((0, 0, 640, 480)), "fast")
+        assert [r.box for r in regions] == [(0, 0, 640, 480)]
+
+
+class TestStages:
+    """测试阈值、缩放和阶段计时"""
+
+    def test_adaptive_threshold_is_binary_and_inverts_dark_backgrounds(self):
+        dark = np.asarray(_frame((20, 20, 200, 60), background="black", ink="white").convert("L"))
+        binary = adaptive_threshold(dark, 31, 10)
+        assert set(np.unique(binary)) <= {0, 255}
+        assert binary[0, 0] == 255          # background comes out white
+        assert binary[20, 100] == 0         # the stroke comes out black
+
+    def test_line_height_and_auto_scale(self):
+        image = Image.new("L", (200, 100), 255)
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((10, 10, 150, 19), fill=0)
+        draw.rectangle((10, 40, 150, 49), fill=0)
+        assert estimate_line_height(np.asarray(image), 32) == 10
+        [region] = prepare_frame(image, get_preprocess_config("accurate", detect_regions=False))
+        assert region.scale == 3.0 and region.image.size == (600, 300)
+
+    def test_off_passes_the_frame_through(self):
+        image = _frame((40, 40, 200, 70))
+        [region] = prepare_frame(image, "off")
+        assert region.image is image and region.scale == 1.0
+
+    def test_stage_timings(self):
+        reset_preprocess_stats()
+        prepare_frame(_frame((40, 40, 200, 70)), "accurate")
+        stats = get_preprocess_stats()
+        assert all(stats[stage]["count"] >= 1 for stage in preprocess.STAGES)
+        assert stats["grayscale"]["total_ms"] >= 0
+
+
+class TestOcrFrame:
+    """测试识别结果映射回原始帧坐标"""
+
+    def test_region_boxes_are_mapped_back(self):
+        image = _frame((40, 40, 200, 70), (400, 300, 600, 330))
+        config = get_preprocess_config("fast", scale=2.0)
+        seen = []
+
+        def fake_ocr(region):
+            seen.append(region.size)
+            # one word at (10, 10) with size 40x20 in the scaled region image
+            return {"text": ["word"], "conf": [90], "left": [10], "top": [10], "width": [40], "height": [20]}
+
+        data = ocr_frame(image, fake_ocr, "data", config, workers=2)
+        regions = prepare_frame(image, config)
+        assert len(seen) == 2 and all(r.mode == "L" for r in (region.image for region in regions))
+        expected = sorted((r.box[0] + 5, r.box[1] + 5) for r in regions)
+        assert sorted(zip(data["left"], data["top"])) == expected
+        assert data["width"] == [20, 20] and data["height"] == [10, 10]
+
+    def test_string_output_in_reading_order(self):
+        image = _frame((400, 300, 600, 330), (40, 40, 200, 70))
+        texts = iter(["first\n", "second\n"])
+        result = ocr_frame(image, lambda region: next(texts), "string", "fast", workers=1)
+        assert result == "first\nsecond"
@@ -0,0 +1,114 @@
+"""
+测试动作计时与日志分析
+"""
+import pytest
+import sys
+import os
+import json
+import time
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation.profiling import span, traced_action, current_timing, profile_task_log, export_trace
+
+
+def _write_log(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+
+
+@traced_action
+def inner():
+    with span("capture"):
+        time.sleep(0.01)
+    return current_timing("inner")
+
+
+@traced_action
+def outer():
+    child = inner()
+    with span("mouse"):
+        pass
+    return child, current_timing("outer")
+
+
+class TestSpans:
+    """测试嵌套计时"""
+
+    def test_nested_actions_record_paths_and_phases(self):
+        child, parent = outer()
+        assert child["path"] == "outer;inner"
+        assert [s["name"] for s in child["spans"]] == ["capture"]
+        assert child["spans"][0]["duration_ms"] >= 10
+        assert parent["path"] == "outer"
+        names = [s["name"] for s in parent["spans"]]
+        assert names == ["inner", "mouse"]
+        assert parent["spans"][0]["action"] is True
+        assert parent["duration_ms"] >= child["duration_ms"]
+
+    def test_timing_only_for_innermost_action(self):
+        @traced_action
+        def action():
+            return current_timing("other")
+        assert action() is None
+
+    def test_span_outside_action_is_noop(self):
+        with span("capture") as node:
+            assert node is None
+
+
+class TestProfileReport:
+    """测试汇总与导出"""
+
+    def _entries(self):
+        return [
+            {"action": "find_text_on_screen", "timing": {"path": "smart_click_text;find_text_on_screen",
+             "started_at": 100.0, "duration_ms": 40,
+             "spans": [{"name": "capture", "start_ms": 0, "duration_ms": 10},
+                       {"name": "ocr", "start_ms": 10, "duration_ms": 30}]}},
+            {"action": "smart_click_text", "timing": {"path": "smart_click_text", "started_at": 100.0,
+             "duration_ms": 100,
+             "spans": [{"name": "find_text_on_screen", "action": True, "start_ms": 0, "duration_ms": 40,
+                        "children": [{"name": "capture", "start_ms": 0, "duration_ms": 10},
+                                     {"name": "ocr", "start_ms": 10, "duration_ms": 30}]},
+                       {"name": "mouse", "start_ms": 40, "duration_ms": 50}]}},
+            {"action": "wait", "status": "success"},
+        ]
+
+    def test_profile_aggregates_actions_and_phases(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        _write_log(path, self._entries())
+        report = profile_task_log(path)
+        assert report["actions"]["smart_click_text"]["p50_ms"] == 100
+        assert report["phases"]["find_text_on_screen/ocr"]["max_ms"] == 30
+        assert report["phases"]["smart_click_text/mouse"]["count"] == 1
+        # nested action phases are not double counted under the parent
+        assert "smart_click_text/ocr" not in report["phases"]
+
+    def test_collapsed_trace_uses_self_time(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        out = str(tmp_path / "trace.folded")
+        _write_log(path, self._entries())
+        export_trace(path, out, "collapsed")
+        with open(out) as f:
+            stacks = dict(line.rsplit(' ', 1) for line in f.read().splitlines())
+        assert stacks["smart_click_text"] == "10000"
+        assert stacks["smart_click_text;find_text_on_screen;ocr"] == "30000"
+        assert stacks["smart_click_text;mouse"] == "50000"
+
+    def test_chrome_trace(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        out = str(tmp_path / "trace.json")
+        _write_log(path, self._entries())
+        assert export_trace(path, out, "chrome") == 5
+        with open(out) as f:
+            events = json.load(f)["traceEvents"]
+        assert events[0]["name"] == "smart_click_text" and events[0]["dur"] == 100000
+
+    def test_unknown_format(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        _write_log(path, [])
+        with pytest.raises(ValueError):
+            export_trace(path, str(tmp_path / "x"), "svg")
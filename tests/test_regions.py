@@ -0,0 +1,70 @@
+"""
+测试搜索区域解析
+"""
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation import core
+from desktop_automation.regions import resolve_region, register_regions, clear_regions, regions_scope, to_screen
+from desktop_automation.workflow_compiler import compile_workflow
+
+
+class TestResolveRegion:
+    """测试区域规格解析"""
+
+    def teardown_method(self):
+        clear_regions()
+
+    def test_none_means_full_screen(self):
+        assert resolve_region(None) is None
+
+    def test_absolute_box(self):
+        assert resolve_region([10, 20, 300, 400]) == (10, 20, 300, 400)
+        assert resolve_region({"x": 5, "y": 6, "width": 7, "height": 8}) == (5, 6, 7, 8)
+
+    def test_named_region(self):
+        register_regions({"chat_list": [0, 60, 300, 800], "alias": "chat_list"})
+        assert resolve_region("alias") == (0, 60, 300, 800)
+
+    def test_scoped_regions_end_with_the_block(self):
+        register_regions({"chat_list": [0, 60, 300, 800]})
+        with regions_scope({"chat_list": [0, 0, 10, 10], "input_box": [0, 900, 300, 100]}):
+            assert resolve_region("chat_list") == (0, 0, 10, 10)
+            assert resolve_region("input_box") == (0, 900, 300, 100)
+        assert resolve_region("chat_list") == (0, 60, 300, 800)
+        with pytest.raises(ValueError):
+            resolve_region("input_box")
+
+    def test_workflow_regions_last_one_run(self, monkeypatch):
+        seen = []
+        monkeypatch.setattr(core, 'wait', lambda seconds, log_file_path=None: seen.append(resolve_region("box")))
+        compile_workflow({"regions": {"box": [1, 2, 3, 4]},
+                          "actions": [{"action": "wait", "params": {"seconds": 0}}]}).run()
+        assert seen == [(1, 2, 3, 4)]
+        with pytest.raises(ValueError):
+            resolve_region("box")
+
+    def test_window_region_without_window_lookup(self, monkeypatch):
+        monkeypatch.setattr(sys, 'platform', 'linux')
+        with pytest.raises(NotImplementedError):
+            resolve_region({"window": "微信", "x": 0, "y": 0})
+
+    def test_unknown_name_rejected(self):
+        with pytest.raises(ValueError):
+            resolve_region("missing")
+
+    def test_empty_region_rejected(self):
+        with pytest.raises(ValueError):
+            resolve_region([0, 0, 0, 10])
+
+    def test_to_screen_offsets_location(self):
+        assert to_screen({"x": 1, "y": 2}, (100, 200, 10, 10)) == {"x": 101, "y": 202}
+        assert to_screen(None, (100, 200, 10, 10)) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,61 @@
+"""
+测试截图来源抽象 (回放源无需显示器)
+"""
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from desktop_automation.screen_source import ReplaySource, save_frame, load_frame, measure_capture_latency
+
+
+class TestReplaySource:
+    """测试录制帧回放"""
+
+    def test_frames_replayed_in_order(self, tmp_path):
+        Image.new("RGB", (8, 4), "red").save(tmp_path / "frame_1.png")
+        save_frame(Image.new("RGB", (8, 4), "blue"), str(tmp_path / "frame_2.rgb"))
+        source = ReplaySource(str(tmp_path))
+        assert source.capture().getpixel((0, 0)) == (255, 0, 0)
+        assert source.capture().getpixel((0, 0)) == (0, 0, 255)
+        # loops back to the first frame
+        assert source.capture().getpixel((0, 0)) == (255, 0, 0)
+        assert source.stats()["captures"] == 3
+
+    def test_region_crop(self, tmp_path):
+        Image.new("RGB", (8, 4), "red").save(tmp_path / "frame_1.png")
+        source = ReplaySource(str(tmp_path), advance="manual")
+        assert source.capture((2, 1, 3, 2)).size == (3, 2)
+
+    def test_seek(self, tmp_path):
+        Image.new("RGB", (8, 4), "red").save(tmp_path / "frame_1.png")
+        Image.new("RGB", (8, 4), "blue").save(tmp_path / "frame_2.png")
+        source = ReplaySource(str(tmp_path), advance="manual")
+        source.seek(1)
+        assert source.capture().getpixel((0, 0)) == (0, 0, 255)
+        with pytest.raises(IndexError):
+            source.seek(2)
+
+    def test_raw_frame_roundtrip(self, tmp_path):
+        image = Image.new("RGB", (5, 3), (1, 2, 3))
+        path = save_frame(image, str(tmp_path / "shot.rgb"))
+        assert path.endswith("_5x3.rgb")
+        assert load_frame(path).tobytes() == image.tobytes()
+
+    def test_empty_directory_rejected(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            ReplaySource(str(tmp_path))
+
+    def test_measure_capture_latency(self, tmp_path):
+        Image.new("RGB", (8, 4), "red").save(tmp_path / "frame_1.png")
+        stats = measure_capture_latency(ReplaySource(str(tmp_path)), samples=5)
+        assert stats["source"] == "replay"
+        assert stats["min_ms"] <= stats["p50_ms"] <= stats["max_ms"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,88 @@
+"""
+测试多显示器会话：上下文隔离与任务调度 (回放源 + 记录后端，无需显示器)
+"""
+import pytest
+import sys
+import os
+import threading
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from desktop_automation import core
+from desktop_automation.sessions import AutomationSession, SessionPool, current_session
+from desktop_automation.screen_source import ReplaySource, get_screen_source
+from desktop_automation.input_engine import RecordingBackend, get_input_engine
+from desktop_automation.workflow_compiler import compile_workflow
+from desktop_automation.batch_runner import BatchRunner
+
+
+def _session(tmp_path, name, color):
+    frame = tmp_path / f"{name}.png"
+    Image.new("RGB", (16, 8), color).save(frame)
+    return AutomationSession(name, screen_source=ReplaySource([str(frame)]), input_backend=RecordingBackend())
+
+
+class TestSessionContext:
+    """测试会话内的动作只作用于该会话"""
+
+    def test_actions_use_the_session_state(self, tmp_path):
+        red, blue = _session(tmp_path, "red", "red"), _session(tmp_path, "blue", "blue")
+        outside = get_screen_source()
+        with red.activate():
+            assert current_session() is red
+            assert core._capture_screen().getpixel((0, 0)) == (255, 0, 0)
+            core.move_and_click(3, 4)
+            with blue.activate():
+                assert core._capture_screen().getpixel((0, 0)) == (0, 0, 255)
+            assert get_input_engine() is red.input_engine
+        assert current_session() is None
+        assert get_screen_source() is outside
+        assert red.input_engine.backend.events == [("move", 3, 4, 0.0), ("click", "left", 1)]
+        assert blue.input_engine.backend.events == []
+
+    def test_caches_are_per_session(self, tmp_path):
+        red, blue = _session(tmp_path, "red", "red"), _session(tmp_path, "blue", "blue")
+        red.run(core.configure_frame_cache, max_entries=7)
+        assert red.frame_cache.max_entries == 7
+        assert blue.frame_cache is not red.frame_cache and blue.frame_cache.max_entries != 7
+        assert core._current_frame_cache() is core._frame_cache
+
+    def test_threads_do_not_share_the_current_session(self, tmp_path):
+        red = _session(tmp_path, "red", "red")
+        seen = []
+        with red.activate():
+            thread = threading.Thread(target=lambda: seen.append(current_session()))
+            thread.start()
+            thread.join()
+        assert seen == [None]
+
+    def test_needs_a_display_or_explicit_backends(self):
+        with pytest.raises(ValueError):
+            AutomationSession("nothing")
+
+
+class TestSessionPool:
+    """测试任务分散到多个会话"""
+
+    def test_jobs_spread_over_sessions(self, tmp_path):
+        sessions = [_session(tmp_path, "red", "red"), _session(tmp_path, "blue", "blue")]
+        pool = SessionPool(sessions, ocr_workers=0)
+        results = pool.map(lambda session, n: (session.name, core.type_text(str(n), method="type")), range(6))
+        assert [r[1] for r in results] == [f"Typed text: {n}" for n in range(6)]
+        typed = sorted(e[1] for s in sessions for e in s.input_engine.backend.events)
+        assert typed == [str(n) for n in range(6)]
+        assert sum(s.jobs for s in sessions) == 6
+
+    def test_batch_runner_on_sessions(self, tmp_path, monkeypatch):
+        sessions = [_session(tmp_path, "red", "red"), _session(tmp_path, "blue", "blue")]
+        monkeypatch.setattr('desktop_automation.batch_runner.SessionPool',
+                            lambda s: SessionPool(s, ocr_workers=0))
+        workflow = compile_workflow([{"action": "type_text", "params": {"text": "{{key}}", "method": "type"}}])
+        report = BatchRunner(workflow, backoff=0).run([{"key": "a"}, {"key": "b"}, {"key": "c"}], sessions)
+        assert report["succeeded"] == 3
+        assert {job["session"] for job in report["jobs"]} <= {"red", "blue"}
+        typed = sorted(e[1] for s in sessions for e in s.input_engine.backend.events)
+        assert typed == ["a", "b", "c"]
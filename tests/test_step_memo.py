@@ -0,0 +1,120 @@
+"""
+测试屏幕指纹备忘：跳过已满足的步骤、失败后从中断处继续 (模拟屏幕，无需显示器)
+"""
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from desktop_automation import core
+from desktop_automation.sessions import AutomationSession
+from desktop_automation.screen_source import ReplaySource
+from desktop_automation.input_engine import RecordingBackend
+from desktop_automation.workflow_compiler import compile_workflow
+from desktop_automation.step_memo import StepMemo
+
+LEVELS = (0, 80, 160, 240)      # screen grey level after 0, 1, 2, 3 steps
+
+
+class ScreenBackend(RecordingBackend):
+    """Typing a letter moves the fake screen to the state that letter leads to."""
+
+    def __init__(self, screen, effects):
+        super().__init__()
+        self.screen = screen
+        self.effects = effects
+
+    def write(self, text, interval=0.0):
+        super().write(text, interval)
+        self.screen["state"] = self.effects[text]
+
+
+@pytest.fixture
+def screen(monkeypatch, tmp_path):
+    # captures come from the patched _capture_screen; the session only needs some source
+    Image.new("L", (64, 36)).save(tmp_path / "frame.png")
+    screen = {"state": 0, "source": ReplaySource([str(tmp_path / "frame.png")])}
+    monkeypatch.setattr(core, '_capture_screen',
+                        lambda region=None: Image.new("L", (64, 36), LEVELS[screen["state"]]))
+    return screen
+
+
+def _run(screen, memo, effects=None, params=None, run_id=None):
+    backend = ScreenBackend(screen, effects or {"a": 1, "b": 2, "c": 3})
+    session = AutomationSession("memo", screen_source=screen["source"], input_backend=backend)
+    workflow = compile_workflow([{"action": "type_text", "params": {"text": letter, "method": "type"}}
+                                 for letter in "abc"], name="letters")
+    try:
+        session.run(workflow.run, None, params or {}, memo, run_id)
+    except RuntimeError:
+        pass
+
+    return [event[1] for event in backend.events]
+
+
+def _fail_once_on(monkeypatch, letter):
+    """The first attempt to type letter fails before anything reaches the screen."""
+    type_text = core.type_text
+    failed = []
+
+    def fail_once(text, interval=None, method="auto", log_file_path=None):
+        if text == letter and not failed:
+            failed.append(text)
+            raise RuntimeError("window lost focus")
+        return type_text(text, interval, method, log_file_path)
+
+    monkeypatch.setattr(core, 'type_text', fail_once)
+
+
+class TestStepMemo:
+    """测试记录、续跑与跳过"""
+
+    def test_first_run_records_every_boundary(self, screen, tmp_path):
+        memo = StepMemo(str(tmp_path / "memo.json"))
+        assert _run(screen, memo) == ["a", "b", "c"]
+        assert memo.stats()["recorded"] == 1
+        # a fresh memo reads the saved record back
+        again = StepMemo(str(tmp_path / "memo.json"))
+        screen["state"] = 0
+        assert _run(screen, again) == ["a", "b", "c"]
+        assert again.stats()["skipped"] == 0 and again.stats()["resumed"] == 0
+
+    def test_retry_resumes_at_the_failed_step(self, screen, tmp_path, monkeypatch):
+        memo = StepMemo(str(tmp_path / "memo.json"))
+        _run(screen, memo)
+        screen["state"] = 0
+        _fail_once_on(monkeypatch, "c")
+        assert _run(screen, memo, run_id="job-1") == ["a", "b"]
+        assert screen["state"] == 2
+        # the retry passes over the input this job already sent
+        assert _run(screen, memo, run_id="job-1") == ["c"]
+        assert memo.stats()["resumed"] == 1
+
+    def test_input_steps_are_not_skipped_on_screen_state_alone(self, screen, tmp_path):
+        memo = StepMemo(str(tmp_path / "memo.json"))
+        _run(screen, memo)
+        screen["state"] = 2             # e.g. the previous copy of a message is still shown
+        assert _run(screen, memo) == ["a", "b", "c"]
+        screen["state"] = 0
+        # the first step already brings the screen to the state after step 2: "b" is still typed
+        assert _run(screen, memo, effects={"a": 2, "b": 2, "c": 3}) == ["a", "b", "c"]
+        assert memo.stats()["skipped"] == 0 and memo.stats()["resumed"] == 0
+
+    def test_end_state_and_other_parameters_run_everything(self, screen, tmp_path):
+        memo = StepMemo(str(tmp_path / "memo.json"))
+        _run(screen, memo)
+        assert screen["state"] == 3     # the screen already shows the end state
+        assert _run(screen, memo) == ["a", "b", "c"]
+        screen["state"] = 2
+        assert _run(screen, memo, params={"other": "set"}) == ["a", "b", "c"]
+
+    def test_failed_runs_are_not_recorded(self, screen, tmp_path, monkeypatch):
+        _fail_once_on(monkeypatch, "b")
+        memo = StepMemo(str(tmp_path / "memo.json"))
+        assert _run(screen, memo) == ["a"]
+        assert memo.stats()["recorded"] == 0
+        assert not os.path.exists(tmp_path / "memo.json")
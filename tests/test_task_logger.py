@@ -0,0 +1,74 @@
+"""
+测试缓冲的任务日志写入
+"""
+import pytest
+import sys
+import os
+import json
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation.task_logger import TaskLogger, get_task_logger, flush_task_log, close_task_log
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+class TestTaskLogger:
+    """测试批量写入"""
+
+    def test_flush_writes_in_order(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        logger = TaskLogger(path, flush_interval=60)
+        for i in range(10):
+            logger.write({"action": "step", "index": i, "result": "打开"})
+        logger.flush()
+        entries = _read(path)
+        assert [e["index"] for e in entries] == list(range(10))
+        assert entries[0]["result"] == "打开"
+        logger.close()
+
+    def test_entries_are_batched(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        logger = TaskLogger(path, flush_interval=60, flush_batch=1000)
+        for i in range(200):
+            logger.write({"index": i})
+        logger.close()
+        assert len(_read(path)) == 200
+        assert logger.writes == 1
+
+    def test_batch_threshold_triggers_write(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        logger = TaskLogger(path, flush_interval=60, flush_batch=4)
+        for i in range(8):
+            logger.write({"index": i})
+        logger.flush()
+        assert logger.writes == 2
+        logger.close()
+
+    def test_write_after_close_raises(self, tmp_path):
+        logger = TaskLogger(str(tmp_path / "task.jsonl"))
+        logger.close()
+        with pytest.raises(ValueError):
+            logger.write({"index": 0})
+
+
+class TestRegistry:
+    """测试按路径共享的日志"""
+
+    def test_shared_per_path_and_reopened_after_close(self, tmp_path):
+        path = str(tmp_path / "task.jsonl")
+        first = get_task_logger(path)
+        assert get_task_logger(path) is first
+        first.write({"index": 0})
+        flush_task_log(path)
+        assert len(_read(path)) == 1
+        close_task_log(path)
+        second = get_task_logger(path)
+        assert second is not first
+        second.write({"index": 1})
+        close_task_log(path)
+        assert [e["index"] for e in _read(path)] == [0, 1]
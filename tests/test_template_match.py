@@ -0,0 +1,77 @@
+"""
+测试模板匹配引擎
+"""
+import pytest
+import sys
+import os
+import io
+import base64
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+np = pytest.importorskip("numpy")
+from PIL import Image, ImageFilter
+
+from desktop_automation.template_match import Template, TemplateCache, locate_template, ncc_map
+
+
+def _screen(width=640, height=360, seed=1):
+    rng = np.random.default_rng(seed)
+    noise = (rng.random((height, width, 3)) * 255).astype('uint8')
+    return Image.fromarray(noise).filter(ImageFilter.GaussianBlur(1.5))
+
+
+def _b64(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class TestNCC:
+    """测试归一化互相关"""
+
+    def test_exact_patch_scores_one(self):
+        rng = np.random.default_rng(0)
+        haystack = rng.random((40, 60)).astype(np.float32)
+        scores = ncc_map(haystack, haystack[10:20, 30:45].copy())
+        assert np.unravel_index(scores.argmax(), scores.shape) == (10, 30)
+        assert scores.max() == pytest.approx(1.0, abs=1e-4)
+
+
+class TestLocateTemplate:
+    """测试金字塔搜索、区域与缩放"""
+
+    def test_finds_icon(self):
+        screen = _screen()
+        found = locate_template(screen, Template(screen.crop((200, 120, 248, 152))))
+        assert (found["left"], found["top"]) == (200, 120)
+        assert (found["x"], found["y"]) == (224, 136)
+
+    def test_region_limits_search(self):
+        screen = _screen()
+        template = Template(screen.crop((200, 120, 248, 152)))
+        assert locate_template(screen, template, region=(0, 200, 640, 160)) is None
+        found = locate_template(screen, template, region=(150, 100, 200, 100))
+        assert (found["left"], found["top"]) == (200, 120)
+
+    def test_scaled_template(self):
+        screen = _screen()
+        icon = screen.crop((300, 200, 364, 248))
+        found = locate_template(screen, Template(icon.resize((32, 24))), threshold=0.8, scales=(1.0, 2.0))
+        assert found["scale"] == 2.0
+        assert abs(found["left"] - 300) <= 2 and abs(found["top"] - 200) <= 2
+
+
+class TestTemplateCache:
+    """测试模板解码缓存"""
+
+    def test_decoded_once_per_content(self):
+        cache = TemplateCache()
+        encoded = _b64(_screen(32, 32))
+        assert cache.get(encoded) is cache.get(encoded)
+        assert cache.stats() == {"templates": 1, "hits": 1, "misses": 1}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,67 @@
+"""
+测试OCR单词空间索引
+"""
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation.text_index import TextIndex
+
+
+def _data(*words):
+    """words: (text, conf, left, top, width, height)"""
+    keys = ('text', 'conf', 'left', 'top', 'width', 'height')
+    return {k: [w[i] for w in words] for i, k in enumerate(keys)}
+
+
+SCREEN = _data(
+    ("文件", 91, 100, 100, 30, 16),
+    ("传输", 88, 132, 100, 30, 16),
+    ("助手", 90, 164, 100, 30, 16),
+    ("Save", 95, 400, 300, 40, 14),
+    ("Save", 60, 400, 700, 40, 14),
+    ("Cancel", 93, 460, 300, 50, 14),
+    ("noise", 10, 10, 10, 30, 14),
+)
+
+
+class TestTextIndex:
+    """测试匹配方式与过滤"""
+
+    def test_phrase_split_across_words(self):
+        hits = TextIndex(SCREEN).search("文件传输助手")
+        assert len(hits) == 1
+        assert hits[0]["box"] == [100, 100, 94, 16]
+        assert hits[0]["confidence"] == 88
+
+    def test_all_hits_ranked_by_confidence(self):
+        hits = TextIndex(SCREEN).search("save")
+        assert [h["y"] for h in hits] == [307, 707]
+
+    def test_exact_is_case_sensitive(self):
+        assert TextIndex(SCREEN).search("save", mode="exact") == []
+        assert len(TextIndex(SCREEN).search("Save", mode="exact")) == 2
+
+    def test_fuzzy_tolerates_ocr_errors(self):
+        hits = TextIndex(SCREEN).search("Cance1", mode="fuzzy")
+        assert hits and hits[0]["text"] == "Cancel"
+        assert hits[0]["distance"] == 1
+
+    def test_near_and_region_filters(self):
+        index = TextIndex(SCREEN)
+        assert index.search("save", near=(420, 690))[0]["y"] == 707
+        assert [h["y"] for h in index.search("save", region=(0, 600, 1000, 200))] == [707]
+
+    def test_low_confidence_words_ignored(self):
+        assert TextIndex(SCREEN).search("noise") == []
+
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError):
+            TextIndex(SCREEN).search("x", mode="regex")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
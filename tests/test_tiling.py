@@ -0,0 +1,121 @@
+"""
+测试分块OCR辅助函数
+"""
+import pytest
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from desktop_automation.tiling import make_tiles, make_bands, changed_tiles, merge_tile_results, group_lines, IncrementalOCR
+
+
+def _data(*words):
+    """words: (text, conf, left, top, width, height)"""
+    keys = ('text', 'conf', 'left', 'top', 'width', 'height')
+    return {k: [w[i] for w in words] for i, k in enumerate(keys)}
+
+
+class TestTiles:
+    """测试分块与变化检测"""
+
+    def test_tiles_cover_frame(self):
+        tiles = make_tiles(1000, 500, tile_size=320, overlap=48)
+        assert max(t[2] for t in tiles) == 1000
+        assert max(t[3] for t in tiles) == 500
+        assert all(t[2] - t[0] <= 320 for t in tiles)
+
+    def test_only_changed_tiles_reported(self):
+        a = Image.new("RGB", (200, 100), "white")
+        b = a.copy()
+        b.putpixel((10, 10), (0, 0, 0))
+        tiles = make_tiles(200, 100, tile_size=100, overlap=0)
+        assert changed_tiles(a, b, tiles) == [(0, 0, 100, 100)]
+
+
+class TestBands:
+    """测试并行识别的水平条带"""
+
+    def test_bands_overlap_and_cover(self):
+        bands = make_bands(1920, 1080, 4, overlap=48)
+        assert len(bands) == 4
+        assert bands[0][1] == 0 and bands[-1][3] == 1080
+        for upper, lower in zip(bands, bands[1:]):
+            assert upper[3] - lower[1] >= 48
+        assert all(b[0] == 0 and b[2] == 1920 for b in bands)
+
+    def test_group_lines(self):
+        data = _data(("World", 90, 60, 10, 40, 12), ("Hello", 90, 5, 11, 40, 12), ("Next", 90, 5, 40, 30, 12))
+        lines = group_lines(data)
+        assert [[data['text'][i] for i in line] for line in lines] == [["Hello", "World"], ["Next"]]
+
+
+class TestMerge:
+    """测试单词框合并与去重"""
+
+    def test_offsets_and_dedup(self):
+        frame = (200, 100)
+        left = ((0, 0, 120, 100), _data(("确定", 90, 80, 40, 20, 10)))
+        right = ((80, 0, 200, 100), _data(("确定", 85, 0 + 0, 40, 20, 10)))
+        # right tile sees the word at its left edge -> treated as cut
+        merged = merge_tile_results([left, right], frame)
+        assert merged['text'] == ["确定"]
+        assert merged['left'] == [80]
+        assert merged['conf'] == [90.0]
+
+    def test_cut_word_kept_when_nothing_whole(self):
+        frame = (200, 100)
+        tile = ((0, 0, 120, 100), _data(("Send", 80, 100, 40, 20, 10)))
+        merged = merge_tile_results([tile], frame)
+        assert merged['text'] == ["Send"]
+
+    def test_word_wider_than_overlap_is_joined(self):
+        # "Configuration" spans x 250..350, across the whole 272..320 overlap: both tiles cut it
+        frame = (600, 100)
+        left = ((0, 0, 320, 100), _data(("OK", 90, 10, 40, 20, 10), ("Configura", 88, 250, 40, 68, 12)))
+        right = ((272, 0, 592, 100), _data(("uration", 80, 0, 41, 78, 12), ("Cancel", 90, 200, 40, 40, 10)))
+        merged = merge_tile_results([left, right], frame)
+        assert merged['text'] == ["OK", "Configuration", "Cancel"]
+        assert (merged['left'][1], merged['width'][1]) == (250, 100)
+        assert merged['conf'][1] == 80.0
+
+    def test_block_and_line_numbers_kept(self):
+        frame = (400, 100)
+        top = dict(_data(("Name", 90, 10, 10, 40, 10), ("Alice", 90, 60, 10, 40, 10), ("Age", 90, 10, 30, 30, 10)),
+                   block_num=[1, 1, 1], line_num=[1, 1, 2])
+        bottom = dict(_data(("OK", 90, 10, 10, 30, 10)), block_num=[1], line_num=[1])
+        merged = merge_tile_results([((0, 0, 200, 60), top), ((200, 0, 400, 60), bottom)], frame)
+        assert merged['text'] == ["Name", "Alice", "OK", "Age"]
+        assert merged['block_num'] == [1, 1, 2, 1]
+        assert merged['line_num'] == [1, 1, 2, 3]
+        assert 'line_num' not in merge_tile_results([((0, 0, 200, 60), _data(("OK", 90, 10, 10, 30, 10)))], frame)
+
+
+class TestIncrementalOCR:
+    """测试增量识别只处理变化区域"""
+
+    def test_unchanged_frame_skips_ocr(self):
+        calls = []
+
+        def ocr(tile):
+            calls.append(tile.size)
+            return _data()
+
+        tracker = IncrementalOCR(ocr, tile_size=100, overlap=0)
+        frame = Image.new("RGB", (200, 100), "white")
+        tracker.update(frame)
+        assert len(calls) == 2
+        tracker.update(frame.copy())
+        assert len(calls) == 2
+        changed = frame.copy()
+        changed.putpixel((150, 50), (0, 0, 0))
+        tracker.update(changed)
+        assert len(calls) == 3
+        assert tracker.last_changed == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,94 @@
+"""
+测试工作流编译与缓存
+"""
+import pytest
+import sys
+import os
+import json
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from desktop_automation import core, workflow_compiler
+from desktop_automation.workflow_compiler import compile_workflow, load_workflow, load_named_workflow
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    calls = []
+    monkeypatch.setattr(core, 'paste_text', lambda text, log_file_path=None: calls.append(('paste', text, log_file_path)))
+    monkeypatch.setattr(core, 'press_hotkey', lambda *keys, log_file_path=None: calls.append(('hotkey', keys, log_file_path)))
+    monkeypatch.setattr(core, 'wait', lambda seconds, log_file_path=None: calls.append(('wait', seconds, log_file_path)))
+    return calls
+
+
+WORKFLOW = [
+    {"action": "press_hotkey", "params": {"keys": ["ctrl", "f"]}},
+    {"action": "paste_text", "params": {"text": "{{contact_name}}"}},
+    {"action": "wait", "params": {"seconds": 1}},
+]
+
+
+class TestCompile:
+    """测试编译与执行"""
+
+    def test_plan_is_reusable_with_different_params(self, recorded):
+        plan = compile_workflow(WORKFLOW)
+        assert plan.parameters == {"contact_name"}
+        plan.run("task.jsonl", {"contact_name": "张三"})
+        plan.run(None, {"contact_name": "李四"})
+        assert recorded[0] == ('hotkey', ('ctrl', 'f'), "task.jsonl")
+        assert [c[1] for c in recorded if c[0] == 'paste'] == ["张三", "李四"]
+        # the source steps were not modified
+        assert WORKFLOW[1]["params"]["text"] == "{{contact_name}}"
+
+    def test_unknown_action_rejected(self):
+        with pytest.raises(ValueError, match="not found"):
+            compile_workflow([{"action": "fly_to_moon", "params": {}}])
+
+    def test_bad_params_rejected_at_compile_time(self):
+        with pytest.raises(ValueError, match="Step 1"):
+            compile_workflow([{"action": "wait", "params": {"secs": 1}}])
+
+    def test_missing_parameter_rejected(self, recorded):
+        with pytest.raises(ValueError, match="contact_name"):
+            compile_workflow(WORKFLOW).run(None, {})
+
+
+class TestCache:
+    """测试按修改时间缓存"""
+
+    def test_disk_cache_reused_and_invalidated(self, tmp_path, recorded):
+        workflow_file = tmp_path / "wf.json"
+        workflow_file.write_text(json.dumps(WORKFLOW), encoding='utf-8')
+        cache_dir = str(tmp_path / "cache")
+        fresh = load_workflow(str(workflow_file), cache_dir)
+        assert [f.endswith(".json") for f in os.listdir(cache_dir)] == [True]
+
+        workflow_compiler._plans.clear()
+        calls = []
+        original = workflow_compiler._compile_data
+        workflow_compiler._compile_data = lambda actions: calls.append(1) or original(actions)
+        try:
+            plan = load_workflow(str(workflow_file), cache_dir)
+            assert calls == []          # served from disk
+            assert plan.steps == fresh.steps and plan.parameters == fresh.parameters
+
+            workflow_file.write_text(json.dumps(WORKFLOW[:1]), encoding='utf-8')
+            os.utime(workflow_file, ns=(1, 1))
+            plan = load_workflow(str(workflow_file), cache_dir)
+            assert calls == [1]         # recompiled after the change
+            assert len(plan.steps) == 1
+        finally:
+            workflow_compiler._compile_data = original
+
+    def test_named_workflow_from_manifest(self, tmp_path, recorded):
+        (tmp_path / "wf.json").write_text(json.dumps({"regions": {"list": [0, 0, 10, 10]}, "actions": WORKFLOW}),
+                                          encoding='utf-8')
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(json.dumps({"workflows": [{"name": "demo", "file": "wf.json"}]}), encoding='utf-8')
+        plan = load_named_workflow("demo", str(manifest), str(tmp_path), cache_dir=None)
+        assert plan.name == "demo"
+        assert dict(plan.regions) == {"list": [0, 0, 10, 10]}
+        with pytest.raises(FileNotFoundError):
+            load_named_workflow("missing", str(manifest), str(tmp_path), cache_dir=None)